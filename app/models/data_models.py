@@ -5,7 +5,47 @@ from typing import Dict, List, Optional, Any
 import uuid
 
 
-@dataclass
+@dataclass(slots=True)
+class DocumentSpan:
+    """A stretch of ``ProcessedDocument.content`` that shares one page and heading path."""
+    start: int
+    end: int
+    page: Optional[int] = None
+    heading_path: List[str] = field(default_factory=list)
+    section: Optional[str] = None
+    
+    def label(self) -> str:
+        parts = []
+        if self.page is not None:
+            parts.append(f"p.{self.page}")
+        if self.section:
+            parts.append(f"§{self.section}")
+        elif self.heading_path:
+            parts.append(f'"{self.heading_path[-1]}"')
+        return " ".join(parts)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        data = {"start": self.start, "end": self.end}
+        if self.page is not None:
+            data["page"] = self.page
+        if self.heading_path:
+            data["headings"] = self.heading_path
+        if self.section:
+            data["section"] = self.section
+        return data
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "DocumentSpan":
+        return cls(
+            start=data["start"],
+            end=data["end"],
+            page=data.get("page"),
+            heading_path=data.get("headings", []),
+            section=data.get("section")
+        )
+
+
+@dataclass(slots=True)
 class ProcessedDocument:
     id: str = field(default_factory=lambda: str(uuid.uuid4()))
     filename: str = ""
@@ -35,7 +75,7 @@ class ProcessedDocument:
             upload_date = datetime.fromisoformat(upload_date)
         elif upload_date is None:
             upload_date = datetime.now()
-            
+        
         return cls(
             id=data.get("id", str(uuid.uuid4())),
             filename=data.get("filename", ""),
@@ -46,21 +86,48 @@ class ProcessedDocument:
             metadata=data.get("metadata", {}),
             session_id=data.get("session_id")
         )
+    
+    def get_spans(self) -> List[DocumentSpan]:
+        return [DocumentSpan.from_dict(span) for span in self.metadata.get("spans", [])]
+
 
+@dataclass(slots=True)
+class DocumentFilter:
+    """Restricts a query to part of a session's documents. Empty fields don't filter."""
+    document_ids: List[str] = field(default_factory=list)
+    filenames: List[str] = field(default_factory=list)
+    file_types: List[str] = field(default_factory=list)
+    uploaded_after: Optional[datetime] = None
+    uploaded_before: Optional[datetime] = None
+    
+    def __post_init__(self):
+        # Stored as the lowercase extension, e.g. ".pdf"; accept "pdf" and "PDF" too
+        self.file_types = [f".{file_type.lower().lstrip('.')}" for file_type in self.file_types if file_type.strip()]
+        # Upload dates are stored as naive local time
+        if self.uploaded_after and self.uploaded_after.tzinfo:
+            self.uploaded_after = self.uploaded_after.astimezone().replace(tzinfo=None)
+        if self.uploaded_before and self.uploaded_before.tzinfo:
+            self.uploaded_before = self.uploaded_before.astimezone().replace(tzinfo=None)
+    
+    def is_empty(self) -> bool:
+        return not (self.document_ids or self.filenames or self.file_types or self.uploaded_after or self.uploaded_before)
 
-@dataclass
+
+@dataclass(slots=True)
 class QueryResponse:
     answer: str = ""
     source_documents: List[str] = field(default_factory=list)
     confidence_score: Optional[float] = None
     processing_time: float = 0.0
+    citations: List[str] = field(default_factory=list)
     
     def to_dict(self) -> Dict[str, Any]:
         return {
             "answer": self.answer,
             "source_documents": self.source_documents,
             "confidence_score": self.confidence_score,
-            "processing_time": self.processing_time
+            "processing_time": self.processing_time,
+            "citations": self.citations
         }
     
     @classmethod
@@ -69,11 +136,12 @@ class QueryResponse:
             answer=data.get("answer", ""),
             source_documents=data.get("source_documents", []),
             confidence_score=data.get("confidence_score"),
-            processing_time=data.get("processing_time", 0.0)
+            processing_time=data.get("processing_time", 0.0),
+            citations=data.get("citations", [])
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class Conversation:
     id: str = field(default_factory=lambda: str(uuid.uuid4()))
     query: str = ""
@@ -81,6 +149,7 @@ class Conversation:
     timestamp: datetime = field(default_factory=datetime.now)
     source_documents: List[str] = field(default_factory=list)
     session_id: Optional[str] = None
+    conversation_id: Optional[str] = None
     
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -89,7 +158,8 @@ class Conversation:
             "response": self.response.to_dict(),
             "timestamp": self.timestamp.isoformat(),
             "source_documents": self.source_documents,
-            "session_id": self.session_id
+            "session_id": self.session_id,
+            "conversation_id": self.conversation_id
         }
     
     @classmethod
@@ -101,18 +171,21 @@ class Conversation:
             timestamp = datetime.now()
         
         response_data = data.get("response", {})
-        if isinstance(response_data, dict):
+        if isinstance(response_data, QueryResponse):
+            response = response_data
+        elif isinstance(response_data, dict):
             response = QueryResponse.from_dict(response_data)
         else:
             response = QueryResponse()
-            
+        
         return cls(
             id=data.get("id", str(uuid.uuid4())),
             query=data.get("query", ""),
             response=response,
             timestamp=timestamp,
             source_documents=data.get("source_documents", []),
-            session_id=data.get("session_id")
+            session_id=data.get("session_id"),
+            conversation_id=data.get("conversation_id")
         )
     
     def format_for_notion(self) -> Dict[str, Any]:
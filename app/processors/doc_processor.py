@@ -1,6 +1,7 @@
 
+import re
 from docx import Document
-from app.processors.document_processor import DocumentProcessor, ProcessingError
+from app.processors.document_processor import DocumentProcessor, ProcessingError, SpanBuilder
 from app.models.data_models import ProcessedDocument
 
 
@@ -15,46 +16,55 @@ class DocProcessor(DocumentProcessor):
     def process_document(self, file_path: str, filename: str) -> ProcessedDocument:
         try:
             file_info = self._get_file_info(file_path, filename)
-            text_content = self._extract_text_from_doc(file_path)
+            text_content, spans = self._extract_text_from_doc(file_path)
             
             return ProcessedDocument(
                 filename=filename,
                 file_type=file_info["file_extension"],
                 content=text_content,
                 file_size=file_info["file_size_bytes"],
-                metadata={"processor": "DocProcessor"}
+                metadata={"processor": "DocProcessor", "spans": spans}
             )
-            
+        
         except Exception as e:
             raise ProcessingError(f"Failed to process DOC/DOCX {filename}: {str(e)}")
     
-    def _extract_text_from_doc(self, file_path: str) -> str:
+    def _extract_text_from_doc(self, file_path: str) -> tuple:
         if file_path.lower().endswith('.docx'):
             return self._extract_from_docx(file_path)
         else:
-            return self._extract_from_legacy_doc(file_path)
+            return self._extract_from_legacy_doc(file_path), []
     
-    def _extract_from_docx(self, file_path: str) -> str:
+    def _extract_from_docx(self, file_path: str) -> tuple:
         doc = None
         try:
             doc = Document(file_path)
-            text_parts = []
+            builder = SpanBuilder()
             
             for paragraph in doc.paragraphs:
-                if paragraph.text.strip():
-                    text_parts.append(paragraph.text.strip())
+                text = paragraph.text.strip()
+                if not text:
+                    continue
+                level = self._heading_level(paragraph)
+                if level:
+                    builder.heading(level, text)
+                else:
+                    builder.add(text)
             
+            # Tables are read after the body, so they get no heading of their own
+            builder.clear_headings()
             for table in doc.tables:
                 for row in table.rows:
                     row_text = [cell.text.strip() for cell in row.cells if cell.text.strip()]
                     if row_text:
-                        text_parts.append(' | '.join(row_text))
+                        builder.add(' | '.join(row_text))
             
-            if text_parts:
-                return '\n\n'.join(text_parts)
+            content, spans = builder.build()
+            if content:
+                return content, spans
             else:
-                return "No readable text content found in this document."
-                
+                return "No readable text content found in this document.", []
+        
         except Exception as e:
             error_msg = str(e).lower()
             if 'word/null' in error_msg or 'archive' in error_msg or 'zipfile' in error_msg:
@@ -69,6 +79,14 @@ class DocProcessor(DocumentProcessor):
                 except:
                     pass
     
+    def _heading_level(self, paragraph) -> int:
+        """Outline level from the "Title" / "Heading N" paragraph styles, 0 for body text."""
+        style = paragraph.style.name if paragraph.style is not None else ""
+        if style == "Title":
+            return 1
+        match = re.match(r"Heading (\d)", style)
+        return int(match.group(1)) + 1 if match else 0
+    
     def _extract_from_legacy_doc(self, file_path: str) -> str:
         try:
             import docx2txt
@@ -1,8 +1,31 @@
 
 import os
+import re
 from abc import ABC, abstractmethod
-from typing import Optional
-from app.models.data_models import ProcessedDocument
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from app.models.data_models import DocumentSpan, ProcessedDocument
+
+SECTION_NUMBER = re.compile(r"^(\d{1,2}(?:\.\d{1,2}){0,3})\.?\s+\S")
+
+_page_reporter: ContextVar[Optional[Callable[[int, str], None]]] = ContextVar("page_reporter", default=None)
+
+
+@contextmanager
+def reporting_pages(callback: Callable[[int, str], None]) -> Iterator[None]:
+    """Have processors pass each page's raw text to ``callback`` as soon as it is extracted."""
+    token = _page_reporter.set(callback)
+    try:
+        yield
+    finally:
+        _page_reporter.reset(token)
+
+
+def report_page(page_num: int, text: str):
+    reporter = _page_reporter.get()
+    if reporter is not None:
+        reporter(page_num, text)
 
 
 class DocumentProcessor(ABC):
@@ -15,6 +38,13 @@ class DocumentProcessor(ABC):
     def process_document(self, file_path: str, filename: str) -> ProcessedDocument:
         pass
     
+    def build_partial(self, pages: List[Tuple[int, str]], file_path: str, filename: str) -> Optional[ProcessedDocument]:
+        """
+        Build a document from the pages reported before extraction was stopped,
+        or None if this processor can't use a partial result.
+        """
+        return None
+    
     def _get_file_info(self, file_path: str, filename: str) -> dict:
         try:
             file_size = os.path.getsize(file_path)
@@ -31,6 +61,50 @@ class DocumentProcessor(ABC):
             }
 
 
+class SpanBuilder:
+    """
+    Collects extracted text blocks together with the page and heading they
+    came from. ``build`` joins the blocks with blank lines and returns the
+    content plus spans giving each page/section's character range in it.
+    """
+    
+    def __init__(self):
+        self.spans: List[DocumentSpan] = []
+        self._parts: List[str] = []
+        self._length = 0
+        self._headings: List[Tuple[int, str]] = []
+    
+    def heading(self, level: int, title: str, text: Optional[str] = None, page: Optional[int] = None):
+        while self._headings and self._headings[-1][0] >= level:
+            self._headings.pop()
+        self._headings.append((level, title.strip()))
+        self.add(text if text is not None else title, page)
+    
+    def clear_headings(self):
+        self._headings = []
+    
+    def add(self, text: str, page: Optional[int] = None):
+        text = text.strip()
+        if not text:
+            return
+        
+        start = self._length + (2 if self._parts else 0)
+        self._parts.append(text)
+        self._length = start + len(text)
+        
+        path = [title for _, title in self._headings]
+        last = self.spans[-1] if self.spans else None
+        if last and last.page == page and last.heading_path == path:
+            last.end = self._length
+            return
+        section = next((match.group(1) for _, title in reversed(self._headings)
+                        if (match := SECTION_NUMBER.match(title))), None)
+        self.spans.append(DocumentSpan(start, self._length, page, path, section))
+    
+    def build(self) -> Tuple[str, List[Dict[str, Any]]]:
+        return "\n\n".join(self._parts), [span.to_dict() for span in self.spans]
+
+
 class DocumentProcessorFactory:
     
     def __init__(self):
@@ -5,6 +5,8 @@ import pytesseract
 from PIL import Image
 from app.processors.document_processor import DocumentProcessor, ProcessingError
 from app.models.data_models import ProcessedDocument
+from app.services.admission import AdmissionRejected, pool_slot
+from app.services.metrics import span
 
 logger = logging.getLogger(__name__)
 
@@ -20,7 +22,8 @@ class ImageProcessor(DocumentProcessor):
     def process_document(self, file_path: str, filename: str) -> ProcessedDocument:
         try:
             file_info = self._get_file_info(file_path, filename)
-            text_content = self._extract_metadata_from_image(file_path, filename)
+            with pool_slot("ocr"):
+                text_content = self._extract_metadata_from_image(file_path, filename)
             
             # Clean the text to remove null bytes and other problematic characters
             text_content = self._clean_text(text_content)
@@ -32,7 +35,9 @@ class ImageProcessor(DocumentProcessor):
                 file_size=file_info["file_size_bytes"],
                 metadata={"processor": "ImageProcessor", "note": "OCR not available in cloud deployment"}
             )
-            
+        
+        except AdmissionRejected:
+            raise
         except Exception as e:
             raise ProcessingError(f"Failed to process image {filename}: {str(e)}")
     
@@ -71,7 +76,7 @@ Note: No text could be extracted from this image using OCR."""
                 logger.info(f"No text found in image {filename}")
             
             return metadata_text
-                
+        
         except Exception as e:
             logger.warning(f"Could not process image {filename}: {e}")
             return f"""Image File: {filename}
@@ -83,11 +88,12 @@ Error: The image could not be processed. Please check if the file is a valid ima
             if not os.path.exists(pytesseract.pytesseract.tesseract_cmd):
                 logger.warning(f"Tesseract not found at: {pytesseract.pytesseract.tesseract_cmd}")
                 return ""
-
-            if image.mode != 'L':
-                image = image.convert('L')
             
-            text = pytesseract.image_to_string(image)
+            with span("upload.ocr_page", processor="ImageProcessor"):
+                if image.mode != 'L':
+                    image = image.convert('L')
+                
+                text = pytesseract.image_to_string(image)
             return text.strip()
         except Exception as e:
             # Catch ALL exceptions to ensure upload never fails due to OCR
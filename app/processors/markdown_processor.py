@@ -1,7 +1,11 @@
 
-from app.processors.document_processor import DocumentProcessor, ProcessingError
+import re
+from app.processors.document_processor import DocumentProcessor, ProcessingError, SpanBuilder
+from app.processors.text_processor import clean_line, read_lines
 from app.models.data_models import ProcessedDocument
 
+HEADING = re.compile(r"^(#{1,6})\s+(.+?)\s*#*$")
+
 
 class MarkdownProcessor(DocumentProcessor):
     
@@ -12,47 +16,42 @@ class MarkdownProcessor(DocumentProcessor):
     def process_document(self, file_path: str, filename: str) -> ProcessedDocument:
         try:
             file_info = self._get_file_info(file_path, filename)
-            text_content = self._read_markdown_file(file_path)
+            text_content, spans = self._read_markdown_file(file_path)
             
             return ProcessedDocument(
                 filename=filename,
                 file_type=file_info["file_extension"],
                 content=text_content,
                 file_size=file_info["file_size_bytes"],
-                metadata={"processor": "MarkdownProcessor"}
+                metadata={"processor": "MarkdownProcessor", "spans": spans}
             )
-            
+        
         except Exception as e:
             raise ProcessingError(f"Failed to process Markdown {filename}: {str(e)}")
     
-    def _read_markdown_file(self, file_path: str) -> str:
+    def _read_markdown_file(self, file_path: str) -> tuple:
         try:
-            for encoding in ['utf-8', 'utf-16', 'latin-1']:
-                try:
-                    with open(file_path, 'r', encoding=encoding) as file:
-                        content = file.read()
-                    break
-                except UnicodeDecodeError:
-                    continue
-            else:
-                raise ProcessingError("Could not decode file")
-            
-            if not content.strip():
-                return "Empty Markdown file."
-            
-            lines = [line.strip() for line in content.split('\n')]
-            cleaned_lines = []
-            
-            for line in lines:
-                if line or (cleaned_lines and cleaned_lines[-1]):
-                    cleaned_lines.append(line)
-            
-            result = '\n'.join(cleaned_lines)
-            
-            while '\n\n\n' in result:
-                result = result.replace('\n\n\n', '\n\n')
-            
-            return result.strip()
-            
+            # Blank-line separated blocks, with every heading starting a new section
+            builder = SpanBuilder()
+            block = []
+            in_fence = False
+            for line in map(clean_line, read_lines(file_path)):
+                if line.startswith('```') or line.startswith('~~~'):
+                    in_fence = not in_fence
+                match = None if in_fence else HEADING.match(line)
+                if match or not line:
+                    builder.add('\n'.join(block))
+                    block = []
+                    if match:
+                        builder.heading(len(match.group(1)), match.group(2), text=line)
+                else:
+                    block.append(line)
+            builder.add('\n'.join(block))
+            
+            content, spans = builder.build()
+            if not content:
+                return "Empty Markdown file.", []
+            return content, spans
+        
         except Exception as e:
             raise ProcessingError(f"Failed to read Markdown file: {str(e)}")
\ No newline at end of file
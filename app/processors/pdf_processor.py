@@ -1,15 +1,21 @@
 import logging
 import re
+from typing import Iterable, Iterator, List, Tuple
 import PyPDF2
 import pdfplumber
 import pytesseract
 from pdf2image import convert_from_path
 from PIL import Image
-from app.processors.document_processor import DocumentProcessor, ProcessingError
+from app.processors.document_processor import DocumentProcessor, ProcessingError, SpanBuilder, report_page
 from app.models.data_models import ProcessedDocument
+from app.services.admission import AdmissionRejected, pool_slot
+from app.services.metrics import span
 
 logger = logging.getLogger(__name__)
 
+# Short numbered lines such as "2.1 Methods" or "3. Results" open a section
+NUMBERED_HEADING = re.compile(r"^(\d{1,2}(?:\.\d{1,2}){0,3})\.?\s+([A-Z][^.!?]{1,80})$")
+
 
 class PDFProcessor(DocumentProcessor):
     
@@ -18,90 +24,140 @@ class PDFProcessor(DocumentProcessor):
     
     def process_document(self, file_path: str, filename: str) -> ProcessedDocument:
         try:
-            file_info = self._get_file_info(file_path, filename)
-            text_content = self._extract_text_from_pdf(file_path)
-            
-            # Clean the text to remove null bytes and other problematic characters
-            text_content = self._clean_text(text_content)
-            
-            return ProcessedDocument(
-                filename=filename,
-                file_type=file_info["file_extension"],
-                content=text_content,
-                file_size=file_info["file_size_bytes"],
-                metadata={"processor": "PDFProcessor"}
-            )
-            
+            pages = self._extract_text_from_pdf(file_path)
+            return self._document(pages, file_path, filename)
+        
+        except AdmissionRejected:
+            raise
         except Exception as e:
             raise ProcessingError(f"Failed to process PDF {filename}: {str(e)}")
     
-    def _extract_text_from_pdf(self, file_path: str) -> str:
+    def build_partial(self, pages: List[Tuple[int, str]], file_path: str, filename: str) -> ProcessedDocument:
+        document = self._document(pages, file_path, filename)
+        document.metadata["partial"] = True
+        return document
+    
+    def _document(self, pages: Iterable[Tuple[int, str]], file_path: str, filename: str) -> ProcessedDocument:
+        file_info = self._get_file_info(file_path, filename)
+        text_content, spans, page_count = self._build_content(pages)
+        
+        return ProcessedDocument(
+            filename=filename,
+            file_type=file_info["file_extension"],
+            content=text_content,
+            file_size=file_info["file_size_bytes"],
+            metadata={"processor": "PDFProcessor", "pages": page_count, "spans": spans}
+        )
+    
+    def _extract_text_from_pdf(self, file_path: str) -> Iterator[Tuple[int, str]]:
+        """
+        Text of each page that has any, as (page number, text) pairs, produced
+        one page at a time so only the current page's layout is ever in memory.
+        """
         # Try pdfplumber first
-        text = self._extract_with_pdfplumber(file_path)
-        if text.strip():
-            return text
+        last_page = 0
+        try:
+            for page_num, text in self._extract_with_pdfplumber(file_path):
+                last_page = page_num
+                yield page_num, text
+        except Exception as e:
+            logger.warning(f"pdfplumber failed after page {last_page}: {e}")
+        else:
+            if last_page:
+                return
         
-        # Try PyPDF2 as fallback
-        text = self._extract_with_pypdf2(file_path)
-        if text.strip():
-            return text
+        # Try PyPDF2 as fallback, from the page pdfplumber stopped at
+        found = False
+        for page_num, text in self._extract_with_pypdf2(file_path, first_page=last_page + 1):
+            found = True
+            yield page_num, text
+        if found or last_page:
+            return
         
         # Try OCR as last resort
-        text = self._extract_with_ocr(file_path)
-        if text.strip():
-            return text
+        with pool_slot("ocr"):
+            yield from self._extract_with_ocr(file_path)
+    
+    def _build_content(self, pages: Iterable[Tuple[int, str]]) -> Tuple[str, list, int]:
+        """
+        Join the pages into one cleaned text while recording which page and
+        numbered section every stretch of it came from. Pages are consumed as
+        they arrive; only the cleaned text is kept.
+        """
+        builder = SpanBuilder()
+        page_count = 0
+        for page_num, text in pages:
+            page_count += 1
+            block = []
+            for line in text.split('\n'):
+                match = NUMBERED_HEADING.match(line.strip())
+                if match and len(line.strip()) <= 90:
+                    # Clean the text to remove null bytes and other problematic characters
+                    builder.add(self._clean_text('\n'.join(block)), page_num)
+                    block = []
+                    heading = self._clean_text(line)
+                    builder.heading(match.group(1).count('.') + 1, heading, page=page_num)
+                else:
+                    block.append(line)
+            builder.add(self._clean_text('\n'.join(block)), page_num)
         
-        return "No readable text content found in this PDF."
+        if not page_count:
+            return "No readable text content found in this PDF.", [], 0
+        content, spans = builder.build()
+        return content or "No readable text content found in this PDF.", spans, page_count
     
-    def _extract_with_pdfplumber(self, file_path: str) -> str:
-        try:
-            text_parts = []
-            with pdfplumber.open(file_path) as pdf:
-                for page in pdf.pages:
+    def _extract_with_pdfplumber(self, file_path: str) -> Iterator[Tuple[int, str]]:
+        with pdfplumber.open(file_path) as pdf:
+            for page_num, page in enumerate(pdf.pages, 1):
+                try:
                     text = page.extract_text()
-                    if text:
-                        text_parts.append(text)
-            return '\n\n'.join(text_parts)
-        except Exception:
-            return ""
+                finally:
+                    # A page keeps its parsed characters and layout (and a textmap cache
+                    # holding them) until released, about 8MB for a dense page of text
+                    page.flush_cache()
+                    page.get_textmap.cache_clear()
+                if text and text.strip():
+                    report_page(page_num, text)
+                    yield page_num, text
     
-    def _extract_with_pypdf2(self, file_path: str) -> str:
+    def _extract_with_pypdf2(self, file_path: str, first_page: int = 1) -> Iterator[Tuple[int, str]]:
         try:
-            text_parts = []
             with open(file_path, 'rb') as file:
                 pdf_reader = PyPDF2.PdfReader(file)
-                for page in pdf_reader.pages:
-                    text = page.extract_text()
-                    if text:
-                        text_parts.append(text)
-            return '\n\n'.join(text_parts)
-        except Exception:
-            return ""
+                for page_num in range(first_page, len(pdf_reader.pages) + 1):
+                    text = pdf_reader.pages[page_num - 1].extract_text()
+                    if text and text.strip():
+                        report_page(page_num, text)
+                        yield page_num, text
+        except Exception as e:
+            logger.warning(f"PyPDF2 extraction failed: {e}")
     
-    def _extract_with_ocr(self, file_path: str) -> str:
+    def _extract_with_ocr(self, file_path: str) -> List[Tuple[int, str]]:
         try:
             logger.info("Attempting OCR extraction for scanned PDF")
-            text_parts = []
+            pages = []
             
             images = convert_from_path(file_path, first_page=1, last_page=20)
             
             for page_num, image in enumerate(images, 1):
                 try:
-                    if image.mode != 'L':
-                        image = image.convert('L')
-                    
-                    text = pytesseract.image_to_string(image)
+                    with span("upload.ocr_page", processor="PDFProcessor"):
+                        if image.mode != 'L':
+                            image = image.convert('L')
+                        
+                        text = pytesseract.image_to_string(image)
                     if text.strip():
-                        text_parts.append(f"--- Page {page_num} ---\n{text}")
+                        pages.append((page_num, text))
+                        report_page(page_num, text)
                 except Exception as e:
                     logger.warning(f"OCR failed for page {page_num}: {e}")
                     continue
             
-            return '\n\n'.join(text_parts) if text_parts else ""
-            
+            return pages
+        
         except Exception as e:
             logger.warning(f"OCR extraction failed: {e}")
-            return ""
+            return []
     
     def _clean_text(self, text: str) -> str:
         """
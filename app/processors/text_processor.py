@@ -0,0 +1,155 @@
+
+import codecs
+import io
+from contextlib import contextmanager
+from typing import Iterator
+from app.processors.document_processor import DocumentProcessor, ProcessingError, SpanBuilder
+from app.models.data_models import ProcessedDocument
+
+# Enough of the file to tell UTF-8 from a legacy single-byte encoding
+SAMPLE_SIZE = 64 * 1024
+# Characters decoded and cleaned at a time
+READ_BLOCK_SIZE = 1024 * 1024
+# Text is emitted in blocks of at most this many characters, even without blank lines
+MAX_BLOCK_CHARS = 4000
+
+BOMS = [
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+]
+
+# Control characters other than tab and newline, including the NUL bytes PostgreSQL can't store
+CONTROL_CHARS = str.maketrans("", "", "".join(map(chr, [*range(9), *range(11, 32), 127])))
+# Whitespace at either end of a line; most logs and exports have none, so stripping is skipped
+LINE_EDGES = (" \n", "\n ", "\t\n", "\n\t")
+
+
+def detect_encoding(sample: bytes) -> str:
+    """Pick the encoding of a file from its first bytes: BOM, then UTF-16 without one, then UTF-8, else Latin-1."""
+    for bom, encoding in BOMS:
+        if sample.startswith(bom):
+            return encoding
+    
+    # ASCII text in UTF-16 has a NUL in every other byte, and only in those
+    even, odd = sample[0::2].count(0), sample[1::2].count(0)
+    if len(sample) % 2 == 0 and max(even, odd) > len(sample) // 4 and min(even, odd) * 8 < max(even, odd):
+        return "utf-16-le" if odd > even else "utf-16-be"
+    
+    try:
+        # Not final: the sample may end partway through a multi-byte character
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        return "latin-1"
+
+
+@contextmanager
+def open_text(file_path: str) -> Iterator[io.TextIOWrapper]:
+    """
+    Open a file for incremental decoding with the encoding detected from its
+    first ``SAMPLE_SIZE`` bytes. Bytes that encoding can't decode further on
+    become U+FFFD instead of failing the whole file.
+    """
+    with open(file_path, "rb", buffering=READ_BLOCK_SIZE) as raw:
+        encoding = detect_encoding(raw.read(SAMPLE_SIZE))
+        raw.seek(0)
+        with io.TextIOWrapper(raw, encoding=encoding, errors="replace", newline=None) as text:
+            yield text
+
+
+def read_lines(file_path: str) -> Iterator[str]:
+    with open_text(file_path) as text:
+        for line in text:
+            yield line.rstrip("\n")
+
+
+def clean_line(line: str) -> str:
+    return line.translate(CONTROL_CHARS).strip()
+
+
+def read_blocks(file_path: str) -> Iterator[str]:
+    """
+    The file's text as cleaned blocks: control characters dropped, lines
+    stripped, split at blank lines and at most ``MAX_BLOCK_CHARS`` long.
+    Works on ``READ_BLOCK_SIZE`` characters at a time with string methods
+    that run in C, so each character is handled a constant number of times.
+    """
+    pending = ""
+    with open_text(file_path) as text:
+        while True:
+            chunk = text.read(READ_BLOCK_SIZE)
+            if not chunk:
+                break
+            chunk = _clean(pending + chunk)
+            # Hold back the last paragraph (or line, if it is a long one) for the next chunk. A break
+            # at the very start counts as none, or a long final line would be carried and re-cleaned forever
+            cut = chunk.rfind("\n\n", max(len(chunk) - MAX_BLOCK_CHARS, 0))
+            if cut <= 0:
+                cut = chunk.rfind("\n")
+            if cut <= 0:
+                cut = len(chunk) - MAX_BLOCK_CHARS if len(chunk) > MAX_BLOCK_CHARS else 0
+            pending = chunk[cut:]
+            yield from _split_blocks(chunk[:cut])
+    yield from _split_blocks(pending)
+
+
+def _clean(text: str) -> str:
+    text = text.translate(CONTROL_CHARS)
+    if any(edge in text for edge in LINE_EDGES):
+        text = "\n".join(line.strip() for line in text.split("\n"))
+    return text
+
+
+def _split_blocks(text: str) -> Iterator[str]:
+    for paragraph in text.split("\n\n"):
+        start = 0
+        while start < len(paragraph):
+            end = len(paragraph)
+            if end - start > MAX_BLOCK_CHARS:
+                # Cut at the last line break that fits, or mid-line if there is none
+                end = paragraph.rfind("\n", start + 1, start + MAX_BLOCK_CHARS)
+                if end < 0:
+                    end = start + MAX_BLOCK_CHARS
+            block = paragraph[start:end].strip()
+            if block:
+                yield block
+            start = end
+
+
+class TextProcessor(DocumentProcessor):
+    """
+    Plain text, logs and CSV. The file is streamed through ``read_blocks``:
+    blank lines separate blocks, and long runs without one (logs, CSV rows)
+    are cut into blocks of ``MAX_BLOCK_CHARS`` as they are read.
+    """
+    
+    def can_process(self, file_path: str, file_type: str) -> bool:
+        text_types = ['.txt', '.text', '.log', '.csv', '.tsv']
+        return file_type.lower() in text_types or file_type in ['text/plain', 'text/csv']
+    
+    def process_document(self, file_path: str, filename: str) -> ProcessedDocument:
+        try:
+            file_info = self._get_file_info(file_path, filename)
+            text_content, spans = self._read_text_file(file_path)
+            
+            return ProcessedDocument(
+                filename=filename,
+                file_type=file_info["file_extension"],
+                content=text_content,
+                file_size=file_info["file_size_bytes"],
+                metadata={"processor": "TextProcessor", "spans": spans}
+            )
+        
+        except Exception as e:
+            raise ProcessingError(f"Failed to process text file {filename}: {str(e)}")
+    
+    def _read_text_file(self, file_path: str) -> tuple:
+        builder = SpanBuilder()
+        for block in read_blocks(file_path):
+            builder.add(block)
+        
+        content, spans = builder.build()
+        return content or "Empty text file.", spans
\ No newline at end of file
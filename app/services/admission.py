@@ -0,0 +1,371 @@
+
+import asyncio
+import logging
+import math
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, ContextManager, Deque, Dict, Iterator, List, Optional
+from app.services.metrics import registry
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+ADMISSION_WAIT = registry.histogram("researchpilot_admission_wait_seconds", "Time spent queued for a workload slot")
+ADMISSION_REJECTED = registry.counter("researchpilot_admission_rejected_total", "Requests turned away by admission control")
+
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+_session: ContextVar[str] = ContextVar("admission_session", default="")
+_slot_broker: ContextVar[Optional[Callable[[str, float], ContextManager]]] = ContextVar("slot_broker", default=None)
+
+
+@contextmanager
+def request_deadline(seconds: Optional[float]):
+    """Give the work inside the block an absolute deadline (monotonic clock)."""
+    if not seconds:
+        yield
+        return
+    
+    token = _deadline.set(time.monotonic() + seconds)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_time() -> Optional[float]:
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+@contextmanager
+def admission_session(session_id: Optional[str]) -> Iterator[None]:
+    """Queue the work inside the block as ``session_id``'s for fair sharing."""
+    token = _session.set(session_id or "")
+    try:
+        yield
+    finally:
+        _session.reset(token)
+
+
+class _Waiter:
+    
+    def __init__(self, session: str, cost: float, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.session = session
+        self.cost = cost
+        self.loop = loop
+        self.event = None if loop else threading.Event()
+        self.future = loop.create_future() if loop else None
+        self.granted = False
+    
+    def wake(self):
+        if self.loop:
+            self.loop.call_soon_threadsafe(self._resolve)
+        else:
+            self.event.set()
+    
+    def _resolve(self):
+        if not self.future.done():
+            self.future.set_result(True)
+
+
+class WorkloadPool:
+    """
+    Bounded concurrency for one workload class, shared fairly between
+    sessions. Requests beyond ``max_concurrency`` wait in a queue of at most
+    ``max_queue`` entries; anything beyond that, or waiting past its deadline,
+    is rejected right away instead of piling up. Usable from worker threads
+    and from the event loop.
+    
+    Waiting work is queued per session (see :func:`admission_session`) and
+    freed slots go round the sessions by deficit round-robin: each turn a
+    session earns one quantum and spends it on the ``cost`` of its work, so
+    a session with forty queued uploads takes turns with one that has a
+    single query instead of going first. A session may hold at most
+    ``max_per_session`` slots and queue ``max_session_queue`` more; past that
+    it gets a 429 while other sessions are still admitted.
+    """
+    
+    QUANTUM = 1.0
+    
+    def __init__(self, name: str, max_concurrency: int, max_queue: int, max_wait: float,
+                 max_per_session: Optional[int] = None, max_session_queue: Optional[int] = None):
+        self.name = name
+        self.max_concurrency = max(max_concurrency, 1)
+        self.max_queue = max(max_queue, 0)
+        self.max_wait = max_wait
+        self.max_per_session = max_per_session or self.max_concurrency
+        self.max_session_queue = self.max_queue if max_session_queue is None else max_session_queue
+        self.active = 0
+        self._queued = 0
+        self._queues: Dict[str, Deque[_Waiter]] = {}
+        self._rotation: Deque[str] = deque()
+        self._deficits: Dict[str, float] = {}
+        self._session_active: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._service_time = 1.0
+        self._wait_time = 0.0
+        self.stats = {"admitted": 0, "rejected": 0, "timed_out": 0}
+    
+    @contextmanager
+    def slot(self, cost: float = 1.0):
+        start = time.monotonic()
+        session = _session.get()
+        waiter = self._enter(session, cost, lambda: _Waiter(session, cost))
+        if waiter is not None and not waiter.event.wait(self._wait_timeout()) and not self._abandon(waiter):
+            raise self._timed_out()
+        
+        admitted = time.monotonic()
+        self._admitted(admitted - start)
+        try:
+            yield
+        finally:
+            self._release(session, time.monotonic() - admitted)
+    
+    @asynccontextmanager
+    async def async_slot(self, cost: float = 1.0):
+        start = time.monotonic()
+        session = _session.get()
+        waiter = self._enter(session, cost, lambda: _Waiter(session, cost, asyncio.get_running_loop()))
+        if waiter is not None:
+            try:
+                await asyncio.wait_for(asyncio.shield(waiter.future), self._wait_timeout())
+            except asyncio.TimeoutError:
+                if not self._abandon(waiter):
+                    raise self._timed_out()
+            except asyncio.CancelledError:
+                if self._abandon(waiter):
+                    self._release(session, None)
+                raise
+        
+        admitted = time.monotonic()
+        self._admitted(admitted - start)
+        try:
+            yield
+        finally:
+            self._release(session, time.monotonic() - admitted)
+    
+    def _enter(self, session: str, cost: float, make_waiter) -> Optional[_Waiter]:
+        remaining = remaining_time()
+        with self._lock:
+            if remaining is not None and remaining <= 0:
+                raise self._reject("deadline", "Request deadline exceeded before it could start")
+            session_active = self._session_active.get(session, 0)
+            if self.active < self.max_concurrency and not self._queued and session_active < self.max_per_session:
+                self._grant(session)
+                return None
+            if self._queued >= self.max_queue:
+                raise self._reject("queue_full", f"Server is busy ({self.name} queue is full)")
+            queue = self._queues.get(session)
+            if len(queue or ()) >= self.max_session_queue:
+                raise self._reject("session_limit", f"Too many {self.name} requests in progress for this session",
+                                   status_code=429, session=session)
+            
+            waiter = make_waiter()
+            if queue is None:
+                queue = self._queues[session] = deque()
+                self._rotation.append(session)
+                self._deficits[session] = self.QUANTUM
+            queue.append(waiter)
+            self._queued += 1
+            # Capacity may be free while the queued sessions are all at their cap
+            self._dispatch()
+            return waiter
+    
+    def _abandon(self, waiter: _Waiter) -> bool:
+        # A slot may have been handed over just as the wait gave up; keep it if so
+        with self._lock:
+            if waiter.granted:
+                return True
+            queue = self._queues[waiter.session]
+            queue.remove(waiter)
+            self._queued -= 1
+            if not queue:
+                self._drop(waiter.session)
+            return False
+    
+    def _release(self, session: str, service_time: Optional[float]):
+        with self._lock:
+            if service_time is not None:
+                self._service_time = 0.8 * self._service_time + 0.2 * service_time
+            self.active -= 1
+            remaining = self._session_active[session] - 1
+            if remaining:
+                self._session_active[session] = remaining
+            else:
+                del self._session_active[session]
+            self._dispatch()
+    
+    def _dispatch(self):
+        """Hand free slots to queued work, deficit round-robin over sessions. Caller holds the lock."""
+        while self.active < self.max_concurrency:
+            waiter = self._next_waiter()
+            if waiter is None:
+                return
+            self._grant(waiter.session)
+            waiter.granted = True
+            waiter.wake()
+    
+    def _next_waiter(self) -> Optional[_Waiter]:
+        eligible = [session for session in self._rotation
+                    if self._session_active.get(session, 0) < self.max_per_session]
+        if not eligible:
+            return None
+        
+        while True:
+            session = self._rotation[0]
+            queue = self._queues[session]
+            if self._session_active.get(session, 0) >= self.max_per_session:
+                # Sessions at their cap sit out without earning credit
+                self._rotation.rotate(-1)
+                continue
+            if self._deficits[session] >= queue[0].cost:
+                waiter = queue.popleft()
+                self._queued -= 1
+                self._deficits[session] -= waiter.cost
+                if not queue:
+                    self._drop(session)
+                return waiter
+            # This session's turn is over: it earns a quantum for the next one
+            self._deficits[session] += self.QUANTUM
+            self._rotation.rotate(-1)
+    
+    def _grant(self, session: str):
+        self.active += 1
+        self._session_active[session] = self._session_active.get(session, 0) + 1
+    
+    def _drop(self, session: str):
+        del self._queues[session]
+        del self._deficits[session]
+        self._rotation.remove(session)
+    
+    def _admitted(self, waited: float):
+        ADMISSION_WAIT.observe(waited, pool=self.name)
+        with self._lock:
+            self.stats["admitted"] += 1
+            self._wait_time = 0.8 * self._wait_time + 0.2 * waited
+    
+    def _wait_timeout(self) -> float:
+        remaining = remaining_time()
+        return self.max_wait if remaining is None else max(min(self.max_wait, remaining), 0)
+    
+    def _timed_out(self) -> "AdmissionRejected":
+        with self._lock:
+            return self._reject("timeout", f"Server is busy (waited too long for a {self.name} slot)")
+    
+    def _reject(self, reason: str, message: str, status_code: int = 503, session: Optional[str] = None) -> "AdmissionRejected":
+        key = "timed_out" if reason == "timeout" else "rejected"
+        self.stats[key] += 1
+        ADMISSION_REJECTED.inc(pool=self.name, reason=reason)
+        logger.warning(f"Rejected {self.name} work ({reason}): {self._queued} queued, {self.active} active")
+        return AdmissionRejected(message, retry_after=self._retry_after(session), status_code=status_code)
+    
+    def _retry_after(self, session: Optional[str] = None) -> int:
+        if session is not None:
+            # Only this session's own backlog stands in its way
+            backlog = (len(self._queues.get(session, ())) + 1) / self.max_per_session
+        else:
+            backlog = (self._queued + 1) / self.max_concurrency
+        return max(1, math.ceil(backlog * self._service_time))
+    
+    def queue_positions(self, session: str) -> List[int]:
+        """
+        Roughly how many queued items will be admitted before each of
+        ``session``'s, assuming unit costs: round-robin serves the other
+        sessions about once for each of this session's turns.
+        """
+        with self._lock:
+            queue = self._queues.get(session)
+            if not queue:
+                return []
+            others = [len(other) for name, other in self._queues.items() if name != session]
+            return [index + sum(min(length, index + 1) for length in others) + 1 for index in range(len(queue))]
+    
+    def get_session_status(self, session: str) -> Dict[str, Any]:
+        positions = self.queue_positions(session)
+        with self._lock:
+            return {
+                "active": self._session_active.get(session, 0),
+                "queued": len(positions),
+                "queue_positions": positions,
+                "max_per_session": self.max_per_session
+            }
+    
+    def get_status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "active": self.active,
+                "queued": self._queued,
+                "queued_sessions": len(self._queues),
+                "max_concurrency": self.max_concurrency,
+                "max_per_session": self.max_per_session,
+                "max_queue": self.max_queue,
+                "mean_wait_ms": round(self._wait_time * 1000, 1),
+                "mean_service_ms": round(self._service_time * 1000, 1),
+                **self.stats
+            }
+
+
+pools: Dict[str, WorkloadPool] = {
+    "ocr": WorkloadPool("ocr", settings.ocr_max_concurrency, settings.ocr_max_queue, settings.admission_max_wait_seconds,
+                        settings.ocr_max_per_session, settings.admission_session_max_queue),
+    "extraction": WorkloadPool("extraction", settings.extraction_max_concurrency, settings.extraction_max_queue,
+                               settings.admission_max_wait_seconds, settings.extraction_max_per_session,
+                               settings.admission_session_max_queue),
+    "llm": WorkloadPool("llm", settings.llm_max_concurrency, settings.llm_max_queue, settings.admission_max_wait_seconds,
+                        settings.llm_max_per_session, settings.admission_session_max_queue),
+}
+
+
+def get_pool(name: str) -> WorkloadPool:
+    return pools[name]
+
+
+@contextmanager
+def brokering_slots(broker: Callable[[str, float], ContextManager]) -> Iterator[None]:
+    """
+    Take the slots :func:`pool_slot` asks for inside the block from
+    ``broker(pool name, cost)`` instead of this process's pools. Extraction
+    workers use it to hold slots in the parent's pools, where the limits,
+    queues and per-session shares are kept.
+    """
+    token = _slot_broker.set(broker)
+    try:
+        yield
+    finally:
+        _slot_broker.reset(token)
+
+
+def pool_slot(name: str, cost: float = 1.0) -> ContextManager:
+    broker = _slot_broker.get()
+    return broker(name, cost) if broker is not None else get_pool(name).slot(cost)
+
+
+def get_admission_status() -> Dict[str, Dict[str, Any]]:
+    return {name: pool.get_status() for name, pool in pools.items()}
+
+
+def get_session_admission_status(session_id: Optional[str]) -> Dict[str, Dict[str, Any]]:
+    return {name: pool.get_session_status(session_id or "") for name, pool in pools.items()}
+
+
+def _collect_admission_metrics():
+    active = registry.gauge("researchpilot_admission_active", "Work currently holding a slot, per workload")
+    queued = registry.gauge("researchpilot_admission_queued", "Work waiting for a slot, per workload")
+    for name, pool in pools.items():
+        status = pool.get_status()
+        active.set(status["active"], pool=name)
+        queued.set(status["queued"], pool=name)
+
+
+registry.register_collector(_collect_admission_metrics)
+
+
+class AdmissionRejected(Exception):
+    
+    def __init__(self, message: str, retry_after: int = 1, status_code: int = 503):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.status_code = status_code
\ No newline at end of file
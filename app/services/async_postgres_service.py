@@ -0,0 +1,179 @@
+
+import logging
+from typing import Any, Dict, List, Optional
+from app.models.data_models import DocumentFilter, ProcessedDocument
+from app.services.content_codec import get_content_codec
+from app.services.database_service import AsyncDatabaseService, document_to_row, row_to_document
+from app.services.serialization import dumps_str, loads
+from config import settings
+
+try:
+    import asyncpg
+except ImportError:
+    asyncpg = None
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncPostgresService(AsyncDatabaseService):
+    """
+    Queries the documents table directly through an asyncpg pool. Used when
+    DATABASE_DSN points at the Postgres database behind Supabase.
+    """
+    
+    def __init__(self):
+        self.pool = None
+    
+    async def connect(self):
+        if asyncpg is None:
+            raise ValueError("DATABASE_DSN requires the 'asyncpg' package")
+        if not settings.database_dsn:
+            raise ValueError("DATABASE_DSN is required")
+        
+        try:
+            self.pool = await asyncpg.create_pool(
+                settings.database_dsn,
+                min_size=1,
+                max_size=settings.database_pool_size,
+                timeout=settings.database_connect_timeout_seconds,
+                command_timeout=settings.database_timeout_seconds,
+                init=self._init_connection
+            )
+            logger.info("Connected to Postgres (asyncpg)")
+        
+        except Exception as e:
+            raise ValueError(f"Postgres connection failed: {e}")
+    
+    async def disconnect(self):
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+    
+    async def store_document(self, document: ProcessedDocument) -> str:
+        if not self.pool:
+            raise ValueError("Not connected to Postgres")
+        
+        try:
+            row = document_to_row(document)
+            await self.pool.execute(
+                """INSERT INTO documents (id, filename, file_type, content, upload_date, file_size, metadata, session_id)
+                   VALUES ($1, $2, $3, $4, $5, $6, $7, $8)""",
+                row["id"], row["filename"], row["file_type"], row["content"],
+                document.upload_date, row["file_size"], row["metadata"], row["session_id"]
+            )
+            return document.id
+        
+        except Exception as e:
+            raise ValueError(f"Failed to store document: {e}")
+    
+    async def get_all_documents(self, session_id: Optional[str] = None,
+                                filters: Optional[DocumentFilter] = None) -> List[ProcessedDocument]:
+        try:
+            clause, args = _filter_clause(filters, 2)
+            rows = await self._fetch(
+                f"""SELECT * FROM documents
+                   WHERE ($1::text IS NULL OR session_id = $1){clause}
+                   ORDER BY upload_date DESC""",
+                session_id, *args
+            )
+            return [row_to_document(row) for row in rows]
+        
+        except Exception as e:
+            raise ValueError(f"Failed to retrieve documents: {e}")
+    
+    async def search_content(self, query: str, session_id: Optional[str] = None, limit: int = 10,
+                             filters: Optional[DocumentFilter] = None) -> List[ProcessedDocument]:
+        try:
+            pattern = f"%{query}%"
+            clause, args = _filter_clause(filters, 3)
+            if not get_content_codec():
+                rows = await self._fetch(
+                    f"""SELECT * FROM documents
+                       WHERE content ILIKE $1 AND ($2::text IS NULL OR session_id = $2){clause}
+                       LIMIT {limit:d}""",
+                    pattern, session_id, *args
+                )
+                return [row_to_document(row) for row in rows]
+            
+            # Compressed content can't be matched by ILIKE; those rows are matched on their
+            # uncompressed retrieval profile, so only the rows returned are decoded
+            rows = await self._fetch(
+                f"""SELECT * FROM documents
+                   WHERE ($1::text IS NULL OR session_id = $1)
+                     AND (CASE WHEN metadata->'compression' IS NULL THEN content
+                          ELSE metadata->>'profile' END) ILIKE $2{clause}
+                   LIMIT {limit:d}""",
+                session_id, pattern, *args
+            )
+            return [row_to_document(row) for row in rows]
+        
+        except Exception as e:
+            raise ValueError(f"Search failed: {e}")
+    
+    async def search_filenames(self, query: str, session_id: Optional[str] = None, limit: int = 10,
+                               filters: Optional[DocumentFilter] = None) -> List[ProcessedDocument]:
+        try:
+            clause, args = _filter_clause(filters, 3)
+            rows = await self._fetch(
+                f"""SELECT * FROM documents
+                   WHERE filename ILIKE $1 AND ($2::text IS NULL OR session_id = $2){clause}
+                   LIMIT {limit:d}""",
+                f"%{query}%", session_id, *args
+            )
+            return [row_to_document(row) for row in rows]
+        
+        except Exception as e:
+            raise ValueError(f"Search failed: {e}")
+    
+    async def get_document_profiles(self, session_id: Optional[str] = None,
+                                    filters: Optional[DocumentFilter] = None) -> List[Dict[str, Any]]:
+        try:
+            clause, args = _filter_clause(filters, 2)
+            return await self._fetch(
+                f"""SELECT id, filename, metadata->'profile' AS profile FROM documents
+                   WHERE ($1::text IS NULL OR session_id = $1){clause}""",
+                session_id, *args
+            )
+        
+        except Exception as e:
+            raise ValueError(f"Failed to retrieve document profiles: {e}")
+    
+    async def get_documents(self, document_ids: List[str]) -> List[ProcessedDocument]:
+        if not document_ids:
+            return []
+        
+        try:
+            rows = await self._fetch("SELECT * FROM documents WHERE id = ANY($1::text[])", list(document_ids))
+            return [row_to_document(row) for row in rows]
+        
+        except Exception as e:
+            raise ValueError(f"Failed to retrieve documents: {e}")
+    
+    async def _fetch(self, sql: str, *args) -> List[dict]:
+        if not self.pool:
+            raise ValueError("Not connected to Postgres")
+        
+        records = await self.pool.fetch(sql, *args)
+        return [dict(record) for record in records]
+    
+    @staticmethod
+    async def _init_connection(connection):
+        await connection.set_type_codec("jsonb", encoder=dumps_str, decoder=loads, schema="pg_catalog")
+
+def _filter_clause(filters: Optional[DocumentFilter], first: int):
+    """Render ``filters`` as extra ``AND`` conditions numbered from ``$first``."""
+    if not filters:
+        return "", []
+    
+    conditions, args = [], []
+    for column, values in (("id", filters.document_ids), ("filename", filters.filenames), ("file_type", filters.file_types)):
+        if values:
+            args.append(list(values))
+            conditions.append(f"{column} = ANY(${first + len(args) - 1}::text[])")
+    if filters.uploaded_after:
+        args.append(filters.uploaded_after)
+        conditions.append(f"upload_date >= ${first + len(args) - 1}")
+    if filters.uploaded_before:
+        args.append(filters.uploaded_before)
+        conditions.append(f"upload_date < ${first + len(args) - 1}")
+    return "".join(f" AND {condition}" for condition in conditions), args
\ No newline at end of file
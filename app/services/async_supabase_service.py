@@ -0,0 +1,169 @@
+
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+import httpx
+from app.models.data_models import DocumentFilter, ProcessedDocument
+from app.services.content_codec import get_content_codec
+from app.services.database_service import AsyncDatabaseService, document_to_row, row_to_document
+from app.services.serialization import dumps, loads
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncSupabaseService(AsyncDatabaseService):
+    """
+    Talks to the Supabase REST (PostgREST) endpoint directly over one shared,
+    pooled httpx client instead of a blocking request per call.
+    """
+    
+    def __init__(self):
+        self.client: Optional[httpx.AsyncClient] = None
+    
+    async def connect(self):
+        if not settings.supabase_url or not settings.supabase_key:
+            raise ValueError("Supabase URL and key are required")
+        
+        self.client = httpx.AsyncClient(
+            base_url=f"{settings.supabase_url.rstrip('/')}/rest/v1",
+            headers={
+                "apikey": settings.supabase_key,
+                "Authorization": f"Bearer {settings.supabase_key}",
+                "Content-Type": "application/json"
+            },
+            timeout=httpx.Timeout(
+                settings.database_timeout_seconds,
+                connect=settings.database_connect_timeout_seconds
+            ),
+            limits=httpx.Limits(
+                max_connections=settings.database_pool_size,
+                max_keepalive_connections=settings.database_pool_size
+            )
+        )
+        logger.info("Connected to Supabase (async)")
+    
+    async def disconnect(self):
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+    
+    async def store_document(self, document: ProcessedDocument) -> str:
+        if not self.client:
+            raise ValueError("Not connected to Supabase")
+        
+        try:
+            response = await self.client.post(
+                "/documents",
+                content=dumps(document_to_row(document)),
+                headers={"Prefer": "return=minimal"}
+            )
+            response.raise_for_status()
+            return document.id
+        
+        except Exception as e:
+            raise ValueError(f"Failed to store document: {e}")
+    
+    async def get_all_documents(self, session_id: Optional[str] = None, filters: Optional[DocumentFilter] = None) -> List[ProcessedDocument]:
+        try:
+            params = {"select": "*", "order": "upload_date.desc", **_filter_params(filters)}
+            if session_id:
+                params["session_id"] = f"eq.{session_id}"
+            
+            rows = await self._select(params)
+            return [row_to_document(row) for row in rows]
+        
+        except Exception as e:
+            raise ValueError(f"Failed to retrieve documents: {e}")
+    
+    async def search_content(self, query: str, session_id: Optional[str] = None, limit: int = 10,
+                             filters: Optional[DocumentFilter] = None) -> List[ProcessedDocument]:
+        try:
+            params = {"select": "*", "content": f"ilike.%{query}%", "limit": str(limit), **_filter_params(filters)}
+            if session_id:
+                params["session_id"] = f"eq.{session_id}"
+            
+            if not get_content_codec():
+                return [row_to_document(row) for row in await self._select(params)]
+            
+            # Compressed content can't be matched by ilike; those rows are matched on
+            # their uncompressed retrieval profile, in parallel with the plain rows
+            params["metadata->compression"] = "is.null"
+            compressed_params = {"select": "*", "metadata->compression": "not.is.null",
+                                 "metadata->>profile": f"ilike.%{query}%", "limit": str(limit), **_filter_params(filters)}
+            if session_id:
+                compressed_params["session_id"] = f"eq.{session_id}"
+            
+            plain_rows, compressed_rows = await asyncio.gather(
+                self._select(params),
+                self._select(compressed_params)
+            )
+            return [row_to_document(row) for row in (plain_rows + compressed_rows)[:limit]]
+        
+        except Exception as e:
+            raise ValueError(f"Search failed: {e}")
+    
+    async def search_filenames(self, query: str, session_id: Optional[str] = None, limit: int = 10,
+                               filters: Optional[DocumentFilter] = None) -> List[ProcessedDocument]:
+        try:
+            params = {"select": "*", "filename": f"ilike.%{query}%", "limit": str(limit), **_filter_params(filters)}
+            if session_id:
+                params["session_id"] = f"eq.{session_id}"
+            
+            return [row_to_document(row) for row in await self._select(params)]
+        
+        except Exception as e:
+            raise ValueError(f"Search failed: {e}")
+    
+    async def get_document_profiles(self, session_id: Optional[str] = None, filters: Optional[DocumentFilter] = None) -> List[Dict[str, Any]]:
+        try:
+            params = {"select": "id,filename,profile:metadata->profile", **_filter_params(filters)}
+            if session_id:
+                params["session_id"] = f"eq.{session_id}"
+            
+            return await self._select(params)
+        
+        except Exception as e:
+            raise ValueError(f"Failed to retrieve document profiles: {e}")
+    
+    async def get_documents(self, document_ids: List[str]) -> List[ProcessedDocument]:
+        if not document_ids:
+            return []
+        
+        try:
+            rows = await self._select({"select": "*", "id": f"in.({','.join(document_ids)})"})
+            return [row_to_document(row) for row in rows]
+        
+        except Exception as e:
+            raise ValueError(f"Failed to retrieve documents: {e}")
+    
+    async def _select(self, params: Dict[str, str]) -> List[Dict[str, Any]]:
+        if not self.client:
+            raise ValueError("Not connected to Supabase")
+        
+        response = await self.client.get("/documents", params=params)
+        response.raise_for_status()
+        return loads(response.content)
+
+
+def _quote(value: str) -> str:
+    return '"' + value.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def _filter_params(filters: Optional[DocumentFilter]) -> Dict[str, str]:
+    """
+    Query filters as one PostgREST ``and=(...)`` parameter, so they can't
+    clash with a search condition on the same column.
+    """
+    if not filters or filters.is_empty():
+        return {}
+    
+    conditions = []
+    for column, values in (("id", filters.document_ids), ("filename", filters.filenames), ("file_type", filters.file_types)):
+        if values:
+            conditions.append(f"{column}.in.({','.join(_quote(value) for value in values)})")
+    if filters.uploaded_after:
+        conditions.append(f"upload_date.gte.{_quote(filters.uploaded_after.isoformat())}")
+    if filters.uploaded_before:
+        conditions.append(f"upload_date.lt.{_quote(filters.uploaded_before.isoformat())}")
+    return {"and": f"({','.join(conditions)})"}
\ No newline at end of file
@@ -0,0 +1,184 @@
+
+import argparse
+import base64
+import hashlib
+import logging
+import re
+import zlib
+from collections import Counter
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from config import settings
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_CODECS = ("zlib", "zstd")
+
+
+class ContentCodec:
+    """
+    Compresses document text for storage in the ``content`` column.
+    Output is base64 so it still fits a TEXT column and a JSON body.
+    """
+    
+    def __init__(self, codec: str, level: int = 6, dictionary: Optional[bytes] = None, min_size: int = 0):
+        codec = codec.lower()
+        if codec not in SUPPORTED_CODECS:
+            raise CompressionError(f"Unsupported compression codec: {codec}")
+        if codec == "zstd" and zstandard is None:
+            raise CompressionError("zstd compression requires the 'zstandard' package")
+        
+        self.codec = codec
+        self.level = level
+        self.dictionary = dictionary
+        self.dictionary_id = dictionary_id(dictionary) if dictionary else None
+        self.min_size = min_size
+        
+        if codec == "zstd":
+            zstd_dict = zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+            self._zstd_compressor = zstandard.ZstdCompressor(level=level, dict_data=zstd_dict)
+            self._zstd_decompressor = zstandard.ZstdDecompressor(dict_data=zstd_dict)
+    
+    def encode(self, text: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+        raw = text.encode("utf-8")
+        if len(raw) < self.min_size:
+            return text, None
+        
+        packed = base64.b64encode(self._compress(raw)).decode("ascii")
+        if len(packed) >= len(raw):
+            return text, None
+        
+        info = {
+            "codec": self.codec,
+            "original_bytes": len(raw),
+            "stored_bytes": len(packed),
+            "ratio": round(len(raw) / len(packed), 3)
+        }
+        if self.dictionary_id:
+            info["dict_id"] = self.dictionary_id
+        return packed, info
+    
+    def decode(self, stored: str, info: Dict[str, Any]) -> str:
+        codec = info.get("codec")
+        dict_id = info.get("dict_id")
+        if dict_id and dict_id != self.dictionary_id:
+            raise CompressionError(f"Content was compressed with dictionary {dict_id}, which is not loaded")
+        
+        data = base64.b64decode(stored)
+        if codec == "zlib":
+            if dict_id:
+                decompressor = zlib.decompressobj(zdict=self.dictionary)
+                return (decompressor.decompress(data) + decompressor.flush()).decode("utf-8")
+            return zlib.decompress(data).decode("utf-8")
+        if codec == "zstd":
+            if zstandard is None:
+                raise CompressionError("zstd content found but the 'zstandard' package is not installed")
+            decompressor = self._zstd_decompressor if self.codec == "zstd" else zstandard.ZstdDecompressor()
+            return decompressor.decompress(data, max_output_size=info.get("original_bytes", 0)).decode("utf-8")
+        raise CompressionError(f"Unsupported compression codec: {codec}")
+    
+    def _compress(self, raw: bytes) -> bytes:
+        if self.codec == "zstd":
+            return self._zstd_compressor.compress(raw)
+        if self.dictionary:
+            compressor = zlib.compressobj(self.level, zdict=self.dictionary)
+            return compressor.compress(raw) + compressor.flush()
+        return zlib.compress(raw, self.level)
+
+
+def dictionary_id(dictionary: bytes) -> str:
+    return hashlib.sha1(dictionary).hexdigest()[:12]
+
+
+def train_dictionary(samples: Iterable[str], size: int = 32768, codec: str = "zlib") -> bytes:
+    samples = [sample for sample in samples if sample]
+    if not samples:
+        raise CompressionError("At least one sample is required to train a dictionary")
+    
+    if codec == "zstd":
+        if zstandard is None:
+            raise CompressionError("zstd dictionaries require the 'zstandard' package")
+        encoded = [sample.encode("utf-8") for sample in samples]
+        return zstandard.train_dictionary(size, encoded).as_bytes()
+    
+    # zlib only looks back 32 KB and matches closer data more cheaply, so the
+    # most frequent fragments go at the end of the dictionary.
+    size = min(size, 32768)
+    counts = Counter()
+    for sample in samples:
+        words = re.findall(r"\S+\s*", sample)
+        counts.update(words)
+        counts.update("".join(words[i:i + 3]) for i in range(len(words) - 2))
+    
+    fragments = []
+    total = 0
+    for fragment, count in counts.most_common():
+        if count < 2:
+            break
+        encoded = fragment.encode("utf-8")
+        if total + len(encoded) > size:
+            continue
+        fragments.append(encoded)
+        total += len(encoded)
+    
+    return b"".join(reversed(fragments))
+
+
+_codec = None
+_codec_loaded = False
+
+
+def get_content_codec() -> Optional[ContentCodec]:
+    global _codec, _codec_loaded
+    
+    if not _codec_loaded:
+        _codec_loaded = True
+        if settings.content_compression:
+            dictionary = None
+            if settings.content_compression_dictionary_path:
+                with open(settings.content_compression_dictionary_path, "rb") as file:
+                    dictionary = file.read()
+            _codec = ContentCodec(
+                settings.content_compression,
+                level=settings.content_compression_level,
+                dictionary=dictionary,
+                min_size=settings.content_compression_min_size
+            )
+            logger.info(f"Content compression enabled ({_codec.codec}, dictionary: {_codec.dictionary_id or 'none'})")
+    
+    return _codec
+
+
+def decode_content(stored: str, info: Dict[str, Any]) -> str:
+    codec = get_content_codec()
+    if codec is None:
+        codec = ContentCodec(info.get("codec", "zlib"))
+    return codec.decode(stored, info)
+
+
+class CompressionError(Exception):
+    pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train a compression dictionary from sample text files")
+    parser.add_argument("files", nargs="+")
+    parser.add_argument("--output", required=True)
+    parser.add_argument("--codec", choices=SUPPORTED_CODECS, default="zlib")
+    parser.add_argument("--size", type=int, default=32768)
+    args = parser.parse_args()
+    
+    texts = []
+    for path in args.files:
+        with open(path, "r", encoding="utf-8", errors="replace") as file:
+            texts.append(file.read())
+    
+    trained = train_dictionary(texts, size=args.size, codec=args.codec)
+    with open(args.output, "wb") as file:
+        file.write(trained)
+    print(f"Wrote {len(trained)} byte dictionary {dictionary_id(trained)} to {args.output}")
\ No newline at end of file
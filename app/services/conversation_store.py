@@ -0,0 +1,155 @@
+
+import asyncio
+import dataclasses
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Set
+from app.models.data_models import Conversation
+from app.services.shared_state import get_shared_state
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+Summarizer = Callable[[Optional[str], List[Conversation], Optional[str], Optional[str]], str]
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    limit = max_tokens * 4
+    return text if len(text) <= limit else text[:limit].rstrip() + " …"
+
+
+@dataclass
+class ConversationHistory:
+    summary: Optional[str] = None
+    turns: List[Conversation] = field(default_factory=list)
+    
+    def to_messages(self) -> List[Dict[str, str]]:
+        messages = []
+        if self.summary:
+            messages.append({"role": "system", "content": f"Summary of the earlier conversation:\n{self.summary}"})
+        for turn in self.turns:
+            messages.append({"role": "user", "content": turn.query})
+            messages.append({"role": "assistant", "content": turn.response.answer})
+        return messages
+    
+    def token_count(self) -> int:
+        return sum(estimate_tokens(message["content"]) for message in self.to_messages())
+
+
+def extractive_summary(summary: Optional[str], turns: List[Conversation], max_tokens: int) -> str:
+    """Fallback used when no model is available: keep each question and the first sentence of its answer."""
+    lines = [summary] if summary else []
+    for turn in turns:
+        answer = re.split(r"(?<=[.!?])\s", turn.response.answer.strip(), maxsplit=1)[0]
+        lines.append(f"- Q: {turn.query.strip()} A: {_truncate(answer, 50)}")
+    text = "\n".join(lines)
+    limit = max_tokens * 4
+    # Older content goes first when the summary outgrows its budget
+    return text if len(text) <= limit else "…" + text[-limit:]
+
+
+class ConversationStore:
+    """
+    Persists query/answer turns per conversation and keeps prompt history
+    bounded: the most recent turns are sent verbatim, everything older is
+    folded into a rolling summary that is recomputed in the background.
+    A conversation belongs to the session of its first turn; reads are
+    scoped to the session, and other sessions can't add turns to it.
+    """
+    
+    def __init__(self, db_service, summarizer: Optional[Summarizer] = None):
+        self.db_service = db_service
+        self.summarizer = summarizer
+        self.token_budget = settings.conversation_history_token_budget
+        self.recent_turns = settings.conversation_recent_turns
+        self.compact_after = max(settings.conversation_compact_after_turns, self.recent_turns + 1)
+        self.summary_max_tokens = settings.conversation_summary_max_tokens
+        self.state = get_shared_state()
+        self._tasks: Set[asyncio.Task] = set()
+    
+    async def check_owner(self, conversation_id: str, session_id: Optional[str]):
+        owner = await asyncio.to_thread(self.db_service.get_conversation_owner, conversation_id)
+        if owner is not None and owner["session_id"] != session_id:
+            raise ConversationAccessError(f"Conversation {conversation_id} belongs to another session")
+    
+    async def load(self, conversation_id: str, session_id: Optional[str]) -> ConversationHistory:
+        return await asyncio.to_thread(self.load_sync, conversation_id, session_id)
+    
+    def load_sync(self, conversation_id: str, session_id: Optional[str]) -> ConversationHistory:
+        summary_row = self.db_service.get_conversation_summary(conversation_id, session_id)
+        covered = summary_row["turn_count"] if summary_row else 0
+        turns = self.db_service.get_conversation_turns(conversation_id, session_id, offset=covered)
+        
+        summary = _truncate(summary_row["summary"], self.summary_max_tokens) if summary_row and summary_row["summary"] else None
+        budget = self.token_budget - (estimate_tokens(summary) if summary else 0)
+        per_turn = max(budget // 3, 50)
+        
+        # Newest turns first until the budget runs out
+        selected = []
+        for turn in reversed(turns[-self.recent_turns:] if self.recent_turns else []):
+            answer = _truncate(turn.response.answer, per_turn)
+            cost = estimate_tokens(turn.query) + estimate_tokens(answer)
+            if cost > budget:
+                break
+            budget -= cost
+            selected.append(dataclasses.replace(turn, response=dataclasses.replace(turn.response, answer=answer)))
+        
+        return ConversationHistory(summary=summary, turns=list(reversed(selected)))
+    
+    async def append(self, turn: Conversation, api_key: Optional[str] = None, model: Optional[str] = None):
+        await asyncio.to_thread(self.db_service.store_conversation_turn, turn)
+        
+        # Compaction runs after the response has been sent back
+        task = asyncio.create_task(self._compact_in_background(turn.conversation_id, turn.session_id, api_key, model))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+    
+    async def _compact_in_background(self, conversation_id: str, session_id: Optional[str], api_key: Optional[str], model: Optional[str]):
+        try:
+            await asyncio.to_thread(self.compact, conversation_id, session_id, api_key, model)
+        except Exception as e:
+            logger.warning(f"Conversation compaction failed for {conversation_id}: {e}")
+    
+    def compact(self, conversation_id: str, session_id: Optional[str], api_key: Optional[str] = None, model: Optional[str] = None) -> bool:
+        lock_key = f"conversation:compacting:{conversation_id}"
+        if not self.state.add(lock_key, "1", ttl=120):
+            return False
+        
+        try:
+            summary_row = self.db_service.get_conversation_summary(conversation_id, session_id)
+            covered = summary_row["turn_count"] if summary_row else 0
+            turns = self.db_service.get_conversation_turns(conversation_id, session_id, offset=covered)
+            if len(turns) < self.compact_after:
+                return False
+            
+            older = turns[:len(turns) - self.recent_turns]
+            previous = summary_row["summary"] if summary_row else None
+            summary = None
+            if self.summarizer:
+                try:
+                    summary = self.summarizer(previous, older, api_key, model)
+                except Exception as e:
+                    logger.info(f"Model summary unavailable, using extractive summary: {e}")
+            if not summary:
+                summary = extractive_summary(previous, older, self.summary_max_tokens)
+            
+            self.db_service.save_conversation_summary(
+                conversation_id, session_id, _truncate(summary, self.summary_max_tokens), covered + len(older)
+            )
+            logger.info(f"Compacted {len(older)} turns of conversation {conversation_id} into its summary")
+            return True
+        finally:
+            self.state.delete(lock_key)
+    
+    async def drain(self):
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+class ConversationAccessError(Exception):
+    pass
\ No newline at end of file
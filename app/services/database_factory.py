@@ -1,6 +1,10 @@
 
+import asyncio
 from typing import Optional
 from app.services.supabase_service import SupabaseService
+from app.services.async_supabase_service import AsyncSupabaseService
+from app.services.async_postgres_service import AsyncPostgresService
+from app.services.sqlite_service import SQLiteService, AsyncSQLiteService
 from config import settings
 
 
@@ -12,11 +16,28 @@ class DatabaseFactory:
         
         if database_type == "supabase":
             return SupabaseService()
+        elif database_type == "sqlite":
+            return SQLiteService()
         else:
-            raise ValueError(f"Unsupported database type: {database_type}. Only 'supabase' is supported.")
+            raise ValueError(f"Unsupported database type: {database_type}. Use 'supabase' or 'sqlite'.")
+    
+    @staticmethod
+    def create_async_database_service():
+        database_type = settings.database_type.lower()
+        
+        if settings.database_dsn:
+            return AsyncPostgresService()
+        if database_type == "supabase":
+            return AsyncSupabaseService()
+        elif database_type == "sqlite":
+            return AsyncSQLiteService(get_database_service())
+        else:
+            raise ValueError(f"Unsupported database type: {database_type}. Use 'supabase' or 'sqlite'.")
 
 
 _db_service = None
+_async_db_service = None
+_async_db_lock: Optional[asyncio.Lock] = None
 
 
 def get_database_service():
@@ -34,4 +55,27 @@ def close_database_service():
     
     if _db_service is not None:
         _db_service.disconnect()
-        _db_service = None
\ No newline at end of file
+        _db_service = None
+
+
+async def get_async_database_service():
+    global _async_db_service, _async_db_lock
+    
+    if _async_db_service is None:
+        if _async_db_lock is None:
+            _async_db_lock = asyncio.Lock()
+        async with _async_db_lock:
+            if _async_db_service is None:
+                service = DatabaseFactory.create_async_database_service()
+                await service.connect()
+                _async_db_service = service
+    
+    return _async_db_service
+
+
+async def close_async_database_service():
+    global _async_db_service
+    
+    if _async_db_service is not None:
+        await _async_db_service.disconnect()
+        _async_db_service = None
\ No newline at end of file
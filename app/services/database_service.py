@@ -1,7 +1,64 @@
 
+import asyncio
 from abc import ABC, abstractmethod
-from typing import List, Optional
-from app.models.data_models import ProcessedDocument
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from app.models.data_models import Conversation, DocumentFilter, ProcessedDocument, QueryResponse
+from app.services.content_codec import get_content_codec, decode_content
+
+
+def document_to_row(document: ProcessedDocument) -> Dict[str, Any]:
+    row = document.to_dict()
+    codec = get_content_codec()
+    if codec is None or not document.content:
+        return row
+    
+    stored, info = codec.encode(document.content)
+    if info:
+        row["content"] = stored
+        row["metadata"] = {**document.metadata, "compression": info}
+        document.metadata["compression"] = info
+    return row
+
+
+def row_to_document(row: Dict[str, Any]) -> ProcessedDocument:
+    info = (row.get("metadata") or {}).get("compression")
+    if info and row.get("content"):
+        # Rows are built fresh for each read, so decoding in place saves a copy
+        row["content"] = decode_content(row["content"], info)
+    return ProcessedDocument.from_dict(row)
+
+
+def conversation_to_row(turn: Conversation) -> Dict[str, Any]:
+    return {
+        "id": turn.id,
+        "conversation_id": turn.conversation_id,
+        "session_id": turn.session_id,
+        "query": turn.query,
+        "answer": turn.response.answer,
+        "source_documents": turn.source_documents,
+        "citations": turn.response.citations,
+        "processing_time": turn.response.processing_time,
+        "created_at": turn.timestamp.isoformat()
+    }
+
+
+def row_to_conversation(row: Dict[str, Any]) -> Conversation:
+    created_at = row.get("created_at")
+    return Conversation(
+        id=row["id"],
+        query=row.get("query") or "",
+        response=QueryResponse(
+            answer=row.get("answer") or "",
+            source_documents=row.get("source_documents") or [],
+            processing_time=row.get("processing_time") or 0.0,
+            citations=row.get("citations") or []
+        ),
+        timestamp=datetime.fromisoformat(created_at) if isinstance(created_at, str) else created_at or datetime.now(),
+        source_documents=row.get("source_documents") or [],
+        session_id=row.get("session_id"),
+        conversation_id=row.get("conversation_id")
+    )
 
 
 class DatabaseService(ABC):
@@ -14,14 +71,122 @@ class DatabaseService(ABC):
     def disconnect(self) -> None:
         pass
     
+    @abstractmethod
+    def ping(self) -> None:
+        pass
+    
     @abstractmethod
     def store_document(self, document: ProcessedDocument) -> str:
         pass
     
     @abstractmethod
-    def get_all_documents(self, session_id: Optional[str] = None) -> List[ProcessedDocument]:
+    def get_all_documents(self, session_id: Optional[str] = None, filters: Optional[DocumentFilter] = None) -> List[ProcessedDocument]:
+        pass
+    
+    @abstractmethod
+    def search_documents(self, query: str, session_id: Optional[str] = None, filters: Optional[DocumentFilter] = None) -> List[ProcessedDocument]:
+        pass
+    
+    @abstractmethod
+    def get_document_profiles(self, session_id: Optional[str] = None, filters: Optional[DocumentFilter] = None) -> List[Dict[str, Any]]:
+        """Return ``{"id", "filename", "profile"}`` for each document, without content."""
+        pass
+    
+    @abstractmethod
+    def get_storage_usage(self, session_id: Optional[str] = None) -> int:
+        pass
+    
+    @abstractmethod
+    def touch_session(self, session_id: str) -> None:
+        pass
+    
+    @abstractmethod
+    def get_idle_sessions(self, cutoff: datetime, limit: int) -> List[str]:
+        pass
+    
+    @abstractmethod
+    def get_session_document_sizes(self, session_id: str, limit: int) -> List[Dict[str, Any]]:
+        pass
+    
+    @abstractmethod
+    def delete_documents(self, document_ids: List[str], archive: bool = False) -> int:
+        pass
+    
+    @abstractmethod
+    def delete_session_activity(self, session_id: str) -> None:
+        pass
+    
+    @abstractmethod
+    def store_conversation_turn(self, turn: Conversation) -> None:
+        pass
+    
+    @abstractmethod
+    def get_conversation_turns(self, conversation_id: str, session_id: Optional[str], offset: int = 0) -> List[Conversation]:
+        pass
+    
+    @abstractmethod
+    def get_conversation_summary(self, conversation_id: str, session_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        pass
+    
+    @abstractmethod
+    def get_conversation_owner(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        """Return ``{"session_id"}`` of the conversation's first turn, or None if it has no turns yet."""
+        pass
+    
+    @abstractmethod
+    def save_conversation_summary(self, conversation_id: str, session_id: Optional[str], summary: str, turn_count: int) -> None:
+        pass
+    
+    @abstractmethod
+    def list_conversations(self, session_id: str) -> List[Dict[str, Any]]:
+        pass
+    
+    @abstractmethod
+    def delete_session_conversations(self, session_id: str) -> int:
+        pass
+
+
+class AsyncDatabaseService(ABC):
+    
+    @abstractmethod
+    async def connect(self) -> None:
         pass
     
     @abstractmethod
-    def search_documents(self, query: str, session_id: Optional[str] = None) -> List[ProcessedDocument]:
-        pass
\ No newline at end of file
+    async def disconnect(self) -> None:
+        pass
+    
+    @abstractmethod
+    async def store_document(self, document: ProcessedDocument) -> str:
+        pass
+    
+    @abstractmethod
+    async def get_all_documents(self, session_id: Optional[str] = None, filters: Optional[DocumentFilter] = None) -> List[ProcessedDocument]:
+        pass
+    
+    @abstractmethod
+    async def search_content(self, query: str, session_id: Optional[str] = None, limit: int = 10,
+                             filters: Optional[DocumentFilter] = None) -> List[ProcessedDocument]:
+        pass
+    
+    @abstractmethod
+    async def search_filenames(self, query: str, session_id: Optional[str] = None, limit: int = 10,
+                               filters: Optional[DocumentFilter] = None) -> List[ProcessedDocument]:
+        pass
+    
+    @abstractmethod
+    async def get_document_profiles(self, session_id: Optional[str] = None, filters: Optional[DocumentFilter] = None) -> List[Dict[str, Any]]:
+        """Return ``{"id", "filename", "profile"}`` for each document, without content."""
+        pass
+    
+    @abstractmethod
+    async def get_documents(self, document_ids: List[str]) -> List[ProcessedDocument]:
+        pass
+    
+    async def search_documents(self, query: str, session_id: Optional[str] = None, filters: Optional[DocumentFilter] = None) -> List[ProcessedDocument]:
+        # Both lookups are independent, so they share one round trip of latency
+        content_results, filename_results = await asyncio.gather(
+            self.search_content(query, session_id=session_id, filters=filters),
+            self.search_filenames(query, session_id=session_id, filters=filters)
+        )
+        return content_results or filename_results
\ No newline at end of file
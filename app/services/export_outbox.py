@@ -0,0 +1,226 @@
+
+import asyncio
+import logging
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+from app.models.data_models import Conversation
+from app.services.metrics import registry
+from app.services.serialization import dumps_str, loads
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+EXPORTS = registry.counter("researchpilot_exports_total", "Conversation export attempts by platform and outcome")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS export_jobs (
+    id TEXT PRIMARY KEY,
+    platform TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    checkpoint TEXT,
+    result TEXT,
+    last_error TEXT,
+    next_attempt_at REAL NOT NULL,
+    lease_until REAL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_export_jobs_due ON export_jobs(status, next_attempt_at);
+"""
+
+
+class ExportOutbox:
+    """
+    Durable queue of conversation exports. Jobs survive restarts and can be
+    claimed by any worker process sharing the file; a claim is a lease, so a
+    job held by a worker that died becomes due again once the lease runs out.
+    """
+    
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or settings.export_outbox_path
+        self.max_attempts = settings.export_max_attempts
+        self.lease_seconds = settings.export_lease_seconds
+        self._local = threading.local()
+        self._connection().executescript(SCHEMA)
+    
+    def enqueue(self, platform: str, conversation: Conversation) -> str:
+        job_id = str(uuid.uuid4())
+        now = time.time()
+        with self._connection() as connection:
+            connection.execute(
+                "INSERT INTO export_jobs (id, platform, payload, status, next_attempt_at, created_at, updated_at) "
+                "VALUES (?, ?, ?, 'pending', ?, ?, ?)",
+                (job_id, platform, dumps_str(conversation.to_dict()), now, now, now)
+            )
+        return job_id
+    
+    def claim(self, limit: int) -> List[Dict[str, Any]]:
+        now = time.time()
+        connection = self._connection()
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            rows = connection.execute(
+                "SELECT * FROM export_jobs WHERE (status = 'pending' AND next_attempt_at <= ?) "
+                "OR (status = 'in_progress' AND lease_until < ?) ORDER BY next_attempt_at LIMIT ?",
+                (now, now, limit)
+            ).fetchall()
+            if rows:
+                connection.executemany(
+                    "UPDATE export_jobs SET status = 'in_progress', lease_until = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                    [(now + self.lease_seconds, now, row["id"]) for row in rows]
+                )
+        return [self._to_job(row, claimed=True) for row in rows]
+    
+    def save_checkpoint(self, job: Dict[str, Any]):
+        """Persist delivery progress as soon as it is made, renewing the job's lease."""
+        now = time.time()
+        with self._connection() as connection:
+            connection.execute(
+                "UPDATE export_jobs SET checkpoint = ?, lease_until = ?, updated_at = ? WHERE id = ? AND status = 'in_progress'",
+                (dumps_str(job["checkpoint"]), now + self.lease_seconds, now, job["id"])
+            )
+    
+    def complete(self, job: Dict[str, Any], result: Optional[str] = None):
+        with self._connection() as connection:
+            connection.execute(
+                "UPDATE export_jobs SET status = 'done', result = ?, last_error = NULL, lease_until = NULL, updated_at = ? WHERE id = ?",
+                (result, time.time(), job["id"])
+            )
+    
+    def fail(self, job: Dict[str, Any], error: str, retryable: bool = True, retry_after: Optional[float] = None) -> bool:
+        """Record a failed attempt. Returns True when the job will be retried."""
+        retry = retryable and job["attempts"] < self.max_attempts
+        if retry_after is None:
+            delay = min(settings.export_retry_base_seconds * 2 ** (job["attempts"] - 1), settings.export_retry_max_seconds)
+            retry_after = delay * random.uniform(0.5, 1.0)
+        
+        with self._connection() as connection:
+            connection.execute(
+                "UPDATE export_jobs SET status = ?, last_error = ?, checkpoint = ?, next_attempt_at = ?, "
+                "lease_until = NULL, updated_at = ? WHERE id = ?",
+                ("pending" if retry else "failed", error, dumps_str(job["checkpoint"]),
+                 time.time() + retry_after, time.time(), job["id"])
+            )
+        return retry
+    
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute("SELECT * FROM export_jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_job(row) if row else None
+    
+    def counts(self) -> Dict[str, int]:
+        rows = self._connection().execute("SELECT status, COUNT(*) FROM export_jobs GROUP BY status").fetchall()
+        return {row[0]: row[1] for row in rows}
+    
+    def _to_job(self, row: sqlite3.Row, claimed: bool = False) -> Dict[str, Any]:
+        return {
+            "id": row["id"],
+            "platform": row["platform"],
+            "conversation": loads(row["payload"]),
+            "status": "in_progress" if claimed else row["status"],
+            "attempts": row["attempts"] + int(claimed),
+            "checkpoint": loads(row["checkpoint"]) if row["checkpoint"] else {},
+            "result": row["result"],
+            "last_error": row["last_error"],
+            "next_attempt_at": row["next_attempt_at"],
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"]
+        }
+    
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            self._local.connection = connection
+        return connection
+
+
+class ExportWorker:
+    """
+    Flushes the outbox in the background. Each platform keeps one exporter
+    (and so one pooled HTTP session); up to a batch of due jobs is delivered
+    per flush, off the event loop. Jobs are claimed one at a time, so each
+    lease starts when its delivery does rather than when the batch began.
+    """
+    
+    def __init__(self, outbox: ExportOutbox, exporters: Dict[str, Any]):
+        self.outbox = outbox
+        self.exporters = exporters
+        self.batch_size = settings.export_batch_size
+        self.poll_interval = settings.export_poll_interval_seconds
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+    
+    def notify(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+    
+    async def run_forever(self):
+        self._wakeup = asyncio.Event()
+        while True:
+            try:
+                delivered = await asyncio.to_thread(self.flush_once)
+            except Exception as e:
+                logger.error(f"Export flush failed: {e}")
+                delivered = 0
+            
+            if delivered < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+    
+    def flush_once(self) -> int:
+        delivered = 0
+        while delivered < self.batch_size:
+            jobs = self.outbox.claim(1)
+            if not jobs:
+                break
+            self._deliver(jobs[0])
+            delivered += 1
+        return delivered
+    
+    def _deliver(self, job: Dict[str, Any]):
+        platform = job["platform"]
+        exporter = self.exporters.get(platform)
+        if exporter is None:
+            self.outbox.fail(job, f"No exporter for platform '{platform}'", retryable=False)
+            EXPORTS.inc(platform=platform, outcome="failed")
+            return
+        
+        try:
+            conversation = Conversation.from_dict(job["conversation"])
+            result = exporter.export_conversation(
+                conversation, job["checkpoint"], save_checkpoint=lambda checkpoint: self.outbox.save_checkpoint(job)
+            )
+            self.outbox.complete(job, result)
+            EXPORTS.inc(platform=platform, outcome="delivered")
+        except Exception as e:
+            retryable = getattr(e, "retryable", True)
+            if self.outbox.fail(job, str(e), retryable=retryable, retry_after=getattr(e, "retry_after", None)):
+                logger.warning(f"Export {job['id']} to {platform} failed (attempt {job['attempts']}), will retry: {e}")
+                EXPORTS.inc(platform=platform, outcome="retried")
+            else:
+                logger.error(f"Export {job['id']} to {platform} failed permanently: {e}")
+                EXPORTS.inc(platform=platform, outcome="failed")
+    
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run_forever())
+    
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
\ No newline at end of file
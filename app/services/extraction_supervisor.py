@@ -0,0 +1,282 @@
+
+import logging
+import os
+import resource
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from multiprocessing.connection import Connection
+from typing import ContextManager, Dict, List, Optional
+from app.models.data_models import ProcessedDocument
+from app.processors.document_processor import ProcessingError, reporting_pages
+from app.services.admission import AdmissionRejected, brokering_slots, get_pool, remaining_time
+from app.services.metrics import registry
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+EXTRACTION_TIMEOUTS = registry.counter("researchpilot_extraction_timeouts_total", "Extractions stopped at the deadline, by processor")
+EXTRACTION_PARTIAL = registry.counter("researchpilot_extraction_partial_total", "Stopped extractions saved with the pages read so far, by reason")
+WORKER_RESTARTS = registry.counter("researchpilot_extraction_worker_restarts_total", "Extraction workers killed and replaced, by reason")
+WORKERS = registry.gauge("researchpilot_extraction_workers", "Live extraction worker processes")
+
+
+class _Worker:
+    
+    def __init__(self, memory_limit_mb: int):
+        # A fresh interpreter running this module, rather than multiprocessing's spawn,
+        # which would re-run the parent's __main__ (and with it the app's startup)
+        parent_socket, child_socket = socket.socketpair()
+        with child_socket:
+            self.process = subprocess.Popen(
+                [sys.executable, "-m", __name__, str(child_socket.fileno()), str(memory_limit_mb)],
+                pass_fds=[child_socket.fileno()],
+                start_new_session=True
+            )
+        self.connection = Connection(parent_socket.detach())
+        self.jobs = 0
+    
+    def alive(self) -> bool:
+        return self.process.poll() is None
+    
+    def stop(self):
+        try:
+            self.connection.send(None)
+            self.process.wait(timeout=2)
+        except (OSError, subprocess.TimeoutExpired):
+            pass
+        self.kill()
+    
+    def kill(self):
+        # The worker leads its own session, so OCR subprocesses it started go too
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+        self.process.wait()
+        self.connection.close()
+
+
+class ExtractionSupervisor:
+    """
+    Runs ``process_document`` in separate worker processes with a wall-clock
+    deadline and a memory limit, so a PDF that sends pdfplumber into a loop
+    or an image that hangs tesseract can be killed and its worker replaced.
+    
+    Workers send each page back as it is extracted. If the deadline passes,
+    or the worker crashes or runs out of memory, the processor builds a
+    partial document from those pages when it can (PDFs do); otherwise the
+    upload fails with a ProcessingError. Spans and metrics recorded inside
+    a worker stay in that process.
+    
+    Admission slots a processor takes (OCR) are held in this process's
+    pools on the worker's behalf, under the uploading session, and released
+    when the job ends however it ends.
+    """
+    
+    def __init__(self, workers: Optional[int] = None, timeout_seconds: Optional[float] = None,
+                 memory_limit_mb: Optional[int] = None, max_jobs: Optional[int] = None):
+        self.workers = workers or settings.extraction_max_concurrency
+        self.timeout_seconds = timeout_seconds or settings.extraction_timeout_seconds
+        self.memory_limit_mb = settings.extraction_memory_limit_mb if memory_limit_mb is None else memory_limit_mb
+        self.max_jobs = max_jobs or settings.extraction_worker_max_jobs
+        self._idle: List[_Worker] = []
+        self._live = 0
+        self._lock = threading.Lock()
+        self._stopped = False
+    
+    def start(self):
+        """Start the workers ahead of the first upload so it doesn't wait for their imports."""
+        with self._lock:
+            while self._live < self.workers:
+                self._idle.append(self._spawn())
+    
+    def stop(self):
+        with self._lock:
+            self._stopped = True
+            idle, self._idle = self._idle, []
+        for worker in idle:
+            worker.stop()
+            self._forget(worker)
+    
+    def extract(self, processor, file_path: str, filename: str) -> ProcessedDocument:
+        timeout = self.timeout_seconds
+        remaining = remaining_time()
+        if remaining is not None:
+            timeout = max(min(timeout, remaining), 0)
+        
+        name = type(processor).__name__
+        pages: Dict[int, str] = {}
+        held: List[ContextManager] = []
+        result = None
+        worker = self._acquire()
+        deadline = time.monotonic() + timeout
+        try:
+            worker.connection.send((processor, file_path, filename))
+            while result is None:
+                left = deadline - time.monotonic()
+                if left <= 0 or not worker.connection.poll(left):
+                    break
+                kind, *payload = worker.connection.recv()
+                if kind == "page":
+                    pages[payload[0]] = payload[1]
+                elif kind == "acquire":
+                    worker.connection.send(self._hold_slot(held, *payload))
+                elif kind == "release":
+                    held.pop().__exit__(None, None, None)
+                else:
+                    result = (kind, payload[0])
+        except (EOFError, OSError):
+            # The worker died mid-job: the memory limit or a crash in a native library
+            self._replace(worker, "crashed")
+            return self._partial(processor, pages, file_path, filename, "crashed",
+                                 ProcessingError(f"Extraction of {filename} crashed or ran out of memory"))
+        except Exception:
+            self._replace(worker, "crashed")
+            raise
+        finally:
+            while held:
+                held.pop().__exit__(None, None, None)
+        
+        if result is not None:
+            kind, value = result
+            if kind == "memory":
+                # Caught inside the worker, but its heap may be left fragmented
+                self._replace(worker, "memory")
+                return self._partial(processor, pages, file_path, filename, "memory", value)
+            self._release(worker)
+            if kind == "done":
+                return value
+            raise value
+        
+        self._replace(worker, "timeout")
+        EXTRACTION_TIMEOUTS.inc(processor=name)
+        return self._partial(processor, pages, file_path, filename, "timeout",
+                             ProcessingError(f"Extraction of {filename} did not finish within {timeout:.0f}s"))
+    
+    def _partial(self, processor, pages: Dict[int, str], file_path: str, filename: str, reason: str,
+                 error: ProcessingError) -> ProcessedDocument:
+        """Keep the pages a stopped worker sent back, or raise ``error`` if there are none or the processor can't."""
+        partial = processor.build_partial(sorted(pages.items()), file_path, filename) if pages else None
+        if partial is None:
+            raise error
+        
+        name = type(processor).__name__
+        partial.metadata["partial"] = True
+        partial.metadata["partial_reason"] = reason
+        EXTRACTION_PARTIAL.inc(processor=name, reason=reason)
+        logger.warning(f"{name} stopped ({reason}) on {filename}, keeping {len(pages)} pages")
+        return partial
+    
+    def _hold_slot(self, held: List[ContextManager], pool: str, cost: float) -> Optional[AdmissionRejected]:
+        slot = get_pool(pool).slot(cost)
+        try:
+            slot.__enter__()
+        except AdmissionRejected as e:
+            # Raised in the worker, so the upload is turned away as it would be inline
+            return e
+        held.append(slot)
+        return None
+    
+    def get_status(self) -> Dict[str, int]:
+        with self._lock:
+            return {"workers": self._live, "idle": len(self._idle)}
+    
+    def _acquire(self) -> _Worker:
+        with self._lock:
+            while self._idle:
+                worker = self._idle.pop()
+                if worker.alive():
+                    return worker
+                self._discard(worker)
+            return self._spawn()
+    
+    def _release(self, worker: _Worker):
+        worker.jobs += 1
+        with self._lock:
+            if not self._stopped and worker.jobs < self.max_jobs and len(self._idle) < self.workers:
+                self._idle.append(worker)
+                return
+        # Recycled now and then so leaks in the parsing libraries don't build up
+        worker.stop()
+        self._forget(worker)
+        self._top_up()
+    
+    def _replace(self, worker: _Worker, reason: str):
+        worker.kill()
+        WORKER_RESTARTS.inc(reason=reason)
+        self._forget(worker)
+        self._top_up()
+    
+    def _top_up(self):
+        with self._lock:
+            if not self._stopped and len(self._idle) < self.workers and self._live < self.workers:
+                self._idle.append(self._spawn())
+    
+    def _spawn(self) -> _Worker:
+        worker = _Worker(self.memory_limit_mb)
+        self._live += 1
+        WORKERS.set(self._live)
+        return worker
+    
+    def _discard(self, worker: _Worker):
+        worker.kill()
+        self._live -= 1
+        WORKERS.set(self._live)
+    
+    def _forget(self, worker: _Worker):
+        with self._lock:
+            self._live -= 1
+            WORKERS.set(self._live)
+
+
+@contextmanager
+def _parent_slot(connection, pool: str, cost: float):
+    # The parent replies once it holds the slot, or with the AdmissionRejected to raise
+    connection.send(("acquire", pool, cost))
+    rejected = connection.recv()
+    if rejected is not None:
+        raise rejected
+    try:
+        yield
+    finally:
+        connection.send(("release", pool))
+
+
+def _worker_main(connection, memory_limit_mb: int):
+    logging.basicConfig(level=getattr(logging, settings.log_level),
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    if memory_limit_mb:
+        limit = memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    
+    while True:
+        try:
+            job = connection.recv()
+        except (EOFError, KeyboardInterrupt):
+            return
+        if job is None:
+            return
+        
+        processor, file_path, filename = job
+        try:
+            with reporting_pages(lambda page_num, text: connection.send(("page", page_num, text))), \
+                    brokering_slots(lambda pool, cost: _parent_slot(connection, pool, cost)):
+                document = processor.process_document(file_path, filename)
+            connection.send(("done", document))
+        except Exception as e:
+            if isinstance(e, MemoryError) or isinstance(e.__context__, MemoryError):
+                connection.send(("memory", ProcessingError(f"Extraction of {filename} went over the {memory_limit_mb} MB memory limit")))
+                continue
+            try:
+                connection.send(("error", e))
+            except Exception:
+                connection.send(("error", ProcessingError(str(e))))
+
+
+if __name__ == "__main__":
+    _worker_main(Connection(int(sys.argv[1])), int(sys.argv[2]))
\ No newline at end of file
@@ -0,0 +1,146 @@
+
+import logging
+import math
+import re
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+from app.services.metrics import registry
+from app.services.retrieval import Passage, split_sentences, tokenize
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+EXTRACTIVE_ANSWERS = registry.counter(
+    "researchpilot_extractive_answers_total", "Questions answered from a quoted span versus handed to the LLM"
+)
+
+_MONTHS = r"(?:jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*"
+_DAYS = r"(?:mon|tues|wednes|thurs|fri|satur|sun)days?"
+_NUMBER_WORDS = r"(?:one|two|three|four|five|six|seven|eight|nine|ten|eleven|twelve|fifteen|twenty|thirty|forty|fifty|hundred|thousand|million)"
+_QUANTITY = rf"(?:[$€£]?\d[\d,]*(?:\.\d+)?%?|{_NUMBER_WORDS}(?:[- ]{_NUMBER_WORDS})*)"
+
+# Pattern for the kind of span that answers each question type
+ANSWER_PATTERNS = {
+    "time": re.compile(
+        rf"\b(?:{_MONTHS}\.? \d{{1,2}}(?:,? \d{{4}})?(?: at \d{{1,2}}[:.]\d{{2}})?|\d{{1,2}} {_MONTHS}(?: \d{{4}})?|"
+        rf"{_DAYS}(?: from \d{{1,2}}[:.]\d{{2}} to \d{{1,2}}[:.]\d{{2}})?|\d{{1,2}}[:.]\d{{2}}|\d{{4}}-\d{{2}}-\d{{2}}|"
+        rf"(?:within|after|before|for|in) (?:at least )?{_QUANTITY} (?:seconds?|minutes?|hours?|days?|weeks?|months?|years?))\b",
+        re.IGNORECASE
+    ),
+    "quantity": re.compile(rf"(?<![\w.]){_QUANTITY}(?: ?(?:dollars|euros|percent|items|minutes|hours|days|weeks|months|years|mL|kg|%)\b)?",
+                           re.IGNORECASE),
+    "person": re.compile(r"\b(?:(?:Dr|Prof|Professor|Mr|Mrs|Ms)\.? )?[A-Z][a-z]+(?: [A-Z][a-z]+)+\b"),
+    "place": re.compile(r"\b(?:in|at|under|next to|inside|behind|on) (?:the )?[\w -]{3,40}?(?=[,.;]|$)"),
+}
+
+_QUESTION_TYPES = [
+    (re.compile(r"^\s*(?:when|what (?:time|day|date)|by when)\b|\b(?:deadline|due|expire|how long)\b", re.IGNORECASE), "time"),
+    (re.compile(r"^\s*how (?:much|many|long|big|large|old)\b|\b(?:budget|cost|price|amount|number|percent|size|allowance)\b",
+                re.IGNORECASE), "quantity"),
+    (re.compile(r"^\s*who\b|\bwho (?:leads|runs|is)\b", re.IGNORECASE), "person"),
+    (re.compile(r"^\s*where\b", re.IGNORECASE), "place"),
+]
+
+# Explanations and comparisons need the model
+_OPEN_QUESTION = re.compile(
+    r"^\s*(?:why|how (?:do|does|did|can|should|is|are|to)|explain|describe|summari[sz]e|compare|discuss|what (?:should|are the (?:main|key)))\b",
+    re.IGNORECASE
+)
+
+
+# Words that shape the question rather than name what it is about
+_QUESTION_WORDS = frozenset({"much", "many", "long", "often", "big", "large", "old", "time", "day", "date"})
+
+
+def question_type(question: str) -> Optional[str]:
+    """Expected answer type, ``"generic"`` for other lookups, or None for open-ended questions."""
+    if _OPEN_QUESTION.search(question):
+        return None
+    for pattern, answer_type in _QUESTION_TYPES:
+        if pattern.search(question):
+            return answer_type
+    return "generic"
+
+
+@dataclass
+class ExtractiveAnswer:
+    sentence: str
+    span: Optional[str]
+    filename: str
+    confidence: float
+    citation: str = ""
+    
+    def to_markdown(self) -> str:
+        quote = self.sentence
+        if self.span:
+            quote = quote.replace(self.span, f"**{self.span}**", 1)
+        return f"> {quote}\n\n*Source: {self.citation or self.filename}*"
+
+
+class ExtractiveAnswerer:
+    """
+    Answers lookup questions by quoting one sentence from the top retrieved
+    passages. A sentence scores well when it covers the rare terms of the
+    question, contains a span of the expected kind (a date for "when", a
+    number for "how many", a name for "who") beyond the question's own
+    words, and clearly beats the runner-up.
+    """
+    
+    def __init__(self, threshold: Optional[float] = None, max_passages: int = 3):
+        self.threshold = threshold if threshold is not None else settings.extractive_confidence_threshold
+        self.max_passages = max_passages
+    
+    def answer(self, question: str, passages: List[Passage]) -> Optional[ExtractiveAnswer]:
+        candidate = self.best_candidate(question, passages)
+        outcome = "answered" if candidate and candidate.confidence >= self.threshold else "fallback"
+        EXTRACTIVE_ANSWERS.inc(outcome=outcome)
+        return candidate if outcome == "answered" else None
+    
+    def best_candidate(self, question: str, passages: List[Passage]) -> Optional[ExtractiveAnswer]:
+        answer_type = question_type(question)
+        query_terms = set(tokenize(question)) - _QUESTION_WORDS
+        if answer_type is None or not query_terms or not passages:
+            return None
+        
+        sentences = [(sentence, passage) for passage in passages[:self.max_passages]
+                     for sentence in dict.fromkeys(split_sentences(passage.text)) if not sentence.startswith("#")]
+        term_sets = [set(tokenize(sentence)) for sentence, _ in sentences]
+        idf = {term: math.log(1 + len(sentences) / (1 + sum(term in terms for terms in term_sets))) for term in query_terms}
+        total_weight = sum(idf.values())
+        
+        scored: List[Tuple[float, ExtractiveAnswer]] = []
+        for (sentence, passage), terms in zip(sentences, term_sets):
+            coverage = sum(idf[term] for term in query_terms if term in terms) / total_weight
+            if coverage == 0 or not terms - query_terms:
+                continue
+            span, type_score = self._match_type(answer_type, sentence, query_terms)
+            scored.append((coverage * (0.4 + 0.6 * type_score),
+                           ExtractiveAnswer(sentence, span, passage.filename, 0.0, passage.citation)))
+        
+        if not scored:
+            return None
+        scored.sort(key=lambda item: item[0], reverse=True)
+        best_score, best = scored[0]
+        runner_up = scored[1][0] if len(scored) > 1 else 0.0
+        margin = (best_score - runner_up) / best_score if best_score else 0.0
+        best.confidence = round(best_score * (0.75 + 0.25 * margin), 4)
+        return best
+    
+    def _match_type(self, answer_type: str, sentence: str, query_terms: set) -> Tuple[Optional[str], float]:
+        if answer_type == "generic":
+            # No expected type: any number or name the question didn't mention counts a little
+            for pattern in (ANSWER_PATTERNS["quantity"], ANSWER_PATTERNS["time"]):
+                span = self._novel_span(pattern, sentence, query_terms)
+                if span:
+                    return span, 0.6
+            return None, 0.3
+        
+        span = self._novel_span(ANSWER_PATTERNS[answer_type], sentence, query_terms)
+        return (span, 1.0) if span else (None, 0.0)
+    
+    def _novel_span(self, pattern: re.Pattern, sentence: str, query_terms: set) -> Optional[str]:
+        for match in pattern.finditer(sentence):
+            span = match.group(0).strip()
+            if span and set(tokenize(span)) - query_terms:
+                return span
+        return None
\ No newline at end of file
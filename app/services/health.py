@@ -0,0 +1,105 @@
+
+import asyncio
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+import anyio
+from app.services.admission import get_admission_status
+from app.services.shared_state import get_shared_state
+from app.services.serialization import dumps_str, loads
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class HealthMonitor:
+    """
+    Backs /status and /ready. The database probe is a single-row read whose
+    result is cached in shared state, so health checks never scan tables or
+    call the LLM, and several workers behind one balancer share one probe.
+    """
+    
+    def __init__(self, db_service, openrouter_client):
+        self.db_service = db_service
+        self.openrouter_client = openrouter_client
+        self.started_at = time.time()
+        self.cache_seconds = settings.readiness_cache_seconds
+        self.probe_timeout = settings.readiness_probe_timeout_seconds
+        self.state = get_shared_state()
+        self._probe_lock: Optional[asyncio.Lock] = None
+        self._inflight: Dict[str, int] = {}
+        self._inflight_lock = threading.Lock()
+    
+    @contextmanager
+    def track(self, workload: str):
+        with self._inflight_lock:
+            self._inflight[workload] = self._inflight.get(workload, 0) + 1
+        try:
+            yield
+        finally:
+            with self._inflight_lock:
+                self._inflight[workload] -= 1
+    
+    def liveness(self) -> Dict[str, Any]:
+        return {"status": "ok", "uptime_seconds": round(time.time() - self.started_at, 1)}
+    
+    async def readiness(self) -> Dict[str, Any]:
+        database = await self._database_status()
+        limiter = anyio.to_thread.current_default_thread_limiter()
+        with self._inflight_lock:
+            inflight = dict(self._inflight)
+        admission = get_admission_status()
+        
+        return {
+            "ready": database["reachable"],
+            "database": database,
+            "api_keys": self._key_pool_status(),
+            "ingestion": {"in_flight": inflight.get("upload", 0)},
+            "queries": {"in_flight": inflight.get("query", 0)},
+            "admission": admission,
+            "workers": {
+                "busy": limiter.borrowed_tokens,
+                "capacity": limiter.total_tokens,
+                "saturation": round(limiter.borrowed_tokens / limiter.total_tokens, 3) if limiter.total_tokens else None
+            }
+        }
+    
+    async def _database_status(self) -> Dict[str, Any]:
+        cached = self._cached_probe()
+        if cached:
+            return cached
+        
+        if self._probe_lock is None:
+            self._probe_lock = asyncio.Lock()
+        async with self._probe_lock:
+            # Concurrent health checks share one probe
+            cached = self._cached_probe()
+            if cached:
+                return cached
+            
+            start = time.perf_counter()
+            try:
+                await asyncio.wait_for(asyncio.to_thread(self.db_service.ping), timeout=self.probe_timeout)
+                probe = {"reachable": True, "error": None}
+            except asyncio.TimeoutError:
+                probe = {"reachable": False, "error": f"probe timed out after {self.probe_timeout}s"}
+            except Exception as e:
+                logger.warning(f"Database readiness probe failed: {e}")
+                probe = {"reachable": False, "error": str(e)}
+            
+            probe["latency_ms"] = round((time.perf_counter() - start) * 1000, 1)
+            probe["checked_at"] = time.time()
+            if self.cache_seconds > 0:
+                self.state.set("health:database_probe", dumps_str(probe), ttl=self.cache_seconds)
+            return probe
+    
+    def _cached_probe(self) -> Optional[Dict[str, Any]]:
+        cached = self.state.get("health:database_probe")
+        return loads(cached) if cached else None
+    
+    def _key_pool_status(self) -> Dict[str, Any]:
+        total = len(self.openrouter_client.api_keys)
+        available = total - len(self.openrouter_client.exhausted_keys)
+        return {"configured": total, "available": available}
\ No newline at end of file
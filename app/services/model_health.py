@@ -0,0 +1,143 @@
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+from app.services.metrics import model_label, registry
+from app.services.shared_state import get_shared_state
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Fewer successful calls than this and the p95 is too noisy to hedge on
+MIN_LATENCY_SAMPLES = 10
+
+CIRCUIT_OPENED = registry.counter("researchpilot_llm_circuit_opened_total", "Times a model's circuit breaker opened")
+
+
+class ModelHealth:
+    """
+    Latency and failure tracking per model for LLM calls.
+    
+    Latencies of the last ``window`` successful calls are kept per process and
+    give the p95 used as the hedge delay. Failures (timeouts, connection
+    errors, 5xx) are counted in shared state, so when ``failure_threshold``
+    of them land within ``failure_window_seconds`` the model's circuit opens
+    for every worker. While open, calls go to the fallback model or fail
+    fast instead of waiting out the timeout. Once the open window ends the
+    circuit is half-open: ``allow`` lets a single caller across all workers
+    through as a probe and turns the rest away. A success closes the
+    circuit, a failure reopens it for another window.
+    """
+    
+    def __init__(self, window: Optional[int] = None, failure_threshold: Optional[int] = None,
+                 failure_window_seconds: Optional[float] = None, open_seconds: Optional[float] = None):
+        self.window = window or settings.openrouter_latency_window
+        self.failure_threshold = failure_threshold or settings.openrouter_breaker_failures
+        self.failure_window_seconds = failure_window_seconds or settings.openrouter_breaker_window_seconds
+        self.open_seconds = open_seconds or settings.openrouter_breaker_open_seconds
+        self.state = get_shared_state()
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+    
+    def record_success(self, model: str, latency: float):
+        with self._lock:
+            self._latencies.setdefault(model, deque(maxlen=self.window)).append(latency)
+        if self.state.get(self._failures_key(model)) is not None:
+            self.state.delete(self._failures_key(model))
+        if self.state.get(self._tripped_key(model)) is not None:
+            self.state.delete(self._tripped_key(model))
+            self.state.delete(self._probe_key(model))
+            logger.info(f"Circuit closed for model {model}")
+    
+    def record_failure(self, model: str):
+        if self.state.get(self._circuit_key(model)) is not None:
+            return
+        if self.state.get(self._tripped_key(model)) is not None:
+            self._open(model, "a failed half-open probe")
+            return
+        
+        failures = self.state.incr(self._failures_key(model), ttl=self.failure_window_seconds)
+        if failures >= self.failure_threshold:
+            self.state.delete(self._failures_key(model))
+            self._open(model, f"{failures} failures")
+    
+    def release_probe(self, model: str):
+        """End a probe that got an answer saying nothing about the model's health (e.g. a 429)."""
+        if self.state.get(self._probe_key(model)) is not None:
+            self.state.delete(self._probe_key(model))
+    
+    def allow(self, model: str) -> bool:
+        """
+        Whether a call to ``model`` may go out now. In the half-open state
+        this claims the single probe, so only call it right before sending.
+        A probe whose worker never reports back is given up after another
+        open window.
+        """
+        if self.state.get(self._circuit_key(model)) is not None:
+            return False
+        if self.state.get(self._tripped_key(model)) is None:
+            return True
+        return self.state.add(self._probe_key(model), str(time.time()), ttl=self.open_seconds)
+    
+    def circuit_state(self, model: str) -> str:
+        if self.state.get(self._circuit_key(model)) is not None:
+            return "open"
+        if self.state.get(self._tripped_key(model)) is not None:
+            return "half_open"
+        return "closed"
+    
+    def is_open(self, model: str) -> bool:
+        """True until the circuit has fully closed again, half-open included."""
+        return self.circuit_state(model) != "closed"
+    
+    def percentile(self, model: str, fraction: float) -> Optional[float]:
+        with self._lock:
+            latencies = sorted(self._latencies.get(model, ()))
+        if len(latencies) < MIN_LATENCY_SAMPLES:
+            return None
+        return latencies[min(len(latencies) - 1, int(fraction * len(latencies)))]
+    
+    def hedge_delay(self, model: str) -> float:
+        p95 = self.percentile(model, 0.95)
+        return p95 if p95 is not None else settings.openrouter_hedge_default_delay_seconds
+    
+    def get_status(self) -> Dict[str, Any]:
+        with self._lock:
+            models = set(self._latencies)
+        models.update(key[len("openrouter:tripped:"):] for key in self.state.scan("openrouter:tripped:"))
+        
+        status = {}
+        for model in sorted(models):
+            with self._lock:
+                samples = len(self._latencies.get(model, ()))
+            state = self.circuit_state(model)
+            status[model] = {
+                "circuit_open": state == "open",
+                "circuit_state": state,
+                "samples": samples,
+                "p50_seconds": self.percentile(model, 0.5),
+                "p95_seconds": self.percentile(model, 0.95)
+            }
+        return status
+    
+    def _open(self, model: str, reason: str):
+        self.state.set(self._circuit_key(model), str(time.time()), ttl=self.open_seconds)
+        # Outlives the open window, marking the circuit half-open until a call succeeds
+        self.state.set(self._tripped_key(model), str(time.time()))
+        self.state.delete(self._probe_key(model))
+        CIRCUIT_OPENED.inc(model=model_label(model))
+        logger.warning(f"Circuit opened for model {model} after {reason}, skipping it for {self.open_seconds:g}s")
+    
+    def _circuit_key(self, model: str) -> str:
+        return f"openrouter:circuit:{model}"
+    
+    def _tripped_key(self, model: str) -> str:
+        return f"openrouter:tripped:{model}"
+    
+    def _probe_key(self, model: str) -> str:
+        return f"openrouter:probe:{model}"
+    
+    def _failures_key(self, model: str) -> str:
+        return f"openrouter:failures:{model}"
\ No newline at end of file
@@ -0,0 +1,80 @@
+
+import hashlib
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from app.services.metrics import registry
+
+SIGNATURE_BITS = 64
+SHINGLE_SIZE = 2
+# Whole documents are compared on their first this many tokens, which takes under a second to hash
+DOCUMENT_TOKENS = 200_000
+# Each bit of a hash gets its own lane of this many bits, so one addition counts all 64 at once
+_LANE = 32
+_SPREAD = [sum(1 << (bit * _LANE) for bit in range(8) if value >> bit & 1) for value in range(256)]
+
+NEAR_DUPLICATES = registry.counter("researchpilot_near_duplicates_total", "Near-duplicate text collapsed or flagged, by stage")
+
+
+def simhash(tokens: Sequence[str]) -> int:
+    """
+    64-bit SimHash of a token sequence over overlapping word shingles. Texts
+    that share most of their shingles get signatures a few bits apart, so
+    a later draft of a paragraph lands next to the earlier one.
+    """
+    if len(tokens) < SHINGLE_SIZE:
+        shingles = [" ".join(tokens)] if tokens else []
+    else:
+        shingles = [" ".join(tokens[i:i + SHINGLE_SIZE]) for i in range(len(tokens) - SHINGLE_SIZE + 1)]
+    if not shingles:
+        return 0
+    
+    digests = b"".join(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest() for shingle in shingles)
+    signature = 0
+    for byte in range(8):
+        # Count how often each byte value occurs at this position, then add up their bits lane-wise
+        lanes = sum(_SPREAD[value] * count for value, count in Counter(digests[byte::8]).items())
+        for bit in range(8):
+            if (lanes >> (bit * _LANE) & ((1 << _LANE) - 1)) * 2 > len(shingles):
+                signature |= 1 << (byte * 8 + bit)
+    return signature
+
+
+def distance(first: int, second: int) -> int:
+    return (first ^ second).bit_count()
+
+
+def to_hex(signature: int) -> str:
+    # Stored as a string: JSON readers outside Python can lose precision on 64-bit integers
+    return f"{signature:016x}"
+
+
+def from_hex(value: Optional[str]) -> Optional[int]:
+    return int(value, 16) if value else None
+
+
+class NearDuplicateIndex:
+    """
+    LSH lookup of signatures within ``max_distance`` bits of one already
+    added. Signatures are cut into ``max_distance + 1`` bands; two that
+    differ in at most that many bits must agree exactly on one band, so only
+    signatures sharing a band are compared, and none within range is missed.
+    """
+    
+    def __init__(self, max_distance: int):
+        self.max_distance = max_distance
+        bands = min(max_distance + 1, SIGNATURE_BITS)
+        bounds = [SIGNATURE_BITS * band // bands for band in range(bands + 1)]
+        self._bands = [(start, (1 << (end - start)) - 1) for start, end in zip(bounds, bounds[1:])]
+        self._buckets: Dict[Tuple[int, int], List[Tuple[int, Any]]] = {}
+    
+    def find(self, signature: int) -> Optional[Any]:
+        """Key of an added signature within range of ``signature``, or None."""
+        for band, (shift, mask) in enumerate(self._bands):
+            for candidate, key in self._buckets.get((band, signature >> shift & mask), ()):
+                if distance(signature, candidate) <= self.max_distance:
+                    return key
+        return None
+    
+    def add(self, signature: int, key: Any):
+        for band, (shift, mask) in enumerate(self._bands):
+            self._buckets.setdefault((band, signature >> shift & mask), []).append((signature, key))
\ No newline at end of file
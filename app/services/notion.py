@@ -1,16 +1,129 @@
 import logging
+from typing import Any, Callable, Dict, List, Optional
+import requests
+from requests.adapters import HTTPAdapter
 from app.models.data_models import Conversation
+from config import settings
 
 logger = logging.getLogger(__name__)
 
+MAX_BLOCKS_PER_REQUEST = 100
+MAX_TEXT_LENGTH = 2000
+
 
 class NotionService:
     
     def __init__(self):
-        pass
+        self.api_url = settings.notion_api_url.rstrip("/")
+        self.api_key = settings.notion_api_key
+        self.parent_page_id = settings.notion_parent_page_id
+        self.session = requests.Session()
+        self.session.headers.update({
+            'Authorization': f'Bearer {self.api_key}',
+            'Notion-Version': settings.notion_version,
+            'Content-Type': 'application/json'
+        })
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings.export_pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+    
+    def is_configured(self) -> bool:
+        return bool(self.api_key and self.parent_page_id)
     
     def save_conversation(self, conversation: Conversation) -> bool:
-        logger.warning("Notion integration not implemented")
-        return False
+        try:
+            self.export_conversation(conversation)
+            return True
+        except NotionError as e:
+            logger.error(f"Error saving conversation to Notion: {e}")
+            return False
+    
+    def export_conversation(self, conversation: Conversation, checkpoint: Optional[Dict[str, Any]] = None,
+                            save_checkpoint: Optional[Callable[[Dict[str, Any]], None]] = None) -> str:
+        """
+        Create a page under the configured parent and append the rest of the
+        conversation in batches of 100 blocks. Progress is written to
+        ``checkpoint`` and handed to ``save_checkpoint`` after every request,
+        so a retry, even after a crash, resumes appending instead of creating
+        a duplicate page.
+        """
+        save_checkpoint = save_checkpoint or (lambda checkpoint: None)
+        if not self.is_configured():
+            raise NotionError("Notion API key or parent page not configured", retryable=False)
+        
+        checkpoint = checkpoint if checkpoint is not None else {}
+        blocks = self._build_blocks(conversation)
+        
+        if not checkpoint.get("page_id"):
+            first = blocks[:MAX_BLOCKS_PER_REQUEST]
+            title = conversation.format_for_notion()["title"]
+            page = self._request("POST", "/pages", {
+                "parent": {"page_id": self.parent_page_id},
+                "properties": {"title": {"title": self._rich_text(title)}},
+                "children": first
+            })
+            checkpoint["page_id"] = page["id"]
+            checkpoint["appended"] = len(first)
+            save_checkpoint(checkpoint)
+        
+        page_id = checkpoint["page_id"]
+        while checkpoint["appended"] < len(blocks):
+            batch = blocks[checkpoint["appended"]:checkpoint["appended"] + MAX_BLOCKS_PER_REQUEST]
+            self._request("PATCH", f"/blocks/{page_id}/children", {"children": batch})
+            checkpoint["appended"] += len(batch)
+            save_checkpoint(checkpoint)
+        
+        logger.info(f"Saved conversation to Notion page {page_id} ({len(blocks)} blocks)")
+        return page_id
+    
+    def _request(self, method: str, path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            response = self.session.request(method, f"{self.api_url}{path}", json=payload, timeout=15)
+        except requests.exceptions.RequestException as e:
+            raise NotionError(f"Notion API unreachable: {e}")
+        
+        if response.status_code == 429:
+            retry_after = response.headers.get("Retry-After")
+            raise NotionError("Notion rate limit reached", retry_after=float(retry_after) if retry_after else None)
+        if response.status_code >= 400:
+            raise NotionError(
+                f"Notion API error: {response.status_code} - {response.text[:200]}",
+                retryable=response.status_code >= 500 or response.status_code == 409
+            )
+        return response.json()
+    
+    def _build_blocks(self, conversation: Conversation) -> List[Dict[str, Any]]:
+        blocks = [self._block("heading_2", "Question")]
+        blocks.extend(self._paragraphs(conversation.query))
+        blocks.append(self._block("heading_2", "Answer"))
+        blocks.extend(self._paragraphs(conversation.response.answer))
+        blocks.append(self._block("heading_2", "Source Documents"))
+        sources = conversation.source_documents or ["None"]
+        blocks.extend(self._block("bulleted_list_item", source) for source in sources)
+        blocks.append({"object": "block", "type": "divider", "divider": {}})
+        blocks.append(self._block(
+            "paragraph",
+            f"Processing time: {conversation.response.processing_time:.2f}s · "
+            f"Saved {conversation.timestamp.strftime('%Y-%m-%d %H:%M')} from Document Query System"
+        ))
+        return blocks
+    
+    def _paragraphs(self, text: str) -> List[Dict[str, Any]]:
+        lines = [line for line in (text or "").split("\n") if line.strip()]
+        return [self._block("paragraph", line) for line in lines] or [self._block("paragraph", "")]
+    
+    def _block(self, block_type: str, text: str) -> Dict[str, Any]:
+        return {"object": "block", "type": block_type, block_type: {"rich_text": self._rich_text(text)}}
+    
+    def _rich_text(self, text: str) -> List[Dict[str, Any]]:
+        # Notion caps each text object at 2000 characters
+        chunks = [text[i:i + MAX_TEXT_LENGTH] for i in range(0, len(text), MAX_TEXT_LENGTH)] or [""]
+        return [{"type": "text", "text": {"content": chunk}} for chunk in chunks]
 
 
+class NotionError(Exception):
+    
+    def __init__(self, message: str, retryable: bool = True, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
\ No newline at end of file
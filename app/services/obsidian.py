@@ -1,6 +1,7 @@
 import logging
+from typing import Any, Callable, Dict, Optional
 import requests
-from datetime import datetime
+from requests.adapters import HTTPAdapter
 from app.models.data_models import Conversation
 from config import settings
 
@@ -13,6 +14,14 @@ class ObsidianService:
         self.api_url = getattr(settings, 'obsidian_api_url', 'http://127.0.0.1:27123')
         self.api_key = getattr(settings, 'obsidian_api_key', None)
         self.vault_path = getattr(settings, 'obsidian_vault_path', None)
+        self.session = requests.Session()
+        self.session.headers.update({'Authorization': f'Bearer {self.api_key}'})
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings.export_pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+    
+    def is_configured(self) -> bool:
+        return bool(self.api_key)
     
     def connect(self) -> bool:
         if not settings.mcp_enabled or not self.api_key:
@@ -20,31 +29,35 @@ class ObsidianService:
             return False
         
         try:
-            headers = {
-                'Authorization': f'Bearer {self.api_key}',
-                'Content-Type': 'application/json'
-            }
-            
-            response = requests.get(f"{self.api_url}/", headers=headers, timeout=5)
+            response = self.session.get(f"{self.api_url}/", timeout=5)
             return response.status_code == 200
-            
+        
         except Exception as e:
             logger.error(f"Obsidian API connection failed: {e}")
             return False
     
     def disconnect(self):
-        pass
+        self.session.close()
     
     def save_conversation(self, conversation: Conversation) -> bool:
-        if not self.api_key:
-            logger.error("Obsidian API key not configured")
+        try:
+            self.export_conversation(conversation)
+            return True
+        except ObsidianError as e:
+            logger.error(f"Error saving conversation to Obsidian: {e}")
             return False
+    
+    def export_conversation(self, conversation: Conversation, checkpoint: Optional[Dict[str, Any]] = None,
+                            save_checkpoint: Optional[Callable[[Dict[str, Any]], None]] = None) -> str:
+        if not self.api_key:
+            raise ObsidianError("Obsidian API key not configured", retryable=False)
         
-        try:
-            timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
-            filename = f"Document Query - {timestamp}.md"
-            
-            content = f"""# Document Query - {datetime.now().strftime("%Y-%m-%d %H:%M")}
+        # The note name comes from the conversation itself, so a retried
+        # export overwrites its own note instead of creating a second one
+        timestamp = conversation.timestamp.strftime("%Y%m%d-%H%M%S")
+        filename = f"Document Query - {timestamp} {conversation.id[:8]}.md"
+        
+        content = f"""# Document Query - {conversation.timestamp.strftime("%Y-%m-%d %H:%M")}
 
 ## Question
 {conversation.query}
@@ -59,28 +72,27 @@ class ObsidianService:
 *Processing time: {conversation.response.processing_time:.2f}s*
 *Saved from Document Query System*
 """
-            
-            headers = {
-                'Authorization': f'Bearer {self.api_key}',
-                'Content-Type': 'text/plain'
-            }
-            
-            response = requests.put(
+        
+        try:
+            response = self.session.put(
                 f"{self.api_url}/vault/{filename}",
-                headers=headers,
-                data=content,
+                headers={'Content-Type': 'text/plain'},
+                data=content.encode('utf-8'),
                 timeout=10
             )
-            
-            if response.status_code in [200, 201, 204]:  # 204 = No Content (success)
-                logger.info(f"Successfully saved conversation to Obsidian: {filename}")
-                return True
-            else:
-                logger.error(f"Failed to save to Obsidian: {response.status_code} - {response.text}")
-                return False
-            
-        except Exception as e:
-            logger.error(f"Error saving conversation to Obsidian: {e}")
-            return False
+        except requests.exceptions.RequestException as e:
+            raise ObsidianError(f"Obsidian API unreachable: {e}")
+        
+        if response.status_code in [200, 201, 204]:  # 204 = No Content (success)
+            logger.info(f"Successfully saved conversation to Obsidian: {filename}")
+            return filename
+        
+        retryable = response.status_code == 429 or response.status_code >= 500
+        raise ObsidianError(f"Failed to save to Obsidian: {response.status_code} - {response.text[:200]}", retryable=retryable)
 
 
+class ObsidianError(Exception):
+    
+    def __init__(self, message: str, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
\ No newline at end of file
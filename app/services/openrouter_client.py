@@ -1,44 +1,65 @@
 
+import contextvars
+import hashlib
 import logging
 import time
-from typing import Dict, List, Any
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, List, Any, Optional, Set, Tuple
 import requests
+from app.services.admission import remaining_time
+from app.services.metrics import registry
+from app.services.model_health import ModelHealth
+from app.services.serialization import dumps, loads
+from app.services.shared_state import get_shared_state
+from app.services.usage import Usage, get_usage_tracker
 from config import settings, get_openrouter_api_keys
 
 logger = logging.getLogger(__name__)
 
+HEDGES = registry.counter("researchpilot_llm_hedges_total", "Backup LLM requests fired by hedging, by which request answered first")
+
 
 class OpenRouterClient:
     
     def __init__(self, model: str = None):
-        self.base_url = "https://openrouter.ai/api/v1"
+        self.base_url = settings.openrouter_base_url.rstrip("/")
         self.model = model or settings.openrouter_model
         self.timeout = 30
         self.session = requests.Session()
         self.api_keys = get_openrouter_api_keys()
-        self.current_key_index = 0
-        self.exhausted_keys = set()
+        self.cooldown_seconds = settings.openrouter_key_cooldown_seconds
+        # Cooldowns and the rotation counter live in shared state so every
+        # worker process skips a key as soon as one of them hits its limit.
+        self.state = get_shared_state()
+        self.health = ModelHealth()
+        # Threads start on first use, so this costs nothing while hedging is off
+        self._hedge_executor = ThreadPoolExecutor(max_workers=settings.llm_max_concurrency * 2,
+                                                  thread_name_prefix="llm-hedge")
+    
+    @property
+    def exhausted_keys(self) -> Set[str]:
+        # The configured keys are known, so their cooldowns are read directly rather than scanned for
+        cooldown_keys = {f"openrouter:cooldown:{self._fingerprint(key)}": key for key in self.api_keys}
+        return {cooldown_keys[name] for name in self.state.get_many(list(cooldown_keys))}
     
     def get_current_api_key(self) -> str:
         if not self.api_keys:
             raise OpenRouterError("No OpenRouter API keys configured")
         
-        available_keys = [key for key in self.api_keys if key not in self.exhausted_keys]
+        exhausted = self.exhausted_keys
+        available_keys = [key for key in self.api_keys if key not in exhausted]
         if not available_keys:
-            logger.warning("All API keys exhausted, resetting exhausted keys list")
-            self.exhausted_keys.clear()
+            logger.warning("All API keys are cooling down, using the full key list")
             available_keys = self.api_keys
         
-        if self.current_key_index >= len(available_keys):
-            self.current_key_index = 0
-        
-        return available_keys[self.current_key_index]
+        rotation = int(self.state.get("openrouter:rotation") or 0)
+        return available_keys[rotation % len(available_keys)]
     
     def rotate_api_key(self):
         current_key = self.get_current_api_key()
-        self.exhausted_keys.add(current_key)
-        self.current_key_index = (self.current_key_index + 1) % len(self.api_keys)
-        logger.info(f"Rotated to next API key (index: {self.current_key_index})")
+        self.state.set(f"openrouter:cooldown:{self._fingerprint(current_key)}", str(time.time()), ttl=self.cooldown_seconds)
+        self.state.incr("openrouter:rotation")
+        logger.info(f"Rotated to next API key, previous key cooling down for {self.cooldown_seconds}s")
     
     def chat_completion(self, messages: List[Dict[str, str]], max_tokens: int = None, api_key: str = None, model: str = None) -> Dict[str, Any]:
         # Use runtime credentials if provided, otherwise fall back to configured keys
@@ -51,43 +72,37 @@ class OpenRouterClient:
         api_key_preview = use_api_key[:8] + "..." if len(use_api_key) > 8 else "short_key"
         logger.info(f"Using OpenRouter API key: {api_key_preview}, model: {use_model}")
         
-        headers = {
-            'Authorization': f'Bearer {use_api_key}',
-            'HTTP-Referer': settings.openrouter_site_url,
-            'X-Title': settings.openrouter_site_name,
-            'Content-Type': 'application/json',
-        }
-        
-        payload = {
-            'model': use_model,
-            'messages': messages,
-            'provider': {'sort': 'throughput'}
-        }
-        
-        if max_tokens:
-            payload['max_tokens'] = max_tokens
-        
-        if settings.openrouter_enable_reasoning and 'grok' in use_model.lower():
-            payload['extra_body'] = {"reasoning": {"enabled": True}}
-        
         for attempt in range(3):
+            # Attempts and backoff never outlive the caller's request deadline
+            remaining = remaining_time()
+            if remaining is not None and remaining <= 0:
+                raise OpenRouterError("Request deadline exceeded while waiting for the AI service")
+            
             try:
                 start_time = time.time()
+                attempt_model = self._select_model(use_model)
+                timeout = self.timeout if remaining is None else min(self.timeout, remaining)
                 
-                response = self.session.post(
-                    f"{self.base_url}/chat/completions",
-                    headers=headers,
-                    json=payload,
-                    timeout=self.timeout
-                )
+                backup = self._backup_target(attempt_model, use_api_key, runtime_key=bool(api_key))
+                if backup:
+                    response, served_model, served_key = self._hedged_post(
+                        messages, max_tokens, (attempt_model, use_api_key), backup, timeout, pooled_key=not api_key
+                    )
+                else:
+                    response = self._post(messages, max_tokens, attempt_model, use_api_key, timeout)
+                    served_model, served_key = attempt_model, use_api_key
                 
                 processing_time = time.time() - start_time
                 
                 if response.status_code == 429:
                     if attempt < 2:
+                        if not api_key and len(self.api_keys) > 1:
+                            self.rotate_api_key()
+                            use_api_key = self.get_current_api_key()
+                            continue
                         wait_time = (2 ** attempt) * 1
                         logger.warning(f"Rate limited, retrying in {wait_time}s...")
-                        time.sleep(wait_time)
+                        self._backoff(wait_time)
                         continue
                     raise OpenRouterError("API key rate limited. Please wait or use a different key.")
                 
@@ -96,34 +111,182 @@ class OpenRouterClient:
                 
                 response.raise_for_status()
                 
-                result = response.json()
+                result = loads(response.content)
                 result['processing_time'] = processing_time
+                get_usage_tracker().record(
+                    Usage.from_response(result), served_model, self._fingerprint(served_key), pooled_key=not api_key
+                )
                 return result
-                
+            
             except requests.exceptions.RequestException as e:
                 if attempt < 2:
                     wait_time = (2 ** attempt) * 1
                     logger.warning(f"Network error, retrying in {wait_time}s: {e}")
-                    time.sleep(wait_time)
+                    self._backoff(wait_time)
                     continue
                 else:
                     raise OpenRouterError(f"Network error: {str(e)}")
         
         raise OpenRouterError("Failed to get response from OpenRouter")
     
+    def _select_model(self, model: str) -> str:
+        if self.health.allow(model):
+            return model
+        
+        fallback = settings.openrouter_fallback_model
+        if fallback and fallback != model and self.health.allow(fallback):
+            logger.info(f"Circuit open for {model}, using fallback model {fallback}")
+            return fallback
+        raise OpenRouterError(f"Model {model} is temporarily unavailable after repeated failures")
+    
+    def _backup_target(self, model: str, api_key: str, runtime_key: bool) -> Optional[Tuple[str, str]]:
+        if not settings.openrouter_hedge_enabled:
+            return None
+        
+        # Only a fully closed model backs up a call; a half-open one's probe is claimed by _select_model
+        fallback = settings.openrouter_fallback_model
+        if fallback and fallback != model and not self.health.is_open(fallback):
+            return fallback, api_key
+        # Without a fallback model, hedge on another pooled key; a caller's own key is never swapped
+        if not runtime_key:
+            exhausted = self.exhausted_keys
+            spare_keys = [key for key in self.api_keys if key != api_key and key not in exhausted]
+            if spare_keys:
+                return model, spare_keys[0]
+        return None
+    
+    def _post(self, messages: List[Dict[str, str]], max_tokens: Optional[int], model: str, api_key: str,
+              timeout: float) -> requests.Response:
+        """Send one request, recording its latency or failure against ``model``."""
+        start_time = time.time()
+        try:
+            response = self.session.post(
+                f"{self.base_url}/chat/completions",
+                headers=self._headers(api_key),
+                data=dumps(self._payload(messages, max_tokens, model)),
+                timeout=timeout
+            )
+        except requests.exceptions.RequestException:
+            self.health.record_failure(model)
+            raise
+        
+        if response.status_code >= 500:
+            self.health.record_failure(model)
+        elif response.ok:
+            self.health.record_success(model, time.time() - start_time)
+        else:
+            self.health.release_probe(model)
+        return response
+    
+    def _hedged_post(self, messages: List[Dict[str, str]], max_tokens: Optional[int], primary: Tuple[str, str],
+                     backup: Tuple[str, str], timeout: float, pooled_key: bool) -> Tuple[requests.Response, str, str]:
+        """
+        Send to ``primary`` (model, key); if it hasn't answered within the
+        model's observed p95, also send to ``backup`` and take the first good
+        answer. The slower request can't be cancelled mid-flight, so it is
+        left to finish and its tokens are still recorded.
+        """
+        delay = self.health.hedge_delay(primary[0])
+        if delay >= timeout:
+            return self._post(messages, max_tokens, *primary, timeout), primary[0], primary[1]
+        
+        start_time = time.time()
+        submit = lambda target, seconds: self._hedge_executor.submit(
+            contextvars.copy_context().run, self._post, messages, max_tokens, *target, seconds
+        )
+        pending = {submit(primary, timeout): primary}
+        done, _ = wait(pending, timeout=delay)
+        hedged = not done
+        if hedged:
+            logger.info(f"No response from {primary[0]} after {delay:.1f}s, sending a hedged request to {backup[0]}")
+            pending[submit(backup, timeout - (time.time() - start_time))] = backup
+        
+        failed_response, error = None, None
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                target = pending.pop(future)
+                try:
+                    response = future.result()
+                except requests.exceptions.RequestException as e:
+                    error = e
+                    continue
+                if not response.ok:
+                    failed_response = (response, *target)
+                    continue
+                
+                if hedged:
+                    HEDGES.inc(winner="backup" if target is backup else "primary")
+                for other, other_target in pending.items():
+                    other.add_done_callback(self._usage_recorder(*other_target, pooled_key))
+                return response, target[0], target[1]
+        
+        if failed_response:
+            return failed_response
+        raise error
+    
+    def _usage_recorder(self, model: str, api_key: str, pooled_key: bool):
+        context = contextvars.copy_context()
+        
+        def record(future):
+            try:
+                response = future.result()
+                if response.ok:
+                    context.run(get_usage_tracker().record, Usage.from_response(loads(response.content)), model,
+                                self._fingerprint(api_key), pooled_key=pooled_key)
+            except Exception as e:
+                logger.debug(f"Abandoned hedged request to {model} failed: {e}")
+        return record
+    
+    def _headers(self, api_key: str) -> Dict[str, str]:
+        return {
+            'Authorization': f'Bearer {api_key}',
+            'HTTP-Referer': settings.openrouter_site_url,
+            'X-Title': settings.openrouter_site_name,
+            'Content-Type': 'application/json',
+        }
+    
+    def _payload(self, messages: List[Dict[str, str]], max_tokens: Optional[int], model: str) -> Dict[str, Any]:
+        payload = {
+            'model': model,
+            'messages': messages,
+            'provider': {'sort': 'throughput'},
+            'usage': {'include': True}
+        }
+        
+        if max_tokens:
+            payload['max_tokens'] = max_tokens
+        
+        if settings.openrouter_enable_reasoning and 'grok' in model.lower():
+            payload['extra_body'] = {"reasoning": {"enabled": True}}
+        return payload
+    
+    def _backoff(self, wait_time: float):
+        remaining = remaining_time()
+        if remaining is not None and remaining <= wait_time:
+            raise OpenRouterError("Request deadline exceeded while waiting for the AI service")
+        time.sleep(wait_time)
+    
     def get_api_key_status(self) -> Dict[str, Any]:
+        exhausted = self.exhausted_keys
+        current_key = self.get_current_api_key() if self.api_keys else None
         return {
             "total_keys": len(self.api_keys),
-            "current_key_index": self.current_key_index,
-            "exhausted_keys": len(self.exhausted_keys),
-            "available_keys": len(self.api_keys) - len(self.exhausted_keys),
-            "current_key_preview": self.get_current_api_key()[:8] + "..." if self.api_keys else "None"
+            "current_key_index": self.api_keys.index(current_key) if current_key else 0,
+            "exhausted_keys": len(exhausted),
+            "available_keys": len(self.api_keys) - len(exhausted),
+            "current_key_preview": current_key[:8] + "..." if current_key else "None"
         }
     
     def reset_exhausted_keys(self):
-        self.exhausted_keys.clear()
+        for key in self.api_keys:
+            self.state.delete(f"openrouter:cooldown:{self._fingerprint(key)}")
         logger.info("Reset all exhausted API keys")
     
+    def _fingerprint(self, api_key: str) -> str:
+        # Keys are never written to shared state in the clear
+        return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+    
     def extract_response_content(self, api_response: Dict[str, Any]) -> str:
         try:
             choices = api_response.get('choices', [])
@@ -147,7 +310,7 @@ class OpenRouterClient:
                     pass
             
             return content.strip()
-            
+        
         except KeyError as e:
             raise OpenRouterError(f"Invalid response structure: {e}")
         except Exception as e:
@@ -168,7 +331,7 @@ class OpenRouterClient:
             }
             
             return result
-            
+        
         except KeyError as e:
             raise OpenRouterError(f"Invalid response structure: {e}")
         except Exception as e:
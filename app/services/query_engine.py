@@ -1,10 +1,20 @@
 
+import asyncio
 import logging
 import time
-from typing import List, Optional
+from typing import List, Optional, Tuple
+from app.services.admission import AdmissionRejected, get_pool
+from app.services.conversation_store import ConversationAccessError, ConversationHistory, ConversationStore
+from app.services.extractive_answer import ExtractiveAnswer, ExtractiveAnswerer
 from app.services.openrouter_client import OpenRouterClient, OpenRouterError
-from app.services.database_factory import get_database_service
-from app.models.data_models import ProcessedDocument, QueryResponse
+from app.services.database_factory import get_database_service, get_async_database_service
+from app.services.metrics import span
+from app.services.near_duplicates import NEAR_DUPLICATES, NearDuplicateIndex
+from app.services.retrieval import HierarchicalRetriever, Passage, ensure_profile, profile_signature
+from app.services.segment_index import get_segment_index
+from app.services.usage import TokenBudgetExceeded, get_usage_tracker
+from app.models.data_models import Conversation, DocumentFilter, ProcessedDocument, QueryResponse
+from config import settings
 
 logger = logging.getLogger(__name__)
 
@@ -16,57 +26,192 @@ class QueryEngine:
         self.max_tokens = 4000
         self.max_documents = 5
         self.db_service = None
+        self.retriever = HierarchicalRetriever(index=get_segment_index() if settings.segment_index_enabled else None)
+        self.extractor = ExtractiveAnswerer()
+        self._conversations = None
     
-    def process_query(self, question: str, api_key: Optional[str] = None, model: Optional[str] = None, session_id: Optional[str] = None) -> QueryResponse:
+    @property
+    def conversations(self) -> ConversationStore:
+        if self._conversations is None:
+            if not self.db_service:
+                self.db_service = get_database_service()
+            self._conversations = ConversationStore(self.db_service, summarizer=self._summarize_turns)
+        return self._conversations
+    
+    async def process_query(self, question: str, api_key: Optional[str] = None, model: Optional[str] = None, session_id: Optional[str] = None,
+                            conversation_id: Optional[str] = None, extractive: Optional[bool] = None,
+                            filters: Optional[DocumentFilter] = None) -> QueryResponse:
         start_time = time.time()
+        if filters and filters.is_empty():
+            filters = None
         
         try:
-            relevant_docs = self._get_relevant_documents(question, session_id=session_id)
+            if conversation_id:
+                conversation_id = await self._check_conversation(conversation_id, session_id)
+            passages = await self._get_relevant_passages(question, session_id=session_id, filters=filters)
+            extracted = await asyncio.to_thread(self._extract_answer, question, passages, extractive)
+            if extracted:
+                response = QueryResponse(
+                    answer=extracted.to_markdown(),
+                    source_documents=[extracted.filename],
+                    confidence_score=extracted.confidence,
+                    processing_time=time.time() - start_time,
+                    citations=[extracted.citation]
+                )
+                if conversation_id:
+                    await self._save_turn(question, response, session_id, conversation_id, api_key, model)
+                return response
             
-            if not relevant_docs:
-                raise QueryEngineError("No documents available to search")
+            citations = []
+            if passages:
+                with span("query.pack"):
+                    context, packed = self._build_passage_context(passages)
+                # Only what fitted in the budget was shown to the model
+                source_docs = list(dict.fromkeys(passage.filename for passage in packed))
+                citations = list(dict.fromkeys(passage.citation for passage in packed))
+            else:
+                relevant_docs = await self._get_relevant_documents(question, session_id=session_id, filters=filters)
+                
+                if not relevant_docs:
+                    raise QueryEngineError("No documents match the query filters" if filters else "No documents available to search")
+                
+                with span("query.pack"):
+                    # Profiling and SimHashing whole documents is CPU work, kept off the event loop
+                    context = await asyncio.to_thread(self._build_context, relevant_docs)
+                source_docs = [doc.filename for doc in relevant_docs]
             
-            context = self._build_context(relevant_docs)
-            ai_response = self._generate_ai_response(question, context, api_key=api_key, model=model)
-            source_docs = [doc.filename for doc in relevant_docs]
+            history = await self._load_history(conversation_id, session_id)
+            await asyncio.to_thread(get_usage_tracker().check_budget, session_id)
+            async with get_pool("llm").async_slot():
+                ai_response = await asyncio.to_thread(
+                    self._generate_ai_response, question, context, api_key=api_key, model=model, history=history
+                )
             
-            return QueryResponse(
+            response = QueryResponse(
                 answer=ai_response,
                 source_documents=source_docs,
-                processing_time=time.time() - start_time
+                processing_time=time.time() - start_time,
+                citations=citations
             )
-            
+            if conversation_id:
+                await self._save_turn(question, response, session_id, conversation_id, api_key, model)
+            return response
+        
+        except (AdmissionRejected, TokenBudgetExceeded, ConversationAccessError):
+            raise
         except Exception as e:
             logger.error(f"Query processing failed: {e}")
             raise QueryEngineError(f"Failed to process query: {str(e)}")
     
-    def _get_relevant_documents(self, question: str, session_id: Optional[str] = None) -> List[ProcessedDocument]:
+    async def _get_relevant_passages(self, question: str, session_id: Optional[str] = None,
+                                     filters: Optional[DocumentFilter] = None) -> List[Passage]:
+        if settings.retrieval_strategy != "hierarchical":
+            return []
+        
         try:
-            if not self.db_service:
-                self.db_service = get_database_service()
-            
-            search_results = self.db_service.search_documents(question, session_id=session_id)
+            db_service = await get_async_database_service()
+            return await self.retriever.retrieve(db_service, question, session_id=session_id, filters=filters)
+        except Exception as e:
+            # Falls back to whole-document search
+            logger.warning(f"Hierarchical retrieval failed: {e}")
+            return []
+    
+    def _extract_answer(self, question: str, passages: List[Passage], extractive: Optional[bool]) -> Optional[ExtractiveAnswer]:
+        enabled = settings.extractive_answers_enabled if extractive is None else extractive
+        if not enabled or not passages:
+            return None
+        
+        with span("query.extract"):
+            return self.extractor.answer(question, passages)
+    
+    async def _get_relevant_documents(self, question: str, session_id: Optional[str] = None,
+                                      filters: Optional[DocumentFilter] = None) -> List[ProcessedDocument]:
+        try:
+            db_service = await get_async_database_service()
+            with span("query.search"):
+                search_results = await db_service.search_documents(question, session_id=session_id, filters=filters)
             
             if search_results:
                 return search_results[:self.max_documents]
             
             logger.info("No specific search results found, using all available documents")
-            all_docs = self.db_service.get_all_documents(session_id=session_id)
+            with span("query.fetch"):
+                all_docs = await db_service.get_all_documents(session_id=session_id, filters=filters)
             return all_docs[:self.max_documents]
-                
+        
         except Exception as e:
             logger.error(f"Error retrieving documents: {e}")
             logger.error("Database unavailable - please upload documents first or check your connection")
             raise QueryEngineError("No documents available to search. Please upload documents first or check your database connection.")
     
+    async def _check_conversation(self, conversation_id: str, session_id: Optional[str]) -> Optional[str]:
+        try:
+            await self.conversations.check_owner(conversation_id, session_id)
+            return conversation_id
+        except ConversationAccessError:
+            raise
+        except Exception as e:
+            # Without knowing the owner, the query is answered without history and isn't saved
+            logger.warning(f"Could not check owner of conversation {conversation_id}: {e}")
+            return None
+    
+    async def _load_history(self, conversation_id: Optional[str], session_id: Optional[str]) -> Optional[ConversationHistory]:
+        if not conversation_id:
+            return None
+        
+        try:
+            with span("query.history"):
+                return await self.conversations.load(conversation_id, session_id)
+        except Exception as e:
+            # Answering without history beats failing the query
+            logger.warning(f"Could not load conversation {conversation_id}: {e}")
+            return None
+    
+    async def _save_turn(self, question: str, response: QueryResponse, session_id: Optional[str], conversation_id: str,
+                         api_key: Optional[str], model: Optional[str]):
+        turn = Conversation(
+            query=question,
+            response=response,
+            source_documents=response.source_documents,
+            session_id=session_id,
+            conversation_id=conversation_id
+        )
+        try:
+            await self.conversations.append(turn, api_key=api_key, model=model)
+        except Exception as e:
+            logger.warning(f"Could not save conversation turn: {e}")
+    
+    def _summarize_turns(self, summary: Optional[str], turns: List[Conversation], api_key: Optional[str], model: Optional[str]) -> str:
+        transcript = "\n\n".join(f"User: {turn.query}\nAssistant: {turn.response.answer}" for turn in turns)
+        previous = f"Summary so far:\n{summary}\n\n" if summary else ""
+        messages = [
+            {"role": "system", "content": "You condense conversations about a user's documents. Keep facts, names, numbers, "
+                                          "document and section references, and what the user is trying to find out. "
+                                          "Reply with the summary only."},
+            {"role": "user", "content": f"{previous}New turns:\n{transcript}\n\nWrite the updated summary in under 150 words."}
+        ]
+        
+        with get_pool("llm").slot():
+            api_response = self.openrouter_client.chat_completion(messages, max_tokens=300, api_key=api_key, model=model)
+        return self.openrouter_client.extract_response_content(api_response)
+    
     def _build_context(self, documents: List[ProcessedDocument]) -> str:
         if not documents:
             return "No documents available."
         
         context_parts = []
         current_tokens = 0
+        # A second copy or draft of a document would only spend the budget on the same text
+        seen = NearDuplicateIndex(settings.near_duplicate_max_distance) if settings.near_duplicate_enabled else None
         
         for doc in documents:
+            signature = profile_signature(ensure_profile(doc)) if seen is not None else None
+            if signature is not None:
+                if seen.find(signature) is not None:
+                    NEAR_DUPLICATES.inc(stage="context")
+                    continue
+                seen.add(signature, doc.id)
+            
             doc_section = f"\n--- Document: {doc.filename} ---\n{doc.content}\n"
             estimated_tokens = len(doc_section) // 4
             
@@ -78,7 +223,35 @@ class QueryEngine:
         
         return "".join(context_parts)
     
-    def _generate_ai_response(self, question: str, context: str, api_key: Optional[str] = None, model: Optional[str] = None) -> str:
+    def _build_passage_context(self, passages: List[Passage]) -> Tuple[str, List[Passage]]:
+        """Pack the best passages into the token budget; returns the context and the passages it holds."""
+        if not passages:
+            return "No documents available.", []
+        
+        # Best passages win the token budget; they are then shown per document in reading order
+        selected, current_tokens = [], 0
+        for passage in passages:
+            estimated_tokens = len(passage.text) // 4
+            if current_tokens + estimated_tokens > self.max_tokens:
+                break
+            selected.append(passage)
+            current_tokens += estimated_tokens
+        
+        by_document = {}
+        for passage in selected:
+            by_document.setdefault(passage.filename, []).append(passage)
+        
+        context_parts = []
+        for filename, document_passages in by_document.items():
+            excerpts = "\n...\n".join(
+                f"[{passage.location}]\n{passage.text}" if passage.location else passage.text
+                for passage in sorted(document_passages, key=lambda passage: passage.position)
+            )
+            context_parts.append(f"\n--- Document: {filename} ---\n{excerpts}\n")
+        return "".join(context_parts), selected
+    
+    def _generate_ai_response(self, question: str, context: str, api_key: Optional[str] = None, model: Optional[str] = None,
+                              history: Optional[ConversationHistory] = None) -> str:
         try:
             system_prompt = """You are a helpful AI assistant that answers questions based on provided documents. 
 
@@ -87,7 +260,8 @@ Instructions:
 - If the answer is not in the documents, say so clearly
 - Be concise but comprehensive
 - Simplify topics or give easy to understand explainations, if user ask for it
-- Quote relevant parts when helpful"""
+- Quote relevant parts when helpful
+- Excerpts may be labelled with a page and section like [p.12 §3.2]; cite them as (filename p.12 §3.2) when you use them"""
             
             user_prompt = f"""Documents:
 {context}
@@ -96,20 +270,24 @@ Question: {question}
 
 Answer based on the documents above:"""
             
-            messages = [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ]
+            # Earlier turns go between the instructions and the new question so
+            # follow-ups like "what about chapter 3?" resolve against them
+            messages = [{"role": "system", "content": system_prompt}]
+            if history:
+                messages.extend(history.to_messages())
+            messages.append({"role": "user", "content": user_prompt})
             
             # Use runtime credentials if provided
-            api_response = self.openrouter_client.chat_completion(
-                messages, 
-                max_tokens=1000,
-                api_key=api_key,
-                model=model
-            )
-            return self.openrouter_client.extract_response_content(api_response)
-            
+            with span("query.llm"):
+                api_response = self.openrouter_client.chat_completion(
+                    messages, 
+                    max_tokens=1000,
+                    api_key=api_key,
+                    model=model
+                )
+            with span("query.parse"):
+                return self.openrouter_client.extract_response_content(api_response)
+        
         except OpenRouterError as e:
             raise QueryEngineError(f"AI service error: {str(e)}")
         except Exception as e:
@@ -126,7 +304,7 @@ Answer based on the documents above:"""
         try:
             if not self.db_service:
                 self.db_service = get_database_service()
-            self.db_service.get_all_documents()
+            self.db_service.ping()
             logger.info("Database connection successful")
         except Exception as e:
             logger.warning(f"Database connection failed: {str(e)}")
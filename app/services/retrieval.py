@@ -0,0 +1,343 @@
+
+import asyncio
+import logging
+import math
+import re
+from bisect import bisect_right
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
+from app.models.data_models import DocumentFilter, DocumentSpan, ProcessedDocument
+from app.services.metrics import span
+from app.services.near_duplicates import DOCUMENT_TOKENS, NEAR_DUPLICATES, NearDuplicateIndex, distance, from_hex, simhash, to_hex
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+STOPWORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being below between both but by
+can could did do does doing down during each few for from further had has have having he her here hers him his how i
+if in into is it its itself just me more most my no nor not now of off on once only or other our ours out over own same
+she should so some such than that the their theirs them then there these they this those through to too under until up
+very was we were what when where which while who whom why will with would you your yours
+""".split())
+
+_TOKEN = re.compile(r"[a-z0-9]+(?:\.[0-9]+)?")
+# Don't split after titles, common abbreviations or section numbers ("3. Results")
+_SENTENCE = re.compile(r"(?<!\bDr\.)(?<!\bMr\.)(?<!\bMs\.)(?<!\bMrs\.)(?<!\bProf\.)(?<!\be\.g\.)(?<!\bi\.e\.)(?<!\bvs\.)"
+                       r"(?<!^\d\.)(?<!^\d\d\.)(?<=[.!?])\s+", re.MULTILINE)
+_BLOCK = re.compile(r"\n\s*\n")
+
+
+def tokenize(text: str) -> List[str]:
+    tokens = []
+    for token in _TOKEN.findall(text.lower()):
+        if token[0].isdigit():
+            # "007" in a filename should match "7" in a question
+            token = token.lstrip("0") or "0"
+        elif len(token) < 2 or token in STOPWORDS:
+            continue
+        tokens.append(token)
+    return tokens
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split on sentence ends and blank lines; markdown headings become sentences of their own."""
+    sentences = []
+    for block in _BLOCK.split(text):
+        lines = []
+        for line in block.split("\n"):
+            if line.lstrip().startswith("#"):
+                sentences.extend(_SENTENCE.split(" ".join(lines)))
+                sentences.append(line)
+                lines = []
+            else:
+                lines.append(line)
+        sentences.extend(_SENTENCE.split(" ".join(lines)))
+    return [sentence.strip() for sentence in sentences if sentence.strip()]
+
+
+def build_profile(content: str, filename: str = "", headings: Sequence[str] = ()) -> Dict[str, Any]:
+    """
+    Compact routing profile stored in ``metadata["profile"]`` at upload time:
+    the most frequent terms with their counts, a short extractive summary
+    made of the sentences that carry most of those terms, and the terms of
+    the document's section headings, plus a SimHash of the text for
+    spotting near-duplicate uploads.
+    """
+    tokens = tokenize(content)
+    counts = Counter(tokens)
+    keywords = dict(counts.most_common(settings.retrieval_profile_keywords))
+    
+    sentences = split_sentences(content)
+    heading = content.strip().split("\n", 1)[0][:200] if content.strip() else ""
+    scored = []
+    for position, sentence in enumerate(sentences[:500]):
+        terms = tokenize(sentence)
+        if len(terms) < 3:
+            continue
+        score = sum(keywords.get(term, 0) for term in set(terms)) / math.sqrt(len(terms))
+        scored.append((score, position, sentence))
+    best = sorted(scored, reverse=True)[:settings.retrieval_summary_sentences]
+    summary = " ".join(sentence[:300] for _, _, sentence in sorted(best, key=lambda item: item[1]))
+    
+    return {
+        "summary": summary,
+        "keywords": keywords,
+        "title_terms": list(dict.fromkeys(tokenize(filename.rsplit(".", 1)[0]) + tokenize(heading))),
+        # Numbers from "Section 2"-style headings would match every document
+        "heading_terms": list(dict.fromkeys(term for title in headings for term in tokenize(title) if not term[0].isdigit()))[:100],
+        "tokens": len(tokens),
+        "simhash": to_hex(simhash(tokens[:DOCUMENT_TOKENS]))
+    }
+
+
+def ensure_profile(document: ProcessedDocument) -> Dict[str, Any]:
+    if "profile" not in document.metadata:
+        headings = dict.fromkeys(title for span in document.get_spans() for title in span.heading_path)
+        document.metadata["profile"] = build_profile(document.content, document.filename, headings)
+    return document.metadata["profile"]
+
+
+def profile_signature(profile: Optional[Dict[str, Any]]) -> Optional[int]:
+    # Profiles stored before signatures existed have none
+    return from_hex(profile.get("simhash")) if profile else None
+
+
+def find_near_duplicates(profile: Dict[str, Any], profiles: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Rows of ``profiles`` (as from ``get_document_profiles``) whose text is a near-duplicate of ``profile``'s."""
+    signature = profile_signature(profile)
+    if signature is None or not settings.near_duplicate_enabled:
+        return []
+    matches = []
+    for row in profiles:
+        other = profile_signature(row.get("profile"))
+        if other is not None and distance(signature, other) <= settings.near_duplicate_max_distance:
+            matches.append(row)
+    return matches
+
+
+class BM25:
+    """
+    Okapi BM25 over term bags. ``lengths``, ``corpus_size`` and
+    ``average_length`` can be given when the bags only hold the query terms
+    of a larger collection, as postings read from an index do.
+    """
+    
+    def __init__(self, documents: Sequence[Counter], k1: float = 1.2, b: float = 0.75, lengths: Optional[Sequence[int]] = None,
+                 corpus_size: Optional[int] = None, average_length: Optional[float] = None):
+        self.documents = documents
+        self.k1 = k1
+        self.b = b
+        self.lengths = lengths if lengths is not None else [sum(document.values()) for document in documents]
+        if average_length is None:
+            average_length = (sum(self.lengths) / len(self.lengths)) if documents else 0.0
+        self.average_length = average_length
+        frequencies = Counter()
+        for document in documents:
+            frequencies.update(document.keys())
+        total = corpus_size if corpus_size is not None else len(documents)
+        self.idf = {term: math.log(1 + (total - count + 0.5) / (count + 0.5)) for term, count in frequencies.items()}
+    
+    def score(self, query_terms: Sequence[str], index: int) -> float:
+        document = self.documents[index]
+        length_ratio = self.lengths[index] / self.average_length if self.average_length else 1.0
+        score = 0.0
+        for term in query_terms:
+            frequency = document.get(term)
+            if frequency:
+                score += self.idf[term] * frequency * (self.k1 + 1) / (frequency + self.k1 * (1 - self.b + self.b * length_ratio))
+        return score
+
+
+@dataclass
+class Passage:
+    document_id: str
+    filename: str
+    text: str
+    position: int
+    score: float = 0.0
+    page: Optional[int] = None
+    heading_path: List[str] = field(default_factory=list)
+    section: Optional[str] = None
+    simhash: Optional[int] = None
+    
+    @property
+    def location(self) -> str:
+        return DocumentSpan(0, 0, self.page, self.heading_path, self.section).label()
+    
+    @property
+    def citation(self) -> str:
+        """Where the passage came from, e.g. ``report.pdf p.37 §2.1``."""
+        location = self.location
+        return f"{self.filename} {location}" if location else self.filename
+
+
+def split_passages(document: ProcessedDocument, max_words: int) -> List[Passage]:
+    """
+    Pack whole sentences into passages of about ``max_words`` words, repeating
+    one sentence of overlap. When the processor recorded spans, passages stay
+    inside one page and section and carry its location for citations.
+    """
+    spans = document.get_spans() or [DocumentSpan(0, len(document.content))]
+    passages = []
+    for location in spans:
+        text = document.content[location.start:location.end]
+        if location.heading_path and text.lstrip("#").strip() == location.heading_path[-1]:
+            # A heading with nothing under it before the next one; it lives on in the heading path
+            continue
+        current, words = [], 0
+        for sentence in split_sentences(text):
+            length = len(sentence.split())
+            if current and words + length > max_words:
+                passages.append(_passage(document, current, len(passages), location))
+                current, words = current[-1:], len(current[-1].split())
+            current.append(sentence)
+            words += length
+        if current:
+            passages.append(_passage(document, current, len(passages), location))
+    return passages
+
+
+def _passage(document: ProcessedDocument, sentences: List[str], position: int, location: DocumentSpan) -> Passage:
+    return Passage(document.id, document.filename, "\n".join(sentences), position,
+                   page=location.page, heading_path=location.heading_path, section=location.section)
+
+
+def passage_signature(passage: Passage) -> int:
+    if passage.simhash is None:
+        passage.simhash = simhash(tokenize(passage.text))
+    return passage.simhash
+
+
+def passage_terms(passage: Passage) -> Counter:
+    # A passage from the middle of a section is still about that section's heading
+    return Counter(tokenize(passage.text) + tokenize(" ".join(passage.heading_path)))
+
+
+class HierarchicalRetriever:
+    """
+    Two-stage retrieval. Stage one ranks documents by their stored profiles
+    (keywords, summary and filename), which are small and fetched without
+    content. Stage two loads only the routed documents and ranks their
+    passages, so the expensive part scales with the documents that matter
+    rather than with everything in the session. With a segment index,
+    stage two reads postings for indexed documents instead of their content.
+    """
+    
+    def __init__(self, route_documents: Optional[int] = None, max_passages: Optional[int] = None,
+                 passage_words: Optional[int] = None, index=None):
+        self.route_documents = route_documents or settings.retrieval_route_documents
+        self.max_passages = max_passages or settings.retrieval_max_passages
+        self.passage_words = passage_words or settings.retrieval_passage_words
+        self.index = index
+    
+    async def retrieve(self, db_service, question: str, session_id: Optional[str] = None,
+                       filters: Optional[DocumentFilter] = None) -> List[Passage]:
+        query_terms = tokenize(question)
+        if not query_terms:
+            return []
+        
+        with span("query.route"):
+            profiles = await db_service.get_document_profiles(session_id=session_id, filters=filters)
+            # Scoring is CPU work; on the event loop one large session would stall every other request
+            document_ids = await asyncio.to_thread(self.route, query_terms, profiles)
+        if not document_ids:
+            return []
+        
+        with span("query.fetch"):
+            indexed = self.index.locate(document_ids) if self.index else {}
+            missing = [document_id for document_id in document_ids if document_id not in indexed]
+            documents = await db_service.get_documents(missing) if missing else []
+        with span("query.rank"):
+            passages = await asyncio.to_thread(self.rank_passages, query_terms, documents, indexed)
+        
+        if documents and self.index:
+            # Documents stored before the index existed, or on another host, are indexed for next time
+            asyncio.get_running_loop().run_in_executor(None, self._index_documents, documents)
+        return passages
+    
+    def route(self, query_terms: List[str], profiles: List[Dict[str, Any]]) -> List[str]:
+        profiled, unprofiled = [], []
+        for row in profiles:
+            (profiled if row.get("profile") else unprofiled).append(row)
+        if unprofiled:
+            # Documents stored before profiles existed can't be routed, so they always go to stage two
+            logger.debug(f"{len(unprofiled)} documents have no retrieval profile")
+        
+        bags = []
+        for row in profiled:
+            profile = row["profile"]
+            bag = Counter(profile.get("keywords") or {})
+            bag.update(tokenize(profile.get("summary") or ""))
+            bag.update({term: 2 for term in profile.get("title_terms") or []})
+            bag.update(profile.get("heading_terms") or [])
+            bags.append(bag)
+        
+        index = BM25(bags)
+        scored = [(index.score(query_terms, i), row["id"]) for i, row in enumerate(profiled)]
+        routed = [document_id for score, document_id in sorted(scored, reverse=True) if score > 0][:self.route_documents]
+        return routed + [row["id"] for row in unprofiled]
+    
+    def rank_passages(self, query_terms: List[str], documents: List[ProcessedDocument], indexed=None) -> List[Passage]:
+        """
+        Rank the passages of ``documents`` together with those of the indexed
+        documents (document id -> segment). Indexed passages are only read
+        in full if they make the cut. A passage that is a near-duplicate of
+        one ranked above it (the same paragraph in two drafts of a report)
+        is skipped, so it doesn't take a place in the context twice.
+        """
+        candidates = [passage for document in documents for passage in split_passages(document, self.passage_words)]
+        bags = [passage_terms(passage) for passage in candidates]
+        lengths = [sum(bag.values()) for bag in bags]
+        corpus_size, total_length = len(candidates), sum(lengths)
+        
+        by_segment = {}
+        for document_id, segment in (indexed or {}).items():
+            first, count, total = segment.documents[document_id]
+            by_segment.setdefault(segment, []).append((first, first + count))
+            corpus_size += count
+            total_length += total
+        for segment, ranges in by_segment.items():
+            ranges.sort()
+            starts = [start for start, _ in ranges]
+            hits = {}
+            for term in set(query_terms):
+                for number, frequency in segment.postings(term):
+                    slot = bisect_right(starts, number) - 1
+                    if slot >= 0 and number < ranges[slot][1]:
+                        hits.setdefault(number, Counter())[term] = frequency
+            for number, bag in hits.items():
+                candidates.append((segment, number))
+                bags.append(bag)
+                lengths.append(segment.passage_length(number))
+        if not candidates:
+            return []
+        
+        index = BM25(bags, lengths=lengths, corpus_size=corpus_size, average_length=total_length / corpus_size)
+        scored = [(index.score(query_terms, i), candidate) for i, candidate in enumerate(candidates)]
+        ranked = sorted((item for item in scored if item[0] > 0), key=lambda item: item[0], reverse=True)
+        
+        passages = []
+        seen = NearDuplicateIndex(settings.near_duplicate_max_distance) if settings.near_duplicate_enabled else None
+        for score, candidate in ranked:
+            if len(passages) == self.max_passages:
+                break
+            if isinstance(candidate, tuple):
+                segment, number = candidate
+                candidate = segment.passage(number)
+            if seen is not None:
+                signature = passage_signature(candidate)
+                if seen.find(signature) is not None:
+                    NEAR_DUPLICATES.inc(stage="retrieval")
+                    continue
+                seen.add(signature, candidate)
+            candidate.score = score
+            passages.append(candidate)
+        return passages
+    
+    def _index_documents(self, documents: List[ProcessedDocument]):
+        try:
+            self.index.add_documents(documents)
+        except Exception as e:
+            logger.warning(f"Could not add documents to the segment index: {e}")
\ No newline at end of file
@@ -0,0 +1,394 @@
+
+import fcntl
+import logging
+import mmap
+import os
+import struct
+import threading
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from app.models.data_models import ProcessedDocument
+from app.services.metrics import registry
+from app.services.retrieval import Passage, passage_signature, passage_terms, split_passages
+from app.services.serialization import dumps, loads
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+SEGMENTS = registry.gauge("researchpilot_index_segments", "Segments in the on-disk passage index")
+MERGES = registry.counter("researchpilot_index_merges_total", "Background merges of passage index segments")
+INDEXED_DOCUMENTS = registry.counter("researchpilot_index_documents_total", "Documents written to passage index segments")
+
+MAGIC = b"RPSEG\x00"
+FORMAT_VERSION = 1
+MANIFEST_VERSION = 1
+
+# magic, version, terms, passages, documents, then offsets of the term, posting,
+# passage and document tables and of the blob holding strings and passage data
+HEADER = struct.Struct("<6sHIIIQQQQQ")
+TERM = struct.Struct("<QIII")        # term offset in blob, term length, first posting, posting count
+POSTING = struct.Struct("<II")       # passage number, term frequency
+PASSAGE = struct.Struct("<IIQI")     # document number, length in terms, data offset in blob, data length
+DOCUMENT = struct.Struct("<QIIIQ")   # id offset in blob, id length, first passage, passage count, total terms
+
+
+class Segment:
+    """
+    One immutable index segment, memory-mapped read-only. Worker processes
+    that open the same file share its pages through the OS page cache, and
+    nothing is read until a lookup touches it.
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        self.name = os.path.basename(path)
+        with open(path, "rb") as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        
+        (magic, version, self.term_count, self.passage_count, self.document_count, self._terms_offset,
+         self._postings_offset, self._passages_offset, self._documents_offset, self._blob_offset) = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise SegmentFormatError(f"{self.name} is not an index segment")
+        if version != FORMAT_VERSION:
+            raise SegmentFormatError(f"{self.name} has format version {version}, expected {FORMAT_VERSION}")
+        
+        # The document table is small and needed by every query, so it is decoded once
+        self.documents: Dict[str, Tuple[int, int, int]] = {}
+        for number in range(self.document_count):
+            id_offset, id_length, first, count, total = DOCUMENT.unpack_from(self._map, self._documents_offset + number * DOCUMENT.size)
+            document_id = self._blob(id_offset, id_length).decode("utf-8")
+            self.documents[document_id] = (first, count, total)
+    
+    def postings(self, term: str) -> Iterator[Tuple[int, int]]:
+        encoded = term.encode("utf-8")
+        low, high = 0, self.term_count
+        while low < high:
+            middle = (low + high) // 2
+            offset, length, first, count = TERM.unpack_from(self._map, self._terms_offset + middle * TERM.size)
+            candidate = self._blob(offset, length)
+            if candidate == encoded:
+                start = self._postings_offset + first * POSTING.size
+                return POSTING.iter_unpack(self._map[start:start + count * POSTING.size])
+            if candidate < encoded:
+                low = middle + 1
+            else:
+                high = middle
+        return iter(())
+    
+    def passage_length(self, number: int) -> int:
+        return PASSAGE.unpack_from(self._map, self._passages_offset + number * PASSAGE.size)[1]
+    
+    def passage(self, number: int) -> Passage:
+        _, _, offset, length = PASSAGE.unpack_from(self._map, self._passages_offset + number * PASSAGE.size)
+        data = loads(self._blob(offset, length))
+        return Passage(data["document_id"], data["filename"], data["text"], data["position"],
+                       page=data.get("page"), heading_path=data.get("headings", []), section=data.get("section"),
+                       simhash=data.get("simhash"))
+    
+    def document_passages(self, document_id: str) -> List[Passage]:
+        first, count, _ = self.documents[document_id]
+        return [self.passage(number) for number in range(first, first + count)]
+    
+    def _blob(self, offset: int, length: int) -> bytes:
+        start = self._blob_offset + offset
+        return self._map[start:start + length]
+
+
+def write_segment(path: str, documents: Iterable[Tuple[str, List[Passage]]]):
+    """
+    Write passages, grouped by document, as a segment. The file is written
+    under a temporary name and renamed into place, so readers never see a
+    partial segment.
+    """
+    blob = bytearray()
+    postings: Dict[str, List[Tuple[int, int]]] = {}
+    passage_records, document_records = [], []
+    
+    def add_blob(data: bytes) -> int:
+        offset = len(blob)
+        blob.extend(data)
+        return offset
+    
+    for document_number, (document_id, passages) in enumerate(documents):
+        encoded_id = document_id.encode("utf-8")
+        first, total = len(passage_records), 0
+        for passage in passages:
+            terms = passage_terms(passage)
+            length = sum(terms.values())
+            total += length
+            for term, frequency in terms.items():
+                postings.setdefault(term, []).append((len(passage_records), frequency))
+            data = dumps({
+                "document_id": passage.document_id,
+                "filename": passage.filename,
+                "text": passage.text,
+                "position": passage.position,
+                "page": passage.page,
+                "headings": passage.heading_path,
+                "section": passage.section,
+                "simhash": passage_signature(passage)
+            })
+            passage_records.append(PASSAGE.pack(document_number, length, add_blob(data), len(data)))
+        document_records.append(DOCUMENT.pack(add_blob(encoded_id), len(encoded_id), first, len(passages), total))
+    
+    term_records, posting_records = [], []
+    for term in sorted(postings, key=lambda term: term.encode("utf-8")):
+        encoded = term.encode("utf-8")
+        term_records.append(TERM.pack(add_blob(encoded), len(encoded), len(posting_records), len(postings[term])))
+        posting_records.extend(POSTING.pack(*posting) for posting in postings[term])
+    
+    terms_offset = HEADER.size
+    postings_offset = terms_offset + len(term_records) * TERM.size
+    passages_offset = postings_offset + len(posting_records) * POSTING.size
+    documents_offset = passages_offset + len(passage_records) * PASSAGE.size
+    blob_offset = documents_offset + len(document_records) * DOCUMENT.size
+    
+    temporary_path = f"{path}.tmp-{os.getpid()}"
+    with open(temporary_path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(term_records), len(passage_records), len(document_records),
+                               terms_offset, postings_offset, passages_offset, documents_offset, blob_offset))
+        for records in (term_records, posting_records, passage_records, document_records):
+            file.write(b"".join(records))
+        file.write(blob)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary_path, path)
+
+
+class SegmentIndex:
+    """
+    Persistent passage index shared by all workers on a host. Uploads are
+    written as small delta segments; once more than ``merge_segments``
+    exist, a background merge folds the smaller ones together and drops
+    deleted documents. ``manifest.json`` lists the live segments and is
+    replaced atomically under a file lock, and each worker reopens segments
+    only when the manifest changes.
+    
+    The index is a cache of what is in the database: documents it doesn't
+    have are ranked from their content and added afterwards.
+    """
+    
+    def __init__(self, directory: Optional[str] = None, passage_words: Optional[int] = None,
+                 merge_segments: Optional[int] = None):
+        self.directory = directory or settings.segment_index_path
+        self.passage_words = passage_words or settings.retrieval_passage_words
+        self.merge_segments = merge_segments or settings.segment_index_merge_segments
+        os.makedirs(self.directory, exist_ok=True)
+        self._manifest_path = os.path.join(self.directory, "manifest.json")
+        self._segments: List[Segment] = []
+        self._deleted: Set[str] = set()
+        self._manifest_stamp = None
+        self._lock = threading.Lock()
+        self._merge_thread: Optional[threading.Thread] = None
+    
+    def segments(self) -> List[Segment]:
+        self.refresh()
+        return self._segments
+    
+    def refresh(self):
+        try:
+            stat = os.stat(self._manifest_path)
+            stamp = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        except FileNotFoundError:
+            stamp = None
+        if stamp == self._manifest_stamp:
+            return
+        
+        with self._lock:
+            if stamp == self._manifest_stamp:
+                return
+            manifest = self._read_manifest()
+            opened = {segment.name: segment for segment in self._segments}
+            segments, stale = [], False
+            for name in manifest["segments"]:
+                try:
+                    segments.append(opened.get(name) or Segment(os.path.join(self.directory, name)))
+                except FileNotFoundError:
+                    # Merged away after the manifest was read; the next refresh sees the merged segment
+                    stale = True
+                except (OSError, SegmentFormatError) as e:
+                    # Its documents fall back to the database and get indexed again
+                    logger.warning(f"Skipping index segment {name}: {e}")
+            # Segments dropped here are unmapped once queries still using them finish
+            self._segments = segments
+            self._deleted = set(manifest["deleted"])
+            self._manifest_stamp = None if stale else stamp
+            SEGMENTS.set(len(segments))
+    
+    def locate(self, document_ids: Iterable[str]) -> Dict[str, Segment]:
+        """Segment holding each indexed document; later segments win if a document was indexed twice."""
+        segments = self.segments()
+        located = {}
+        for document_id in document_ids:
+            if document_id in self._deleted:
+                continue
+            for segment in reversed(segments):
+                if document_id in segment.documents:
+                    located[document_id] = segment
+                    break
+        return located
+    
+    def add_documents(self, documents: List[ProcessedDocument]) -> Optional[str]:
+        indexed = self.locate(document.id for document in documents)
+        entries = [(document.id, split_passages(document, self.passage_words))
+                   for document in documents if document.id not in indexed]
+        if not entries:
+            return None
+        
+        name = f"segment-{uuid.uuid4().hex}.rpseg"
+        write_segment(os.path.join(self.directory, name), entries)
+        with self._manifest_lock() as manifest:
+            manifest["segments"].append(name)
+            added = {document_id for document_id, _ in entries}
+            manifest["deleted"] = [document_id for document_id in manifest["deleted"] if document_id not in added]
+            segment_count = len(manifest["segments"])
+        INDEXED_DOCUMENTS.inc(len(entries))
+        
+        if segment_count > self.merge_segments:
+            self.merge_in_background()
+        return name
+    
+    def delete_documents(self, document_ids: List[str]):
+        located = self.locate(document_ids)
+        if not located:
+            return
+        with self._manifest_lock() as manifest:
+            manifest["deleted"] = sorted(set(manifest["deleted"]) | set(located))
+    
+    def merge_in_background(self):
+        if self._merge_thread is not None and self._merge_thread.is_alive():
+            return
+        self._merge_thread = threading.Thread(target=self._merge_safely, name="segment-merge", daemon=True)
+        self._merge_thread.start()
+    
+    def merge(self) -> Optional[str]:
+        """
+        Fold all segments except a base that outweighs the rest into one new
+        segment, leaving out deleted documents. The base is included too
+        once it holds deleted documents. Only one worker on the host
+        merges at a time; the others return immediately.
+        """
+        with self._exclusive("merge.lock", blocking=False) as acquired:
+            if not acquired:
+                return None
+            
+            self._manifest_stamp = None
+            segments = self.segments()
+            deleted = set(self._deleted)
+            if len(segments) < 2:
+                return None
+            
+            by_size = sorted(segments, key=lambda segment: segment.passage_count, reverse=True)
+            base = by_size[0]
+            if base.passage_count > sum(segment.passage_count for segment in by_size[1:]) and not deleted & base.documents.keys():
+                merging = by_size[1:]
+            else:
+                merging = by_size
+            if len(merging) < 2 and not deleted & merging[0].documents.keys():
+                return None
+            merging_names = {segment.name for segment in merging}
+            
+            # Later segments win for documents indexed twice
+            latest: Dict[str, Segment] = {}
+            for segment in segments:
+                if segment.name in merging_names:
+                    for document_id in segment.documents:
+                        latest[document_id] = segment
+            entries = ((document_id, segment.document_passages(document_id))
+                       for document_id, segment in latest.items() if document_id not in deleted)
+            
+            name = f"segment-{uuid.uuid4().hex}.rpseg"
+            write_segment(os.path.join(self.directory, name), entries)
+            with self._manifest_lock() as manifest:
+                # Keep segments added while the merge ran; the merged one goes first so they still win
+                remaining = [segment for segment in manifest["segments"] if segment not in merging_names]
+                manifest["segments"] = [name] + remaining
+                dropped = deleted & set(latest)
+                still_present = {document_id for segment in segments if segment.name not in merging_names
+                                 for document_id in segment.documents}
+                manifest["deleted"] = [document_id for document_id in manifest["deleted"]
+                                       if document_id not in dropped or document_id in still_present]
+            
+            for segment_name in merging_names:
+                try:
+                    # Workers that still have the file mapped keep reading it until they refresh
+                    os.remove(os.path.join(self.directory, segment_name))
+                except FileNotFoundError:
+                    pass
+            MERGES.inc()
+            logger.info(f"Merged {len(merging)} index segments into {name}")
+            return name
+    
+    def get_status(self):
+        segments = self.segments()
+        return {
+            "segments": len(segments),
+            "documents": len(set().union(*(segment.documents for segment in segments)) - self._deleted),
+            "passages": sum(segment.passage_count for segment in segments),
+            "deleted": len(self._deleted),
+            "bytes": sum(os.path.getsize(segment.path) for segment in segments if os.path.exists(segment.path))
+        }
+    
+    def _merge_safely(self):
+        try:
+            self.merge()
+        except Exception as e:
+            logger.error(f"Index segment merge failed: {e}")
+    
+    def _read_manifest(self):
+        try:
+            with open(self._manifest_path, "rb") as file:
+                manifest = loads(file.read())
+        except FileNotFoundError:
+            manifest = None
+        except ValueError as e:
+            logger.warning(f"Unreadable index manifest, starting empty: {e}")
+            manifest = None
+        if manifest is not None and manifest.get("version") != MANIFEST_VERSION:
+            logger.warning(f"Index manifest version {manifest.get('version')} is not supported, starting empty")
+            manifest = None
+        return manifest or {"version": MANIFEST_VERSION, "segments": [], "deleted": []}
+    
+    @contextmanager
+    def _manifest_lock(self):
+        with self._exclusive("manifest.lock"):
+            manifest = self._read_manifest()
+            yield manifest
+            temporary_path = f"{self._manifest_path}.tmp-{os.getpid()}"
+            with open(temporary_path, "wb") as file:
+                file.write(dumps(manifest))
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temporary_path, self._manifest_path)
+    
+    @contextmanager
+    def _exclusive(self, name: str, blocking: bool = True):
+        with open(os.path.join(self.directory, name), "a") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+_segment_index = None
+_segment_index_lock = threading.Lock()
+
+
+def get_segment_index() -> SegmentIndex:
+    global _segment_index
+    
+    if _segment_index is None:
+        with _segment_index_lock:
+            if _segment_index is None:
+                _segment_index = SegmentIndex()
+    return _segment_index
+
+
+class SegmentFormatError(Exception):
+    pass
\ No newline at end of file
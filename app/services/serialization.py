@@ -0,0 +1,51 @@
+
+import dataclasses
+import json
+from datetime import date, datetime
+from typing import Any, Union
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        # Shallow on purpose: large text fields are passed through, not copied into a new dict tree
+        return {field.name: getattr(value, field.name) for field in dataclasses.fields(value)}
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(value: Any) -> bytes:
+    """
+    Encode to UTF-8 JSON bytes. Uses orjson when installed, which writes
+    dataclasses and datetimes directly; the standard library fallback keeps
+    non-ASCII text unescaped so both produce the same size of output.
+    """
+    if orjson is not None:
+        return orjson.dumps(value, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def dumps_str(value: Any) -> str:
+    return dumps(value).decode("utf-8")
+
+
+def loads(data: Union[str, bytes, bytearray, memoryview]) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse rendered with :func:`dumps`. Return it directly from a
+    route to skip response-model validation and ``jsonable_encoder``.
+    """
+    
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
\ No newline at end of file
@@ -0,0 +1,135 @@
+
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+from app.services.metrics import registry
+from app.services.shared_state import get_shared_state
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+SESSIONS_EXPIRED = registry.counter("researchpilot_sweeper_sessions_expired_total", "Idle sessions removed by the sweeper")
+ROWS_RECLAIMED = registry.counter("researchpilot_sweeper_rows_reclaimed_total", "Document rows removed by the sweeper")
+BYTES_RECLAIMED = registry.counter("researchpilot_sweeper_bytes_reclaimed_total", "Uploaded bytes reclaimed by the sweeper")
+SWEEP_ERRORS = registry.counter("researchpilot_sweeper_errors_total", "Failed sweeper runs")
+
+
+class SessionSweeper:
+    
+    def __init__(self, db_service, quota=None, index=None):
+        self.db_service = db_service
+        self.quota = quota
+        self.index = index
+        self.ttl_seconds = settings.session_ttl_seconds
+        self.interval_seconds = settings.session_sweep_interval_seconds
+        self.batch_size = settings.session_sweep_batch_size
+        self.archive = settings.session_sweep_mode.lower() == "archive"
+        self.state = get_shared_state()
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {
+            "runs": 0,
+            "sessions_expired": 0,
+            "rows_reclaimed": 0,
+            "bytes_reclaimed": 0,
+            "last_run_at": None,
+            "last_error": None,
+            "skipped_runs": 0
+        }
+    
+    def touch(self, session_id: Optional[str]):
+        if not session_id:
+            return
+        
+        # Activity is persisted at most once per interval per session, across
+        # all workers, so a busy session doesn't add a write to every request.
+        interval = settings.session_touch_interval_seconds
+        if interval > 0 and not self.state.add(f"sweeper:touched:{session_id}", "1", ttl=interval):
+            return
+        
+        try:
+            self.db_service.touch_session(session_id)
+        except Exception as e:
+            logger.warning(f"Could not record activity for session {session_id}: {e}")
+    
+    def sweep_once(self) -> Dict[str, int]:
+        cutoff = datetime.now() - timedelta(seconds=self.ttl_seconds)
+        sessions = self.db_service.get_idle_sessions(cutoff, self.batch_size)
+        
+        rows = 0
+        reclaimed_bytes = 0
+        for session_id in sessions:
+            while True:
+                documents = self.db_service.get_session_document_sizes(session_id, self.batch_size)
+                if not documents:
+                    break
+                
+                deleted = self.db_service.delete_documents([doc["id"] for doc in documents], archive=self.archive)
+                if self.index and deleted:
+                    self.index.delete_documents([doc["id"] for doc in documents])
+                rows += deleted
+                reclaimed_bytes += sum(doc.get("file_size") or 0 for doc in documents)
+                if deleted == 0:
+                    break
+            
+            self.db_service.delete_session_conversations(session_id)
+            self.db_service.delete_session_activity(session_id)
+            self.state.delete(f"sweeper:touched:{session_id}")
+        
+        if self.quota and sessions:
+            self.quota.invalidate()
+        
+        self.stats["sessions_expired"] += len(sessions)
+        self.stats["rows_reclaimed"] += rows
+        self.stats["bytes_reclaimed"] += reclaimed_bytes
+        SESSIONS_EXPIRED.inc(len(sessions))
+        ROWS_RECLAIMED.inc(rows)
+        BYTES_RECLAIMED.inc(reclaimed_bytes)
+        if sessions:
+            action = "Archived" if self.archive else "Deleted"
+            logger.info(f"{action} {rows} documents ({reclaimed_bytes} bytes) from {len(sessions)} idle sessions")
+        
+        return {"sessions": len(sessions), "rows": rows, "bytes": reclaimed_bytes}
+    
+    def acquire_lease(self) -> bool:
+        # Every worker runs a sweeper; the lease lets one of them sweep per interval
+        lease = max(self.interval_seconds * 0.9, 1)
+        return self.state.add("sweeper:lease", str(os.getpid()), ttl=lease)
+    
+    async def run_forever(self):
+        while True:
+            try:
+                if await asyncio.to_thread(self.acquire_lease):
+                    await asyncio.to_thread(self.sweep_once)
+                else:
+                    self.stats["skipped_runs"] += 1
+                self.stats["last_error"] = None
+            except Exception as e:
+                logger.error(f"Session sweep failed: {e}")
+                SWEEP_ERRORS.inc()
+                self.stats["last_error"] = str(e)
+            
+            self.stats["runs"] += 1
+            self.stats["last_run_at"] = datetime.now().isoformat()
+            await asyncio.sleep(self.interval_seconds)
+    
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run_forever())
+    
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "ttl_seconds": self.ttl_seconds,
+            "mode": "archive" if self.archive else "delete",
+            **self.stats
+        }
\ No newline at end of file
@@ -0,0 +1,294 @@
+
+import itertools
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+from config import settings
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+# Expired entries are otherwise only dropped when their key is touched again,
+# and hourly counters and one-off flags never are
+PURGE_EVERY_WRITES = 1000
+
+
+class SharedState(ABC):
+    """
+    Small key/value store for state that every worker process must agree on:
+    key cooldowns, rate-limit counters, short-lived caches and job status.
+    Values are strings; ``ttl`` is in seconds.
+    """
+    
+    @abstractmethod
+    def get(self, key: str) -> Optional[str]:
+        pass
+    
+    @abstractmethod
+    def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        pass
+    
+    @abstractmethod
+    def add(self, key: str, value: str, ttl: Optional[float] = None) -> bool:
+        """Set the key only if it doesn't exist. Returns True when it was set."""
+        pass
+    
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        pass
+    
+    @abstractmethod
+    def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        """Atomically add to a counter. ``ttl`` applies when the counter is created."""
+        pass
+    
+    @abstractmethod
+    def scan(self, prefix: str) -> Dict[str, str]:
+        pass
+    
+    def get_many(self, keys: List[str]) -> Dict[str, str]:
+        """Values of the given keys that exist, read in one round trip where the backend allows it."""
+        values = {key: self.get(key) for key in keys}
+        return {key: value for key, value in values.items() if value is not None}
+    
+    def purge(self) -> int:
+        """Remove expired entries; backends that expire keys themselves have nothing to do."""
+        return 0
+
+
+class MemorySharedState(SharedState):
+    
+    def __init__(self):
+        self._data: Dict[str, Tuple[str, Optional[float]]] = {}
+        self._lock = threading.Lock()
+        self._writes = 0
+    
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            return self._live(key)
+    
+    def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            self._write(key, value, time.time() + ttl if ttl else None)
+    
+    def add(self, key: str, value: str, ttl: Optional[float] = None) -> bool:
+        with self._lock:
+            if self._live(key) is not None:
+                return False
+            self._write(key, value, time.time() + ttl if ttl else None)
+            return True
+    
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+    
+    def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        with self._lock:
+            current = self._live(key)
+            if current is None:
+                value = amount
+                expires_at = time.time() + ttl if ttl else None
+            else:
+                value = int(current) + amount
+                expires_at = self._data[key][1]
+            self._write(key, str(value), expires_at)
+            return value
+    
+    def scan(self, prefix: str) -> Dict[str, str]:
+        with self._lock:
+            keys = [key for key in self._data if key.startswith(prefix)]
+            return {key: value for key in keys if (value := self._live(key)) is not None}
+    
+    def get_many(self, keys: List[str]) -> Dict[str, str]:
+        with self._lock:
+            return {key: value for key in keys if (value := self._live(key)) is not None}
+    
+    def purge(self) -> int:
+        with self._lock:
+            return self._purge()
+    
+    def _write(self, key: str, value: str, expires_at: Optional[float]):
+        self._data[key] = (value, expires_at)
+        self._writes += 1
+        if self._writes % PURGE_EVERY_WRITES == 0:
+            self._purge()
+    
+    def _purge(self) -> int:
+        now = time.time()
+        expired = [key for key, (_, expires_at) in self._data.items() if expires_at is not None and expires_at <= now]
+        for key in expired:
+            del self._data[key]
+        return len(expired)
+    
+    def _live(self, key: str) -> Optional[str]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.time():
+            del self._data[key]
+            return None
+        return value
+
+
+class SQLiteSharedState(SharedState):
+    """Shared between worker processes on one host through a WAL-mode SQLite file."""
+    
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or settings.shared_state_path
+        self._local = threading.local()
+        self._writes = itertools.count(1)
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS shared_state (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS idx_shared_state_expires_at ON shared_state(expires_at)")
+        # Whatever expired while no worker was running
+        self.purge()
+    
+    def get(self, key: str) -> Optional[str]:
+        row = self._connection().execute(
+            "SELECT value FROM shared_state WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+    
+    def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        with self._connection() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO shared_state (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, time.time() + ttl if ttl else None)
+            )
+        self._wrote()
+    
+    def add(self, key: str, value: str, ttl: Optional[float] = None) -> bool:
+        now = time.time()
+        with self._connection() as connection:
+            connection.execute("DELETE FROM shared_state WHERE key = ? AND expires_at <= ?", (key, now))
+            cursor = connection.execute(
+                "INSERT OR IGNORE INTO shared_state (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, now + ttl if ttl else None)
+            )
+        self._wrote()
+        return cursor.rowcount == 1
+    
+    def delete(self, key: str) -> None:
+        with self._connection() as connection:
+            connection.execute("DELETE FROM shared_state WHERE key = ?", (key,))
+    
+    def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        now = time.time()
+        connection = self._connection()
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            connection.execute("DELETE FROM shared_state WHERE key = ? AND expires_at <= ?", (key, now))
+            connection.execute(
+                "INSERT INTO shared_state (key, value, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + ?",
+                (key, str(amount), now + ttl if ttl else None, amount)
+            )
+            row = connection.execute("SELECT value FROM shared_state WHERE key = ?", (key,)).fetchone()
+        self._wrote()
+        return int(row[0])
+    
+    def scan(self, prefix: str) -> Dict[str, str]:
+        rows = self._connection().execute(
+            "SELECT key, value FROM shared_state WHERE key >= ? AND key < ? AND (expires_at IS NULL OR expires_at > ?)",
+            (prefix, prefix + "\uffff", time.time())
+        ).fetchall()
+        return dict(rows)
+    
+    def get_many(self, keys: List[str]) -> Dict[str, str]:
+        if not keys:
+            return {}
+        rows = self._connection().execute(
+            f"SELECT key, value FROM shared_state WHERE key IN ({', '.join('?' * len(keys))}) "
+            "AND (expires_at IS NULL OR expires_at > ?)",
+            (*keys, time.time())
+        ).fetchall()
+        return dict(rows)
+    
+    def purge(self) -> int:
+        with self._connection() as connection:
+            return connection.execute("DELETE FROM shared_state WHERE expires_at <= ?", (time.time(),)).rowcount
+    
+    def _wrote(self):
+        # Each process counts its own writes, so with N workers the table is purged N times as often
+        if next(self._writes) % PURGE_EVERY_WRITES == 0:
+            self.purge()
+    
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+
+class RedisSharedState(SharedState):
+    
+    def __init__(self, url: Optional[str] = None):
+        if redis is None:
+            raise ValueError("SHARED_STATE_BACKEND=redis requires the 'redis' package")
+        self.client = redis.Redis.from_url(url or settings.shared_state_url, decode_responses=True)
+        self.prefix = settings.shared_state_prefix
+    
+    def get(self, key: str) -> Optional[str]:
+        return self.client.get(self.prefix + key)
+    
+    def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        self.client.set(self.prefix + key, value, px=int(ttl * 1000) if ttl else None)
+    
+    def add(self, key: str, value: str, ttl: Optional[float] = None) -> bool:
+        return bool(self.client.set(self.prefix + key, value, nx=True, px=int(ttl * 1000) if ttl else None))
+    
+    def delete(self, key: str) -> None:
+        self.client.delete(self.prefix + key)
+    
+    def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        value = self.client.incrby(self.prefix + key, amount)
+        if ttl and value == amount:
+            self.client.pexpire(self.prefix + key, int(ttl * 1000))
+        return int(value)
+    
+    def scan(self, prefix: str) -> Dict[str, str]:
+        keys = list(self.client.scan_iter(match=f"{self.prefix}{prefix}*"))
+        if not keys:
+            return {}
+        values = self.client.mget(keys)
+        return {key[len(self.prefix):]: value for key, value in zip(keys, values) if value is not None}
+    
+    def get_many(self, keys: List[str]) -> Dict[str, str]:
+        if not keys:
+            return {}
+        values = self.client.mget([self.prefix + key for key in keys])
+        return {key: value for key, value in zip(keys, values) if value is not None}
+
+
+_shared_state = None
+_shared_state_lock = threading.Lock()
+
+
+def get_shared_state() -> SharedState:
+    global _shared_state
+    
+    if _shared_state is None:
+        with _shared_state_lock:
+            if _shared_state is None:
+                backend = settings.shared_state_backend.lower()
+                if backend == "memory":
+                    _shared_state = MemorySharedState()
+                elif backend == "sqlite":
+                    _shared_state = SQLiteSharedState()
+                elif backend == "redis":
+                    _shared_state = RedisSharedState()
+                else:
+                    raise ValueError(f"Unsupported shared state backend: {backend}. Use 'memory', 'sqlite' or 'redis'.")
+    
+    return _shared_state
\ No newline at end of file
@@ -0,0 +1,423 @@
+
+import asyncio
+import logging
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from app.models.data_models import Conversation, DocumentFilter, ProcessedDocument
+from app.services.content_codec import get_content_codec
+from app.services.database_service import (
+    AsyncDatabaseService, DatabaseService, conversation_to_row, document_to_row, row_to_conversation, row_to_document
+)
+from app.services.serialization import dumps_str, loads
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id TEXT PRIMARY KEY,
+    filename TEXT,
+    file_type TEXT,
+    content TEXT,
+    upload_date TIMESTAMP,
+    file_size INTEGER,
+    metadata TEXT,
+    session_id TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_documents_session_id ON documents(session_id);
+CREATE INDEX IF NOT EXISTS idx_documents_upload_date ON documents(upload_date);
+CREATE TABLE IF NOT EXISTS session_activity (
+    session_id TEXT PRIMARY KEY,
+    last_seen TIMESTAMP NOT NULL
+);
+CREATE TABLE IF NOT EXISTS documents_archive (
+    id TEXT PRIMARY KEY,
+    filename TEXT,
+    file_type TEXT,
+    content TEXT,
+    upload_date TIMESTAMP,
+    file_size INTEGER,
+    metadata TEXT,
+    session_id TEXT,
+    archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS conversation_turns (
+    id TEXT PRIMARY KEY,
+    conversation_id TEXT NOT NULL,
+    session_id TEXT,
+    query TEXT,
+    answer TEXT,
+    source_documents TEXT,
+    citations TEXT,
+    processing_time REAL,
+    created_at TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_conversation_turns_conversation ON conversation_turns(conversation_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_conversation_turns_session ON conversation_turns(session_id);
+CREATE TABLE IF NOT EXISTS conversation_summaries (
+    conversation_id TEXT PRIMARY KEY,
+    session_id TEXT,
+    summary TEXT,
+    turn_count INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP
+);
+"""
+
+TURN_COLUMNS = "id, conversation_id, session_id, query, answer, source_documents, citations, processing_time, created_at"
+
+DOCUMENT_COLUMNS = "id, filename, file_type, content, upload_date, file_size, metadata, session_id"
+
+
+class SQLiteService(DatabaseService):
+    """
+    Single-file local backend for development, benchmarks and evaluation.
+    Mirrors the Supabase schema so the rest of the app can't tell them apart.
+    """
+    
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or settings.sqlite_path
+        self.connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+    
+    def connect(self):
+        try:
+            self.connection = sqlite3.connect(self.path, check_same_thread=False)
+            self.connection.row_factory = sqlite3.Row
+            if self.path != ":memory:":
+                self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.executescript(SCHEMA)
+            turn_columns = {row["name"] for row in self.connection.execute("PRAGMA table_info(conversation_turns)")}
+            if "citations" not in turn_columns:
+                # Databases created before turns kept their citations
+                self.connection.execute("ALTER TABLE conversation_turns ADD COLUMN citations TEXT")
+            logger.info(f"Connected to SQLite at {self.path}")
+        
+        except Exception as e:
+            raise ValueError(f"SQLite connection failed: {e}")
+    
+    def disconnect(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+    
+    def ping(self) -> None:
+        try:
+            self._fetch("SELECT 1", [])
+        
+        except Exception as e:
+            raise ValueError(f"Database ping failed: {e}")
+    
+    def store_document(self, document: ProcessedDocument) -> str:
+        try:
+            row = document_to_row(document)
+            self._execute(
+                f"INSERT INTO documents ({DOCUMENT_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (row["id"], row["filename"], row["file_type"], row["content"], row["upload_date"],
+                 row["file_size"], dumps_str(row["metadata"]), row["session_id"])
+            )
+            return document.id
+        
+        except Exception as e:
+            raise ValueError(f"Failed to store document: {e}")
+    
+    def get_all_documents(self, session_id: Optional[str] = None, filters: Optional[DocumentFilter] = None) -> List[ProcessedDocument]:
+        try:
+            sql, params = self._session_filter(f"SELECT {DOCUMENT_COLUMNS} FROM documents", session_id, filters)
+            rows = self._fetch(sql + " ORDER BY upload_date DESC", params)
+            return [row_to_document(row) for row in rows]
+        
+        except Exception as e:
+            raise ValueError(f"Failed to retrieve documents: {e}")
+    
+    def search_documents(self, query: str, session_id: Optional[str] = None, filters: Optional[DocumentFilter] = None) -> List[ProcessedDocument]:
+        try:
+            documents = self.search_content(query, session_id, filters=filters)
+            return documents or self.search_filenames(query, session_id, filters=filters)
+        
+        except Exception as e:
+            raise ValueError(f"Search failed: {e}")
+    
+    def search_content(self, query: str, session_id: Optional[str] = None, limit: int = 10,
+                       filters: Optional[DocumentFilter] = None) -> List[ProcessedDocument]:
+        sql, params = self._session_filter(f"SELECT {DOCUMENT_COLUMNS} FROM documents", session_id, filters)
+        if not get_content_codec():
+            rows = self._fetch(sql + " AND content LIKE ? LIMIT ?", params + [f"%{query}%", limit])
+            return [row_to_document(row) for row in rows]
+        
+        # Compressed content can't be matched by LIKE; those rows are matched on their
+        # uncompressed retrieval profile, so only the rows returned are decoded
+        rows = self._fetch(
+            sql + " AND (CASE WHEN json_extract(metadata, '$.compression') IS NULL THEN content "
+                  "ELSE json_extract(metadata, '$.profile') END) LIKE ? LIMIT ?",
+            params + [f"%{query}%", limit]
+        )
+        return [row_to_document(row) for row in rows]
+    
+    def search_filenames(self, query: str, session_id: Optional[str] = None, limit: int = 10,
+                         filters: Optional[DocumentFilter] = None) -> List[ProcessedDocument]:
+        sql, params = self._session_filter(f"SELECT {DOCUMENT_COLUMNS} FROM documents", session_id, filters)
+        rows = self._fetch(sql + " AND filename LIKE ? LIMIT ?", params + [f"%{query}%", limit])
+        return [row_to_document(row) for row in rows]
+    
+    def get_document_profiles(self, session_id: Optional[str] = None, filters: Optional[DocumentFilter] = None) -> List[Dict[str, Any]]:
+        try:
+            sql, params = self._session_filter(
+                "SELECT id, filename, json_extract(metadata, '$.profile') AS profile FROM documents", session_id, filters
+            )
+            rows = self._fetch(sql, params)
+            for row in rows:
+                row["profile"] = loads(row["profile"]) if row["profile"] else None
+            return rows
+        
+        except Exception as e:
+            raise ValueError(f"Failed to retrieve document profiles: {e}")
+    
+    def get_documents(self, document_ids: List[str]) -> List[ProcessedDocument]:
+        if not document_ids:
+            return []
+        
+        try:
+            placeholders = ", ".join("?" for _ in document_ids)
+            rows = self._fetch(f"SELECT {DOCUMENT_COLUMNS} FROM documents WHERE id IN ({placeholders})", list(document_ids))
+            return [row_to_document(row) for row in rows]
+        
+        except Exception as e:
+            raise ValueError(f"Failed to retrieve documents: {e}")
+    
+    def get_storage_usage(self, session_id: Optional[str] = None) -> int:
+        try:
+            sql, params = self._session_filter("SELECT COALESCE(SUM(file_size), 0) AS total FROM documents", session_id)
+            return self._fetch(sql, params)[0]["total"]
+        
+        except Exception as e:
+            raise ValueError(f"Failed to compute storage usage: {e}")
+    
+    def touch_session(self, session_id: str) -> None:
+        try:
+            self._execute(
+                "INSERT INTO session_activity (session_id, last_seen) VALUES (?, ?) "
+                "ON CONFLICT(session_id) DO UPDATE SET last_seen = excluded.last_seen",
+                (session_id, datetime.now().isoformat())
+            )
+        
+        except Exception as e:
+            raise ValueError(f"Failed to record session activity: {e}")
+    
+    def get_idle_sessions(self, cutoff: datetime, limit: int) -> List[str]:
+        try:
+            rows = self._fetch(
+                """SELECT session_id FROM (
+                       SELECT session_id, upload_date AS last_active FROM documents WHERE session_id IS NOT NULL
+                       UNION ALL
+                       SELECT session_id, last_seen AS last_active FROM session_activity
+                   )
+                   GROUP BY session_id
+                   HAVING MAX(last_active) < ?
+                   LIMIT ?""",
+                [cutoff.isoformat(), limit]
+            )
+            return [row["session_id"] for row in rows]
+        
+        except Exception as e:
+            raise ValueError(f"Failed to find idle sessions: {e}")
+    
+    def get_session_document_sizes(self, session_id: str, limit: int) -> List[Dict[str, Any]]:
+        try:
+            rows = self._fetch("SELECT id, file_size FROM documents WHERE session_id = ? LIMIT ?", [session_id, limit])
+            return [dict(row) for row in rows]
+        
+        except Exception as e:
+            raise ValueError(f"Failed to list session documents: {e}")
+    
+    def delete_documents(self, document_ids: List[str], archive: bool = False) -> int:
+        if not document_ids:
+            return 0
+        
+        try:
+            placeholders = ", ".join("?" for _ in document_ids)
+            with self._lock:
+                with self.connection:
+                    if archive:
+                        self.connection.execute(
+                            f"INSERT OR REPLACE INTO documents_archive ({DOCUMENT_COLUMNS}) "
+                            f"SELECT {DOCUMENT_COLUMNS} FROM documents WHERE id IN ({placeholders})",
+                            document_ids
+                        )
+                    cursor = self.connection.execute(f"DELETE FROM documents WHERE id IN ({placeholders})", document_ids)
+                    return cursor.rowcount
+        
+        except Exception as e:
+            raise ValueError(f"Failed to delete documents: {e}")
+    
+    def delete_session_activity(self, session_id: str) -> None:
+        try:
+            self._execute("DELETE FROM session_activity WHERE session_id = ?", (session_id,))
+        
+        except Exception as e:
+            raise ValueError(f"Failed to delete session activity: {e}")
+    
+    def store_conversation_turn(self, turn: Conversation) -> None:
+        try:
+            row = conversation_to_row(turn)
+            self._execute(
+                f"INSERT INTO conversation_turns ({TURN_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (row["id"], row["conversation_id"], row["session_id"], row["query"], row["answer"],
+                 dumps_str(row["source_documents"]), dumps_str(row["citations"]), row["processing_time"], row["created_at"])
+            )
+        
+        except Exception as e:
+            raise ValueError(f"Failed to store conversation turn: {e}")
+    
+    def get_conversation_turns(self, conversation_id: str, session_id: Optional[str], offset: int = 0) -> List[Conversation]:
+        try:
+            rows = self._fetch(
+                f"SELECT {TURN_COLUMNS} FROM conversation_turns WHERE conversation_id = ? AND session_id IS ? "
+                "ORDER BY created_at LIMIT -1 OFFSET ?",
+                [conversation_id, session_id, offset]
+            )
+            return [row_to_conversation({**row, "source_documents": loads(row["source_documents"] or "[]"),
+                                         "citations": loads(row["citations"] or "[]")}) for row in rows]
+        
+        except Exception as e:
+            raise ValueError(f"Failed to retrieve conversation: {e}")
+    
+    def get_conversation_summary(self, conversation_id: str, session_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        try:
+            rows = self._fetch(
+                "SELECT summary, turn_count, updated_at FROM conversation_summaries WHERE conversation_id = ? AND session_id IS ?",
+                [conversation_id, session_id]
+            )
+            return rows[0] if rows else None
+        
+        except Exception as e:
+            raise ValueError(f"Failed to retrieve conversation summary: {e}")
+    
+    def get_conversation_owner(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            rows = self._fetch(
+                "SELECT session_id FROM conversation_turns WHERE conversation_id = ? ORDER BY created_at LIMIT 1",
+                [conversation_id]
+            )
+            return rows[0] if rows else None
+        
+        except Exception as e:
+            raise ValueError(f"Failed to retrieve conversation owner: {e}")
+    
+    def save_conversation_summary(self, conversation_id: str, session_id: Optional[str], summary: str, turn_count: int) -> None:
+        try:
+            self._execute(
+                "INSERT OR REPLACE INTO conversation_summaries (conversation_id, session_id, summary, turn_count, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (conversation_id, session_id, summary, turn_count, datetime.now().isoformat())
+            )
+        
+        except Exception as e:
+            raise ValueError(f"Failed to save conversation summary: {e}")
+    
+    def list_conversations(self, session_id: str) -> List[Dict[str, Any]]:
+        try:
+            return self._fetch(
+                """SELECT conversation_id, COUNT(*) AS turns, MIN(created_at) AS started_at,
+                          MAX(created_at) AS updated_at,
+                          (SELECT query FROM conversation_turns t WHERE t.conversation_id = c.conversation_id
+                           ORDER BY created_at DESC LIMIT 1) AS last_query
+                   FROM conversation_turns c
+                   WHERE session_id = ?
+                   GROUP BY conversation_id
+                   ORDER BY updated_at DESC""",
+                [session_id]
+            )
+        
+        except Exception as e:
+            raise ValueError(f"Failed to list conversations: {e}")
+    
+    def delete_session_conversations(self, session_id: str) -> int:
+        try:
+            with self._lock:
+                with self.connection:
+                    self.connection.execute("DELETE FROM conversation_summaries WHERE session_id = ?", (session_id,))
+                    cursor = self.connection.execute("DELETE FROM conversation_turns WHERE session_id = ?", (session_id,))
+                    return cursor.rowcount
+        
+        except Exception as e:
+            raise ValueError(f"Failed to delete conversations: {e}")
+    
+    def _session_filter(self, sql: str, session_id: Optional[str], filters: Optional[DocumentFilter] = None):
+        if session_id:
+            sql, params = sql + " WHERE session_id = ?", [session_id]
+        else:
+            sql, params = sql + " WHERE 1 = 1", []
+        if not filters:
+            return sql, params
+        
+        for column, values in (("id", filters.document_ids), ("filename", filters.filenames), ("file_type", filters.file_types)):
+            if values:
+                sql += f" AND {column} IN ({', '.join('?' for _ in values)})"
+                params.extend(values)
+        # upload_date holds ISO timestamps, which compare correctly as text
+        if filters.uploaded_after:
+            sql += " AND upload_date >= ?"
+            params.append(filters.uploaded_after.isoformat())
+        if filters.uploaded_before:
+            sql += " AND upload_date < ?"
+            params.append(filters.uploaded_before.isoformat())
+        return sql, params
+    
+    def _fetch(self, sql: str, params) -> List[Dict[str, Any]]:
+        if not self.connection:
+            raise ValueError("Not connected to SQLite")
+        
+        with self._lock:
+            rows = self.connection.execute(sql, params).fetchall()
+        result = []
+        for row in rows:
+            row = dict(row)
+            if isinstance(row.get("metadata"), str):
+                row["metadata"] = loads(row["metadata"])
+            result.append(row)
+        return result
+    
+    def _execute(self, sql: str, params):
+        if not self.connection:
+            raise ValueError("Not connected to SQLite")
+        
+        with self._lock:
+            with self.connection:
+                self.connection.execute(sql, params)
+
+
+class AsyncSQLiteService(AsyncDatabaseService):
+    """Runs a (usually shared) SQLiteService on worker threads."""
+    
+    def __init__(self, service: SQLiteService):
+        self.service = service
+    
+    async def connect(self):
+        if self.service.connection is None:
+            await asyncio.to_thread(self.service.connect)
+    
+    async def disconnect(self):
+        # The wrapped service belongs to the sync factory singleton
+        pass
+    
+    async def store_document(self, document: ProcessedDocument) -> str:
+        return await asyncio.to_thread(self.service.store_document, document)
+    
+    async def get_all_documents(self, session_id: Optional[str] = None, filters: Optional[DocumentFilter] = None) -> List[ProcessedDocument]:
+        return await asyncio.to_thread(self.service.get_all_documents, session_id, filters)
+    
+    async def search_content(self, query: str, session_id: Optional[str] = None, limit: int = 10,
+                             filters: Optional[DocumentFilter] = None) -> List[ProcessedDocument]:
+        return await asyncio.to_thread(self.service.search_content, query, session_id, limit, filters)
+    
+    async def search_filenames(self, query: str, session_id: Optional[str] = None, limit: int = 10,
+                               filters: Optional[DocumentFilter] = None) -> List[ProcessedDocument]:
+        return await asyncio.to_thread(self.service.search_filenames, query, session_id, limit, filters)
+    
+    async def get_document_profiles(self, session_id: Optional[str] = None, filters: Optional[DocumentFilter] = None) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(self.service.get_document_profiles, session_id, filters)
+    
+    async def get_documents(self, document_ids: List[str]) -> List[ProcessedDocument]:
+        return await asyncio.to_thread(self.service.get_documents, document_ids)
\ No newline at end of file
@@ -0,0 +1,72 @@
+
+import logging
+from typing import Any, Dict, Optional
+from app.services.shared_state import get_shared_state
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class StorageQuota:
+    
+    def __init__(self, db_service):
+        self.db_service = db_service
+        self.global_limit = settings.max_storage_size
+        self.session_limit = settings.max_session_storage_size
+        self.cache_seconds = settings.storage_usage_cache_seconds
+        self.state = get_shared_state()
+    
+    def check(self, session_id: Optional[str], size: int):
+        try:
+            session_usage = None
+            if self.session_limit and session_id:
+                session_usage = self.db_service.get_storage_usage(session_id=session_id)
+            global_usage = self.get_global_usage() if self.global_limit else None
+        except Exception as e:
+            # Quotas protect storage, they shouldn't take uploads down with the database
+            logger.warning(f"Storage usage unavailable, skipping quota check: {e}")
+            return
+        
+        if session_usage is not None and session_usage + size > self.session_limit:
+            raise StorageQuotaError(
+                f"Session storage quota exceeded ({self._format(session_usage)} of "
+                f"{self._format(self.session_limit)} used)"
+            )
+        
+        if global_usage is not None:
+            if global_usage + size > self.global_limit:
+                raise StorageQuotaError("Server storage is full. Please try again later.")
+    
+    def record(self, size: int):
+        if self.state.get("storage:global_usage") is not None:
+            self.state.incr("storage:global_usage", size)
+    
+    def invalidate(self):
+        self.state.delete("storage:global_usage")
+    
+    def get_global_usage(self) -> int:
+        # The global total is read from the database at most once per cache
+        # window; uploads in between, from any worker, are added via record().
+        cached = self.state.get("storage:global_usage")
+        if cached is not None:
+            return int(cached)
+        
+        usage = self.db_service.get_storage_usage()
+        if self.cache_seconds > 0:
+            self.state.set("storage:global_usage", str(usage), ttl=self.cache_seconds)
+        return usage
+    
+    def get_status(self) -> Dict[str, Any]:
+        cached = self.state.get("storage:global_usage")
+        return {
+            "global_limit_bytes": self.global_limit,
+            "session_limit_bytes": self.session_limit,
+            "global_usage_bytes": int(cached) if cached is not None else None
+        }
+    
+    def _format(self, size: int) -> str:
+        return f"{size / (1024 * 1024):.1f} MB"
+
+
+class StorageQuotaError(Exception):
+    pass
\ No newline at end of file
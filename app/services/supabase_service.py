@@ -1,14 +1,19 @@
 
 import logging
-from typing import List, Optional
+from datetime import datetime
+from typing import Any, Dict, List, Optional
 from supabase import create_client, Client
-from app.models.data_models import ProcessedDocument
+from app.models.data_models import Conversation, DocumentFilter, ProcessedDocument
+from app.services.content_codec import get_content_codec
+from app.services.database_service import (
+    DatabaseService, conversation_to_row, document_to_row, row_to_conversation, row_to_document
+)
 from config import settings
 
 logger = logging.getLogger(__name__)
 
 
-class SupabaseService:
+class SupabaseService(DatabaseService):
     
     def __init__(self):
         self.client = None
@@ -20,19 +25,29 @@ class SupabaseService:
         try:
             self.client = create_client(settings.supabase_url, settings.supabase_key)
             logger.info("Connected to Supabase")
-            
+        
         except Exception as e:
             raise ValueError(f"Supabase connection failed: {e}")
     
     def disconnect(self):
         self.client = None
     
+    def ping(self) -> None:
+        if not self.client:
+            raise ValueError("Not connected to Supabase")
+        
+        try:
+            self.client.table("documents").select("id").limit(1).execute()
+        
+        except Exception as e:
+            raise ValueError(f"Database ping failed: {e}")
+    
     def store_document(self, document: ProcessedDocument) -> str:
         if not self.client:
             raise ValueError("Not connected to Supabase")
         
         try:
-            document_data = document.to_dict()
+            document_data = document_to_row(document)
             document_data["upload_date"] = document.upload_date.isoformat()
             
             result = self.client.table("documents").insert(document_data).execute()
@@ -41,51 +56,295 @@ class SupabaseService:
                 raise ValueError("Failed to insert document")
             
             return document.id
-            
+        
         except Exception as e:
             raise ValueError(f"Failed to store document: {e}")
     
-    def get_all_documents(self, session_id: Optional[str] = None) -> List[ProcessedDocument]:
+    def get_all_documents(self, session_id: Optional[str] = None, filters: Optional[DocumentFilter] = None) -> List[ProcessedDocument]:
         if not self.client:
             raise ValueError("Not connected to Supabase")
         
         try:
-            query = self.client.table("documents").select("*")
+            query = self._apply_filters(self.client.table("documents").select("*"), filters)
             
             # Filter by session_id if provided
             if session_id:
                 query = query.eq("session_id", session_id)
             
             result = query.order("upload_date", desc=True).execute()
-            return [ProcessedDocument.from_dict(doc) for doc in result.data]
-            
+            return [row_to_document(doc) for doc in result.data]
+        
         except Exception as e:
             raise ValueError(f"Failed to retrieve documents: {e}")
     
-    def search_documents(self, query: str, session_id: Optional[str] = None) -> List[ProcessedDocument]:
+    def search_documents(self, query: str, session_id: Optional[str] = None, filters: Optional[DocumentFilter] = None) -> List[ProcessedDocument]:
         if not self.client:
             raise ValueError("Not connected to Supabase")
         
         try:
             # Search in content first
-            content_query = self.client.table("documents").select("*").ilike("content", f"%{query}%")
+            content_query = self._apply_filters(self.client.table("documents").select("*"), filters).ilike("content", f"%{query}%")
             
             # Filter by session_id if provided
             if session_id:
                 content_query = content_query.eq("session_id", session_id)
             
+            # Compressed content can't be matched by ilike; those rows are matched
+            # on their uncompressed retrieval profile instead.
+            if get_content_codec():
+                content_query = content_query.is_("metadata->compression", "null")
+            
             result = content_query.limit(10).execute()
+            documents = [row_to_document(doc) for doc in result.data]
+            
+            if get_content_codec() and len(documents) < 10:
+                documents.extend(self._search_compressed_content(query, session_id, 10 - len(documents), filters))
+            
+            if documents:
+                return documents
             
             # If no results, search by filename
-            if not result.data:
-                filename_query = self.client.table("documents").select("*").ilike("filename", f"%{query}%")
-                
-                if session_id:
-                    filename_query = filename_query.eq("session_id", session_id)
-                
-                result = filename_query.limit(10).execute()
+            filename_query = self._apply_filters(self.client.table("documents").select("*"), filters).ilike("filename", f"%{query}%")
             
-            return [ProcessedDocument.from_dict(doc) for doc in result.data]
+            if session_id:
+                filename_query = filename_query.eq("session_id", session_id)
             
+            result = filename_query.limit(10).execute()
+            return [row_to_document(doc) for doc in result.data]
+        
+        except Exception as e:
+            raise ValueError(f"Search failed: {e}")
+    
+    def get_storage_usage(self, session_id: Optional[str] = None) -> int:
+        if not self.client:
+            raise ValueError("Not connected to Supabase")
+        
+        try:
+            # Summed by views in the database; fetching every row would also stop at PostgREST's row cap
+            if session_id:
+                query = self.client.table("session_storage_usage").select("total_bytes").eq("session_id", session_id)
+            else:
+                query = self.client.table("storage_usage").select("total_bytes")
+            result = query.execute()
+            return int(result.data[0]["total_bytes"]) if result.data else 0
+        
+        except Exception as e:
+            raise ValueError(f"Failed to compute storage usage: {e}")
+    
+    def touch_session(self, session_id: str) -> None:
+        if not self.client:
+            raise ValueError("Not connected to Supabase")
+        
+        try:
+            self.client.table("session_activity").upsert({
+                "session_id": session_id,
+                "last_seen": datetime.now().isoformat()
+            }).execute()
+        
+        except Exception as e:
+            raise ValueError(f"Failed to record session activity: {e}")
+    
+    def get_idle_sessions(self, cutoff: datetime, limit: int) -> List[str]:
+        if not self.client:
+            raise ValueError("Not connected to Supabase")
+        
+        try:
+            # A session stays alive while it keeps uploading or querying; the view
+            # aggregates both per session in the database
+            result = self.client.table("session_last_active").select("session_id") \
+                .lt("last_active", cutoff.isoformat()) \
+                .limit(limit) \
+                .execute()
+            return [row["session_id"] for row in result.data]
+        
+        except Exception as e:
+            raise ValueError(f"Failed to find idle sessions: {e}")
+    
+    def get_document_profiles(self, session_id: Optional[str] = None, filters: Optional[DocumentFilter] = None) -> List[Dict[str, Any]]:
+        if not self.client:
+            raise ValueError("Not connected to Supabase")
+        
+        try:
+            query = self._apply_filters(self.client.table("documents").select("id, filename, profile:metadata->profile"), filters)
+            if session_id:
+                query = query.eq("session_id", session_id)
+            return query.execute().data
+        
+        except Exception as e:
+            raise ValueError(f"Failed to retrieve document profiles: {e}")
+    
+    def get_session_document_sizes(self, session_id: str, limit: int) -> List[Dict[str, Any]]:
+        if not self.client:
+            raise ValueError("Not connected to Supabase")
+        
+        try:
+            result = self.client.table("documents").select("id, file_size") \
+                .eq("session_id", session_id).limit(limit).execute()
+            return result.data
+        
         except Exception as e:
-            raise ValueError(f"Search failed: {e}")
\ No newline at end of file
+            raise ValueError(f"Failed to list session documents: {e}")
+    
+    def delete_documents(self, document_ids: List[str], archive: bool = False) -> int:
+        if not self.client:
+            raise ValueError("Not connected to Supabase")
+        if not document_ids:
+            return 0
+        
+        try:
+            if archive:
+                rows = self.client.table("documents").select("*").in_("id", document_ids).execute().data
+                if rows:
+                    self.client.table("documents_archive").upsert(rows).execute()
+            
+            result = self.client.table("documents").delete().in_("id", document_ids).execute()
+            return len(result.data)
+        
+        except Exception as e:
+            raise ValueError(f"Failed to delete documents: {e}")
+    
+    def delete_session_activity(self, session_id: str) -> None:
+        if not self.client:
+            raise ValueError("Not connected to Supabase")
+        
+        try:
+            self.client.table("session_activity").delete().eq("session_id", session_id).execute()
+        
+        except Exception as e:
+            raise ValueError(f"Failed to delete session activity: {e}")
+    
+    def store_conversation_turn(self, turn: Conversation) -> None:
+        if not self.client:
+            raise ValueError("Not connected to Supabase")
+        
+        try:
+            self.client.table("conversation_turns").insert(conversation_to_row(turn)).execute()
+        
+        except Exception as e:
+            raise ValueError(f"Failed to store conversation turn: {e}")
+    
+    def get_conversation_turns(self, conversation_id: str, session_id: Optional[str], offset: int = 0) -> List[Conversation]:
+        if not self.client:
+            raise ValueError("Not connected to Supabase")
+        
+        try:
+            query = self.client.table("conversation_turns").select("*").eq("conversation_id", conversation_id)
+            result = self._eq_session(query, session_id) \
+                .order("created_at") \
+                .range(offset, offset + 999) \
+                .execute()
+            return [row_to_conversation(row) for row in result.data]
+        
+        except Exception as e:
+            raise ValueError(f"Failed to retrieve conversation: {e}")
+    
+    def get_conversation_summary(self, conversation_id: str, session_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        if not self.client:
+            raise ValueError("Not connected to Supabase")
+        
+        try:
+            query = self.client.table("conversation_summaries").select("summary, turn_count, updated_at") \
+                .eq("conversation_id", conversation_id)
+            result = self._eq_session(query, session_id).limit(1).execute()
+            return result.data[0] if result.data else None
+        
+        except Exception as e:
+            raise ValueError(f"Failed to retrieve conversation summary: {e}")
+    
+    def get_conversation_owner(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        if not self.client:
+            raise ValueError("Not connected to Supabase")
+        
+        try:
+            result = self.client.table("conversation_turns").select("session_id") \
+                .eq("conversation_id", conversation_id).order("created_at").limit(1).execute()
+            return result.data[0] if result.data else None
+        
+        except Exception as e:
+            raise ValueError(f"Failed to retrieve conversation owner: {e}")
+    
+    def save_conversation_summary(self, conversation_id: str, session_id: Optional[str], summary: str, turn_count: int) -> None:
+        if not self.client:
+            raise ValueError("Not connected to Supabase")
+        
+        try:
+            self.client.table("conversation_summaries").upsert({
+                "conversation_id": conversation_id,
+                "session_id": session_id,
+                "summary": summary,
+                "turn_count": turn_count,
+                "updated_at": datetime.now().isoformat()
+            }).execute()
+        
+        except Exception as e:
+            raise ValueError(f"Failed to save conversation summary: {e}")
+    
+    def list_conversations(self, session_id: str) -> List[Dict[str, Any]]:
+        if not self.client:
+            raise ValueError("Not connected to Supabase")
+        
+        try:
+            result = self.client.table("conversation_turns").select("conversation_id, query, created_at") \
+                .eq("session_id", session_id).order("created_at", desc=True).execute()
+            
+            conversations: Dict[str, Dict[str, Any]] = {}
+            for row in result.data:
+                entry = conversations.get(row["conversation_id"])
+                if entry is None:
+                    conversations[row["conversation_id"]] = {
+                        "conversation_id": row["conversation_id"],
+                        "turns": 1,
+                        "started_at": row["created_at"],
+                        "updated_at": row["created_at"],
+                        "last_query": row["query"]
+                    }
+                else:
+                    entry["turns"] += 1
+                    entry["started_at"] = row["created_at"]
+            return list(conversations.values())
+        
+        except Exception as e:
+            raise ValueError(f"Failed to list conversations: {e}")
+    
+    def delete_session_conversations(self, session_id: str) -> int:
+        if not self.client:
+            raise ValueError("Not connected to Supabase")
+        
+        try:
+            self.client.table("conversation_summaries").delete().eq("session_id", session_id).execute()
+            result = self.client.table("conversation_turns").delete().eq("session_id", session_id).execute()
+            return len(result.data)
+        
+        except Exception as e:
+            raise ValueError(f"Failed to delete conversations: {e}")
+    
+    def _eq_session(self, query, session_id: Optional[str]):
+        # Turns stored without a session only match requests without one
+        return query.eq("session_id", session_id) if session_id is not None else query.is_("session_id", "null")
+    
+    def _apply_filters(self, query, filters: Optional[DocumentFilter]):
+        if not filters:
+            return query
+        if filters.document_ids:
+            query = query.in_("id", filters.document_ids)
+        if filters.filenames:
+            query = query.in_("filename", filters.filenames)
+        if filters.file_types:
+            query = query.in_("file_type", filters.file_types)
+        if filters.uploaded_after:
+            query = query.gte("upload_date", filters.uploaded_after.isoformat())
+        if filters.uploaded_before:
+            query = query.lt("upload_date", filters.uploaded_before.isoformat())
+        return query
+    
+    def _search_compressed_content(self, query: str, session_id: Optional[str], limit: int,
+                                   filters: Optional[DocumentFilter] = None) -> List[ProcessedDocument]:
+        compressed_query = self._apply_filters(self.client.table("documents").select("*"), filters)
+        compressed_query = compressed_query.filter("metadata->compression", "not.is", "null") \
+            .ilike("metadata->>profile", f"%{query}%")
+        
+        if session_id:
+            compressed_query = compressed_query.eq("session_id", session_id)
+        
+        result = compressed_query.limit(limit).execute()
+        return [row_to_document(row) for row in result.data]
\ No newline at end of file
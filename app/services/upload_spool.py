@@ -0,0 +1,223 @@
+
+import fcntl
+import hashlib
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple
+from app.services.metrics import registry
+from app.services.serialization import dumps, loads
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+HASH_BLOCK_SIZE = 1024 * 1024
+# PATCH bodies are written to the spool in blocks of this size as they stream in
+WRITE_BLOCK_SIZE = 1024 * 1024
+
+UPLOADS = registry.counter("researchpilot_resumable_uploads_total", "Resumable uploads removed from the spool by outcome")
+UPLOAD_BYTES = registry.counter("researchpilot_resumable_upload_bytes_total", "Bytes received in resumable upload chunks")
+
+
+class UploadSpool:
+    """
+    Resumable uploads, tus style: an upload is created with its final length,
+    chunks are appended at an explicit offset, and the finished spool file is
+    handed to the normal upload pipeline.
+    
+    Each upload is ``<id>.part`` (the bytes so far) and ``<id>.json`` (filename,
+    session, length) under one directory, so any worker can continue an upload
+    another worker started. The file size is the offset; chunks that don't
+    start there are refused, and a flock on the part file keeps concurrent
+    writers to one. SHA-256 is updated as chunks arrive, so finishing doesn't
+    re-read the file unless the previous chunk went to another worker.
+    """
+    
+    def __init__(self, directory: Optional[str] = None, max_size: Optional[int] = None,
+                 ttl_seconds: Optional[int] = None):
+        self.directory = directory or settings.upload_spool_dir or os.path.join(settings.upload_dir, "spool")
+        self.max_size = max_size or settings.resumable_upload_max_size
+        self.ttl_seconds = ttl_seconds or settings.upload_spool_ttl_seconds
+        self._hashes: Dict[str, Tuple[int, Any]] = {}
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+    
+    def create(self, filename: str, length: int, session_id: Optional[str] = None,
+               sha256: Optional[str] = None) -> Dict[str, Any]:
+        self.check_length(length)
+        self.expire()
+        upload_id = uuid.uuid4().hex
+        meta = {
+            "filename": filename,
+            "length": length,
+            "session_id": session_id,
+            "sha256": sha256.lower() if sha256 else None,
+            "created": time.time()
+        }
+        open(self.part_path(upload_id), "xb").close()
+        self._write_meta(upload_id, meta)
+        return self._info(upload_id, meta, 0)
+    
+    def check_length(self, length: int):
+        if length <= 0:
+            raise UploadError("Upload length must be positive", 400)
+        if length > self.max_size:
+            raise UploadError(f"File too large. Maximum size is {self.max_size // (1024 * 1024)}MB", 413)
+    
+    def exists(self, upload_id: str) -> bool:
+        return os.path.exists(self._meta_path(upload_id))
+    
+    def get(self, upload_id: str) -> Dict[str, Any]:
+        meta = self._read_meta(upload_id)
+        try:
+            return self._info(upload_id, meta, os.path.getsize(self.part_path(upload_id)))
+        except FileNotFoundError:
+            raise UploadError("Upload not found", 404)
+    
+    def append(self, upload_id: str, offset: int, data: bytes) -> int:
+        """Write ``data`` at ``offset``, which must be the current end of the upload. Returns the new offset."""
+        meta = self._read_meta(upload_id)
+        with self._locked(upload_id) as file:
+            current = file.seek(0, os.SEEK_END)
+            if offset != current:
+                raise UploadError(f"Upload offset is {current}, not {offset}", 409, offset=current)
+            if current + len(data) > meta["length"]:
+                raise UploadError("Chunk extends past the declared upload length", 413, offset=current)
+            
+            hasher = self._hasher(upload_id, file, current)
+            file.write(data)
+            file.flush()
+            hasher.update(data)
+            with self._lock:
+                self._hashes[upload_id] = (current + len(data), hasher)
+        UPLOAD_BYTES.inc(len(data))
+        return current + len(data)
+    
+    def finish(self, upload_id: str) -> Tuple[str, Dict[str, Any]]:
+        """Check the upload is complete and intact; returns the part file path and upload info."""
+        meta = self._read_meta(upload_id)
+        with self._locked(upload_id) as file:
+            size = file.seek(0, os.SEEK_END)
+            if size != meta["length"]:
+                raise UploadError(f"Upload is incomplete ({size} of {meta['length']} bytes)", 409, offset=size)
+            digest = self._hasher(upload_id, file, size).hexdigest()
+        
+        if meta["sha256"] and meta["sha256"] != digest:
+            # A corrupted upload can't be repaired by resuming, so it's removed
+            self.discard(upload_id, outcome="checksum_mismatch")
+            raise UploadError("Upload checksum does not match", 422, offset=size)
+        info = self._info(upload_id, meta, size)
+        info["sha256"] = digest
+        return self.part_path(upload_id), info
+    
+    def discard(self, upload_id: str, outcome: str = "aborted"):
+        with self._lock:
+            self._hashes.pop(upload_id, None)
+        removed = False
+        for path in (self._meta_path(upload_id), self.part_path(upload_id)):
+            try:
+                os.remove(path)
+                removed = True
+            except FileNotFoundError:
+                pass
+        if removed:
+            UPLOADS.inc(outcome=outcome)
+    
+    def expire(self) -> int:
+        """Remove uploads that haven't received a chunk within the TTL."""
+        cutoff = time.time() - self.ttl_seconds
+        expired = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith(".part"):
+                continue
+            try:
+                if os.path.getmtime(os.path.join(self.directory, name)) < cutoff:
+                    self.discard(name[:-len(".part")], outcome="expired")
+                    expired += 1
+            except OSError:
+                continue
+        if expired:
+            logger.info(f"Removed {expired} abandoned uploads")
+        return expired
+    
+    def _hasher(self, upload_id: str, file, size: int):
+        with self._lock:
+            cached = self._hashes.get(upload_id)
+        if cached and cached[0] == size:
+            return cached[1].copy()
+        
+        # Earlier chunks were written by another worker (or before a restart)
+        hasher = hashlib.sha256()
+        file.seek(0)
+        remaining = size
+        while remaining:
+            block = file.read(min(HASH_BLOCK_SIZE, remaining))
+            if not block:
+                break
+            hasher.update(block)
+            remaining -= len(block)
+        file.seek(size)
+        return hasher
+    
+    @contextmanager
+    def _locked(self, upload_id: str) -> Iterator[Any]:
+        try:
+            file = open(self.part_path(upload_id), "r+b")
+        except FileNotFoundError:
+            raise UploadError("Upload not found", 404)
+        with file:
+            try:
+                fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                raise UploadError("Another request is writing to this upload", 409)
+            try:
+                yield file
+            finally:
+                fcntl.flock(file, fcntl.LOCK_UN)
+    
+    def _info(self, upload_id: str, meta: Dict[str, Any], offset: int) -> Dict[str, Any]:
+        return {
+            "upload_id": upload_id,
+            "filename": meta["filename"],
+            "session_id": meta["session_id"],
+            "length": meta["length"],
+            "offset": offset,
+            "complete": offset == meta["length"]
+        }
+    
+    def _read_meta(self, upload_id: str) -> Dict[str, Any]:
+        try:
+            with open(self._meta_path(upload_id), "rb") as file:
+                return loads(file.read())
+        except FileNotFoundError:
+            raise UploadError("Upload not found", 404)
+    
+    def _write_meta(self, upload_id: str, meta: Dict[str, Any]):
+        temporary_path = f"{self._meta_path(upload_id)}.tmp"
+        with open(temporary_path, "wb") as file:
+            file.write(dumps(meta))
+        os.replace(temporary_path, self._meta_path(upload_id))
+    
+    def part_path(self, upload_id: str) -> str:
+        return os.path.join(self.directory, f"{_checked(upload_id)}.part")
+    
+    def _meta_path(self, upload_id: str) -> str:
+        return os.path.join(self.directory, f"{_checked(upload_id)}.json")
+
+
+def _checked(upload_id: str) -> str:
+    # Upload ids come from the URL; only our own hex ids may name a file
+    if len(upload_id) != 32 or any(c not in "0123456789abcdef" for c in upload_id):
+        raise UploadError("Upload not found", 404)
+    return upload_id
+
+
+class UploadError(Exception):
+    
+    def __init__(self, message: str, status_code: int = 400, offset: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.offset = offset
\ No newline at end of file
@@ -0,0 +1,195 @@
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, Optional
+from app.services.metrics import model_label, registry
+from app.services.shared_state import get_shared_state
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+TOKENS = registry.counter("researchpilot_llm_tokens_total", "LLM tokens by model, API key and kind (prompt, completion, cached)")
+COST = registry.counter("researchpilot_llm_cost_usd_total", "LLM cost reported by OpenRouter, in USD")
+REQUESTS = registry.counter("researchpilot_llm_requests_total", "Completed LLM calls by model and API key")
+BUDGET_REJECTIONS = registry.counter("researchpilot_token_budget_rejected_total", "Queries refused because the session used up its token budget")
+
+FIELDS = ("prompt_tokens", "completion_tokens", "cached_tokens", "cost_microusd", "requests")
+BUCKET_SECONDS = 3600
+
+_current_session: ContextVar[Optional[str]] = ContextVar("usage_session", default=None)
+
+
+@contextmanager
+def usage_session(session_id: Optional[str]) -> Iterator[None]:
+    """Attribute LLM calls made inside the block (including worker threads it starts) to a session."""
+    token = _current_session.set(session_id)
+    try:
+        yield
+    finally:
+        _current_session.reset(token)
+
+
+@dataclass
+class Usage:
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0
+    cost: float = 0.0
+    
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+    
+    @classmethod
+    def from_response(cls, api_response: Dict[str, Any]) -> "Usage":
+        usage = api_response.get("usage") or {}
+        details = usage.get("prompt_tokens_details") or {}
+        return cls(
+            prompt_tokens=int(usage.get("prompt_tokens") or 0),
+            completion_tokens=int(usage.get("completion_tokens") or 0),
+            cached_tokens=int(details.get("cached_tokens") or 0),
+            cost=float(usage.get("cost") or 0.0)
+        )
+
+
+class UsageTracker:
+    """
+    Rolling token and cost totals per session, model and API key. Counters
+    live in shared state in hourly buckets that expire after the window, so
+    all workers see the same totals and old usage drops out on its own.
+    API keys are only ever recorded by fingerprint.
+    """
+    
+    def __init__(self, state=None):
+        self.state = state or get_shared_state()
+        self.window_hours = max(settings.usage_window_hours, 1)
+        self.session_budget = settings.session_token_budget
+        self.ttl = (self.window_hours + 1) * BUCKET_SECONDS
+    
+    def record(self, usage: Usage, model: str, key_id: str, pooled_key: bool = True, session_id: Optional[str] = None):
+        session_id = session_id if session_id is not None else _current_session.get()
+        values = {
+            "prompt_tokens": usage.prompt_tokens,
+            "completion_tokens": usage.completion_tokens,
+            "cached_tokens": usage.cached_tokens,
+            "cost_microusd": round(usage.cost * 1_000_000),
+            "requests": 1
+        }
+        # User-supplied keys are one label value each, so they stay out of the metric labels
+        key_label = key_id if pooled_key else "runtime"
+        model_name = model_label(model)
+        TOKENS.inc(usage.prompt_tokens, model=model_name, key=key_label, kind="prompt")
+        TOKENS.inc(usage.completion_tokens, model=model_name, key=key_label, kind="completion")
+        TOKENS.inc(usage.cached_tokens, model=model_name, key=key_label, kind="cached")
+        COST.inc(usage.cost, model=model_name, key=key_label)
+        REQUESTS.inc(model=model_name, key=key_label)
+        
+        bucket = self._bucket()
+        targets = {"session": session_id, "model": model, "key": key_id}
+        try:
+            for dimension, value in targets.items():
+                if not value:
+                    continue
+                for field, amount in values.items():
+                    if amount:
+                        self.state.incr(f"usage:{bucket}:{dimension}:{value}:{field}", amount, ttl=self.ttl)
+        except Exception as e:
+            # Accounting must never fail the answer it is accounting for
+            logger.warning(f"Could not record LLM usage: {e}")
+    
+    def totals(self, dimension: str, value: Optional[str] = None) -> Dict[str, Dict[str, float]]:
+        """Sum the buckets in the window, grouped by value of ``dimension``."""
+        current = self._bucket()
+        buckets = range(current - self.window_hours + 1, current + 1)
+        if value is not None:
+            # Every key is known, so they are read in one batch instead of a keyspace scan per bucket
+            counters = self.state.get_many([f"usage:{bucket}:{dimension}:{value}:{field}" for bucket in buckets for field in FIELDS])
+        else:
+            counters = {}
+            for bucket in buckets:
+                counters.update(self.state.scan(f"usage:{bucket}:{dimension}:"))
+        
+        grouped: Dict[str, Dict[str, float]] = {}
+        for key, amount in counters.items():
+            # usage:<bucket>:<dimension>:<name>:<field>, where model names may contain colons
+            name, field = key.split(":", 3)[3].rsplit(":", 1)
+            if field not in FIELDS:
+                continue
+            entry = grouped.setdefault(name, dict.fromkeys(FIELDS, 0))
+            entry[field] += int(amount)
+        return {name: self._format(entry) for name, entry in grouped.items()}
+    
+    def session_tokens(self, session_id: str) -> int:
+        entry = self.totals("session", session_id).get(session_id)
+        return entry["total_tokens"] if entry else 0
+    
+    def check_budget(self, session_id: Optional[str]):
+        if not self.session_budget or not session_id:
+            return
+        used = self.session_tokens(session_id)
+        if used >= self.session_budget:
+            BUDGET_REJECTIONS.inc()
+            raise TokenBudgetExceeded(
+                f"Session token budget of {self.session_budget} tokens per {self.window_hours}h used up ({used} tokens)",
+                retry_after=BUCKET_SECONDS - int(time.time()) % BUCKET_SECONDS
+            )
+    
+    def summary(self, session_id: Optional[str] = None) -> Dict[str, Any]:
+        if session_id:
+            totals = self.totals("session", session_id).get(session_id) or self._format(dict.fromkeys(FIELDS, 0))
+            return {
+                "window_hours": self.window_hours,
+                "session_id": session_id,
+                "usage": totals,
+                "token_budget": self.session_budget or None,
+                "tokens_remaining": max(self.session_budget - totals["total_tokens"], 0) if self.session_budget else None
+            }
+        
+        sessions = self.totals("session")
+        top_sessions = sorted(sessions.items(), key=lambda item: item[1]["total_tokens"], reverse=True)[:20]
+        return {
+            "window_hours": self.window_hours,
+            "models": self.totals("model"),
+            "keys": self.totals("key"),
+            "top_sessions": dict(top_sessions),
+            "sessions": len(sessions)
+        }
+    
+    def _format(self, entry: Dict[str, int]) -> Dict[str, float]:
+        return {
+            "prompt_tokens": entry["prompt_tokens"],
+            "completion_tokens": entry["completion_tokens"],
+            "cached_tokens": entry["cached_tokens"],
+            "total_tokens": entry["prompt_tokens"] + entry["completion_tokens"],
+            "cost_usd": round(entry["cost_microusd"] / 1_000_000, 6),
+            "requests": entry["requests"]
+        }
+    
+    def _bucket(self) -> int:
+        return int(time.time() // BUCKET_SECONDS)
+
+
+_usage_tracker = None
+_usage_tracker_lock = threading.Lock()
+
+
+def get_usage_tracker() -> UsageTracker:
+    global _usage_tracker
+    
+    if _usage_tracker is None:
+        with _usage_tracker_lock:
+            if _usage_tracker is None:
+                _usage_tracker = UsageTracker()
+    return _usage_tracker
+
+
+class TokenBudgetExceeded(Exception):
+    
+    def __init__(self, message: str, retry_after: int = 60, status_code: int = 429):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.status_code = status_code
\ No newline at end of file
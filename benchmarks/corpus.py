@@ -0,0 +1,177 @@
+
+import os
+import random
+from dataclasses import dataclass, field
+from typing import List, Tuple
+
+from docx import Document
+from PIL import Image, ImageDraw
+
+WORDS = (
+    "analysis approach baseline benchmark chapter cluster compute dataset design distributed "
+    "evaluation experiment feature framework gradient hypothesis inference kernel latency "
+    "learning measurement memory method model network optimizer parameter pipeline protocol "
+    "query ranking regression replication research result sample schedule signal storage "
+    "system theory throughput training transfer validation variance workload"
+).split()
+
+TOPICS = ["astronomy", "biology", "chemistry", "economics", "geology", "linguistics", "physics", "robotics"]
+
+
+@dataclass
+class CorpusDocument:
+    path: str
+    filename: str
+    file_type: str
+    facts: List[Tuple[str, str]] = field(default_factory=list)
+
+
+def _sentence(rng: random.Random, length: int = 14) -> str:
+    words = [rng.choice(WORDS) for _ in range(length)]
+    return " ".join(words).capitalize() + "."
+
+
+def _paragraph(rng: random.Random, sentences: int = 5) -> str:
+    return " ".join(_sentence(rng, rng.randint(8, 18)) for _ in range(sentences))
+
+
+def _facts(rng: random.Random, index: int, topic: str) -> List[Tuple[str, str]]:
+    day = rng.randint(1, 28)
+    month = rng.choice(["January", "March", "May", "July", "September", "November"])
+    budget = rng.randint(10, 990) * 1000
+    lead = rng.choice(["Ada Park", "Ravi Menon", "Lena Ortiz", "Tomas Berg", "Mei Tanaka"])
+    return [
+        (f"What is the due date for the {topic} project {index}?",
+         f"The due date for the {topic} project {index} is {month} {day}."),
+        (f"What is the budget of the {topic} project {index}?",
+         f"The {topic} project {index} has a total budget of {budget} dollars."),
+        (f"Who leads the {topic} project {index}?",
+         f"The {topic} project {index} is led by {lead}."),
+    ]
+
+
+def _body(rng: random.Random, facts: List[Tuple[str, str]], paragraphs: int) -> List[str]:
+    parts = [_paragraph(rng) for _ in range(paragraphs)]
+    for _, passage in facts:
+        position = rng.randint(0, len(parts) - 1)
+        parts[position] = parts[position] + " " + passage
+    return parts
+
+
+def write_pdf(path: str, pages: List[List[str]]):
+    """Write a minimal text-layer PDF (Helvetica, one line per entry)."""
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        None,
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_ids = []
+    for lines in pages:
+        escaped = [line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") for line in lines]
+        stream = "BT /F1 10 Tf 14 TL 40 800 Td " + " ".join(f"({line}) Tj T*" for line in escaped) + " ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        content_id = len(objects)
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R >>"
+        )
+        page_ids.append(len(objects))
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(f'{i} 0 R' for i in page_ids)}] /Count {len(page_ids)} >>"
+    
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(output))
+        output.extend(f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1"))
+    xref_offset = len(output)
+    output.extend(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1"))
+    for offset in offsets:
+        output.extend(f"{offset:010d} 00000 n \n".encode("latin-1"))
+    output.extend(f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode("latin-1"))
+    
+    with open(path, "wb") as file:
+        file.write(output)
+
+
+def _wrap(text: str, width: int = 95) -> List[str]:
+    lines, current = [], ""
+    for word in text.split():
+        if current and len(current) + len(word) + 1 > width:
+            lines.append(current)
+            current = word
+        else:
+            current = f"{current} {word}".strip()
+    if current:
+        lines.append(current)
+    return lines
+
+
+def _make_pdf(path: str, title: str, parts: List[str], lines_per_page: int = 50):
+    lines = [title, ""]
+    for part in parts:
+        lines.extend(_wrap(part))
+        lines.append("")
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)]
+    write_pdf(path, pages)
+
+
+def _make_docx(path: str, title: str, parts: List[str]):
+    document = Document()
+    document.add_heading(title, level=1)
+    for number, part in enumerate(parts, 1):
+        if number % 3 == 1:
+            document.add_heading(f"Section {number // 3 + 1}", level=2)
+        document.add_paragraph(part)
+    document.save(path)
+
+
+def _make_markdown(path: str, title: str, parts: List[str]):
+    lines = [f"# {title}", ""]
+    for number, part in enumerate(parts, 1):
+        if number % 3 == 1:
+            lines.extend([f"## Section {number // 3 + 1}", ""])
+        lines.extend([part, ""])
+    with open(path, "w", encoding="utf-8") as file:
+        file.write("\n".join(lines))
+
+
+def _make_image(path: str, title: str, parts: List[str]):
+    lines = [title, ""] + _wrap(" ".join(parts), width=80)[:40]
+    image = Image.new("RGB", (1000, 40 + 22 * len(lines)), "white")
+    draw = ImageDraw.Draw(image)
+    for number, line in enumerate(lines):
+        draw.text((20, 20 + 22 * number), line, fill="black")
+    image.save(path)
+
+
+WRITERS = {
+    ".pdf": _make_pdf,
+    ".docx": _make_docx,
+    ".md": _make_markdown,
+    ".png": _make_image,
+}
+
+
+def generate_corpus(output_dir: str, documents: int = 20, paragraphs: int = 12, seed: int = 42,
+                    file_types: Tuple[str, ...] = (".pdf", ".docx", ".md", ".png")) -> List[CorpusDocument]:
+    """
+    Generate a deterministic synthetic corpus. Every document embeds a few
+    facts, returned as (question, passage) pairs for querying and evaluation.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    rng = random.Random(seed)
+    corpus = []
+    
+    for index in range(documents):
+        file_type = file_types[index % len(file_types)]
+        topic = TOPICS[index % len(TOPICS)]
+        facts = _facts(rng, index, topic)
+        parts = _body(rng, facts, paragraphs)
+        filename = f"{topic}-report-{index:03d}{file_type}"
+        path = os.path.join(output_dir, filename)
+        title = f"{topic.title()} project {index} report"
+        
+        WRITERS[file_type](path, title, parts)
+        corpus.append(CorpusDocument(path=path, filename=filename, file_type=file_type, facts=facts))
+    
+    return corpus
\ No newline at end of file
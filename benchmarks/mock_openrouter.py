@@ -0,0 +1,160 @@
+
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class MockOpenRouterServer:
+    """
+    Local stand-in for the OpenRouter chat-completions API with configurable
+    latency, stalls, streaming and 429 injection. A ``stall_ratio`` share of
+    requests takes ``stall_latency`` instead, like a free-tier model that
+    hangs. Nothing leaves the machine.
+    """
+    
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.2, jitter: float = 0.0,
+                 rate_limit_ratio: float = 0.0, stream_chunk_delay: float = 0.01, seed: int = 0,
+                 stall_ratio: float = 0.0, stall_latency: float = 10.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.stall_ratio = stall_ratio
+        self.stall_latency = stall_latency
+        self.rate_limit_ratio = rate_limit_ratio
+        self.stream_chunk_delay = stream_chunk_delay
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        self.stats = {"requests": 0, "rate_limited": 0, "stalled": 0}
+        
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self._thread = None
+    
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/api/v1"
+    
+    def start(self) -> str:
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self.base_url
+    
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+    
+    def _draw(self):
+        with self._random_lock:
+            delay = self.latency + (self._random.uniform(-self.jitter, self.jitter) if self.jitter else 0.0)
+            limited = self._random.random() < self.rate_limit_ratio
+            if self.stall_ratio and self._random.random() < self.stall_ratio:
+                delay = self.stall_latency
+                self.stats["stalled"] += 1
+            self.stats["requests"] += 1
+            self.stats["rate_limited"] += int(limited)
+        return max(delay, 0.0), limited
+    
+    def _answer(self, payload: dict) -> str:
+        messages = payload.get("messages") or [{}]
+        prompt = messages[-1].get("content", "")
+        question = next((line[len("Question:"):].strip() for line in prompt.splitlines() if line.startswith("Question:")), "")
+        return f"Mock answer to: {question or 'your question'}"
+    
+    def _handler_class(self):
+        mock = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            
+            def log_message(self, format, *args):
+                pass
+            
+            def do_POST(self):
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._send_json(404, {"error": {"message": "Not found"}})
+                    return
+                
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                delay, limited = mock._draw()
+                
+                if limited:
+                    self._send_json(429, {"error": {"message": "Rate limit exceeded", "code": 429}}, {"Retry-After": "1"})
+                    return
+                
+                time.sleep(delay)
+                answer = mock._answer(payload)
+                prompt_chars = sum(len(message.get("content", "")) for message in payload.get("messages", []))
+                usage = {
+                    "prompt_tokens": prompt_chars // 4,
+                    "completion_tokens": len(answer) // 4,
+                    "total_tokens": prompt_chars // 4 + len(answer) // 4
+                }
+                if (payload.get("usage") or {}).get("include"):
+                    usage["cost"] = round(usage["total_tokens"] * 2e-7, 8)
+                completion_id = f"gen-{uuid.uuid4().hex[:12]}"
+                
+                if payload.get("stream"):
+                    self._send_stream(completion_id, payload.get("model"), answer, usage)
+                    return
+                
+                self._send_json(200, {
+                    "id": completion_id,
+                    "model": payload.get("model"),
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": answer}, "finish_reason": "stop"}],
+                    "usage": usage
+                })
+            
+            def _send_json(self, status, body, headers=None):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+            
+            def _send_stream(self, completion_id, model, answer, usage):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.end_headers()
+                words = answer.split(" ")
+                for number, word in enumerate(words):
+                    chunk = {
+                        "id": completion_id,
+                        "model": model,
+                        "choices": [{"index": 0, "delta": {"content": word if number == 0 else " " + word}}]
+                    }
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+                    time.sleep(mock.stream_chunk_delay)
+                final = {"id": completion_id, "model": model, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}], "usage": usage}
+                self.wfile.write(f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n".encode("utf-8"))
+                self.wfile.flush()
+        
+        return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a local mock OpenRouter chat-completions server")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--rate-limit-ratio", type=float, default=0.0)
+    parser.add_argument("--stall-ratio", type=float, default=0.0)
+    parser.add_argument("--stall-latency", type=float, default=10.0)
+    args = parser.parse_args()
+    
+    server = MockOpenRouterServer(port=args.port, latency=args.latency, jitter=args.jitter,
+                                  rate_limit_ratio=args.rate_limit_ratio, stall_ratio=args.stall_ratio,
+                                  stall_latency=args.stall_latency)
+    print(f"Mock OpenRouter listening on {server.base_url}")
+    try:
+        server.server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
\ No newline at end of file
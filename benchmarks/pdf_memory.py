@@ -0,0 +1,95 @@
+
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+from benchmarks.corpus import _sentence, write_pdf
+
+
+def buffered_pages(path: str) -> List[Tuple[int, str]]:
+    """The pdfplumber path before streaming: every page stays parsed until the whole document is read."""
+    import pdfplumber
+    
+    pages = []
+    with pdfplumber.open(path) as pdf:
+        for page_num, page in enumerate(pdf.pages, 1):
+            text = page.extract_text()
+            if text and text.strip():
+                pages.append((page_num, text))
+    return pages
+
+
+def current_rss_mb() -> float:
+    with open("/proc/self/statm") as file:
+        return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+def measure_child(mode: str, path: str) -> Dict[str, float]:
+    # Runs in its own process so each measurement starts from a fresh peak RSS
+    from app.processors.pdf_processor import PDFProcessor
+    
+    processor = PDFProcessor()
+    baseline = current_rss_mb()
+    start = time.perf_counter()
+    if mode == "buffered":
+        content, _, pages = processor._build_content(buffered_pages(path))
+    else:
+        document = processor.process_document(path, os.path.basename(path))
+        content, pages = document.content, document.metadata["pages"]
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return {"pages": pages, "chars": len(content), "seconds": round(elapsed, 2),
+            "peak_rss_mb": round(peak - baseline, 1)}
+
+
+def make_pdf(path: str, pages: int, lines_per_page: int, seed: int):
+    rng = random.Random(seed)
+    write_pdf(path, [[_sentence(rng, 14) for _ in range(lines_per_page)] for _ in range(pages)])
+
+
+def main(args):
+    work_dir = tempfile.mkdtemp(prefix="researchpilot-pdf-memory-")
+    environment = dict(os.environ, DATABASE_TYPE="sqlite", LOG_LEVEL="WARNING")
+    results = []
+    print(f"{'pages':>6} {'path':<10} {'peak RSS':>10} {'time':>9}")
+    for count in args.pages:
+        path = os.path.join(work_dir, f"document-{count}.pdf")
+        make_pdf(path, count, args.lines_per_page, args.seed)
+        for mode in args.modes:
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.pdf_memory", "--child", mode, path],
+                env=environment, capture_output=True, text=True, check=True
+            ).stdout
+            result = {"mode": mode, **json.loads(output.splitlines()[-1])}
+            results.append(result)
+            print(f"{count:>6} {mode:<10} {result['peak_rss_mb']:>7.1f} MB {result['seconds']:>8.2f}s")
+        os.remove(path)
+    
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as file:
+            json.dump({"lines_per_page": args.lines_per_page, "results": results}, file, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Peak RSS of PDF text extraction against page count")
+    parser.add_argument("--pages", type=lambda value: [int(v) for v in value.split(",")], default=[25, 50, 100])
+    parser.add_argument("--modes", type=lambda value: value.split(","), default=["buffered", "streaming"])
+    parser.add_argument("--lines-per-page", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the results as JSON")
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.child:
+        print(json.dumps(measure_child(*args.child)))
+    else:
+        main(args)
\ No newline at end of file
@@ -0,0 +1,194 @@
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import tempfile
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List
+
+from benchmarks.run import percentile
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures", "retrieval")
+
+
+@dataclass
+class Retrieval:
+    units: List[str]
+    context: str
+
+
+@dataclass
+class LabelledQuestion:
+    question: str
+    document: str
+    passage: str
+
+
+Strategy = Callable[[object, str, str], Awaitable[Retrieval]]
+
+
+async def search_strategy(engine, question: str, session_id: str) -> Retrieval:
+    """Whole-document database search with a whole-session fallback."""
+    documents = await engine._get_relevant_documents(question, session_id=session_id)
+    return Retrieval(units=[doc.content for doc in documents], context=engine._build_context(documents))
+
+
+async def hierarchical_strategy(engine, question: str, session_id: str) -> Retrieval:
+    """Route to documents by their stored profiles, then rank passages within them."""
+    passages = await engine._get_relevant_passages(question, session_id=session_id)
+    return Retrieval(units=[passage.text for passage in passages], context=engine._build_passage_context(passages)[0])
+
+
+async def indexed_strategy(engine, question: str, session_id: str) -> Retrieval:
+    """Hierarchical retrieval with stage two read from the on-disk segment index instead of document content."""
+    from app.services.database_factory import get_async_database_service
+    from app.services.retrieval import HierarchicalRetriever
+    from app.services.segment_index import get_segment_index
+    
+    retriever = HierarchicalRetriever(index=get_segment_index())
+    passages = await retriever.retrieve(await get_async_database_service(), question, session_id=session_id)
+    return Retrieval(units=[passage.text for passage in passages], context=engine._build_passage_context(passages)[0])
+
+
+STRATEGIES: Dict[str, Strategy] = {
+    "search": search_strategy,
+    "hierarchical": hierarchical_strategy,
+    "indexed": indexed_strategy,
+}
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+def load_fixture(fixture_dir: str):
+    documents_dir = os.path.join(fixture_dir, "documents")
+    paths = [os.path.join(documents_dir, name) for name in sorted(os.listdir(documents_dir))]
+    with open(os.path.join(fixture_dir, "qrels.json")) as file:
+        labels = [LabelledQuestion(**entry) for entry in json.load(file)]
+    return paths, labels
+
+
+def load_synthetic(work_dir: str, documents: int, seed: int):
+    from benchmarks.corpus import generate_corpus
+    
+    corpus = generate_corpus(os.path.join(work_dir, "corpus"), documents=documents, seed=seed,
+                             file_types=(".md", ".pdf", ".docx"))
+    labels = [LabelledQuestion(question, doc.filename, passage) for doc in corpus for question, passage in doc.facts]
+    return [doc.path for doc in corpus], labels
+
+
+def ingest(paths: List[str], session_id: str, index=None):
+    from app.processors.document_processor import DocumentProcessorFactory
+    from app.processors.doc_processor import DocProcessor
+    from app.processors.markdown_processor import MarkdownProcessor
+    from app.processors.pdf_processor import PDFProcessor
+    from app.services.database_factory import get_database_service
+    from app.services.retrieval import ensure_profile
+    
+    factory = DocumentProcessorFactory()
+    for processor in (PDFProcessor(), MarkdownProcessor(), DocProcessor()):
+        factory.register_processor(processor)
+    
+    db_service = get_database_service()
+    for path in paths:
+        filename = os.path.basename(path)
+        processor = factory.get_processor(path, os.path.splitext(filename)[1].lower())
+        document = processor.process_document(path, filename)
+        document.session_id = session_id
+        ensure_profile(document)
+        db_service.store_document(document)
+        if index:
+            index.add_documents([document])
+
+
+async def evaluate(strategy: Strategy, engine, labels: List[LabelledQuestion], session_id: str, ks=(1, 3, 5)) -> Dict:
+    hits = {k: 0 for k in ks}
+    reciprocal_ranks, context_hits, context_tokens, latencies = [], 0, [], []
+    
+    for label in labels:
+        passage = _normalize(label.passage)
+        start = time.perf_counter()
+        try:
+            retrieval = await strategy(engine, label.question, session_id)
+        except Exception:
+            retrieval = Retrieval(units=[], context="")
+        latencies.append(time.perf_counter() - start)
+        
+        rank = next((i for i, unit in enumerate(retrieval.units, 1) if passage in _normalize(unit)), None)
+        for k in ks:
+            hits[k] += int(rank is not None and rank <= k)
+        reciprocal_ranks.append(1 / rank if rank else 0.0)
+        context_hits += int(passage in _normalize(retrieval.context))
+        context_tokens.append(len(retrieval.context) // 4)
+    
+    total = len(labels)
+    return {
+        **{f"recall@{k}": round(hits[k] / total, 4) for k in ks},
+        "mrr": round(sum(reciprocal_ranks) / total, 4),
+        "context_hit_rate": round(context_hits / total, 4),
+        "mean_context_tokens": round(sum(context_tokens) / total, 1),
+        "latency_p50": percentile(latencies, 50),
+        "latency_p95": percentile(latencies, 95),
+        "latency_mean": round(sum(latencies) / total, 5)
+    }
+
+
+async def main(args):
+    work_dir = tempfile.mkdtemp(prefix="researchpilot-eval-")
+    os.environ.update({
+        "DATABASE_TYPE": "sqlite",
+        "SQLITE_PATH": os.path.join(work_dir, "eval.db"),
+        "LOG_LEVEL": "WARNING",
+        # The query engine itself runs without the index so "hierarchical" measures content fetching
+        "SEGMENT_INDEX_ENABLED": "false",
+        "SEGMENT_INDEX_PATH": os.path.join(work_dir, "index"),
+    })
+    
+    if args.synthetic:
+        paths, labels = load_synthetic(work_dir, args.synthetic, args.seed)
+    else:
+        paths, labels = load_fixture(args.fixture)
+    
+    from app.services.query_engine import QueryEngine
+    from app.services.segment_index import get_segment_index
+    
+    names = args.strategies or list(STRATEGIES)
+    session_id = str(uuid.uuid4())
+    index = get_segment_index() if "indexed" in names else None
+    ingest(paths, session_id, index=index)
+    engine = QueryEngine()
+    if index:
+        index.merge()
+        start = time.perf_counter()
+        status = type(index)(index.directory).get_status()
+        print(f"index: {status['segments']} segments, {status['passages']} passages, {status['bytes'] / 1024:.0f} KB, "
+              f"opened in {(time.perf_counter() - start) * 1000:.1f} ms")
+    
+    report = {"documents": len(paths), "questions": len(labels), "strategies": {}}
+    for name in names:
+        result = await evaluate(STRATEGIES[name], engine, labels, session_id)
+        report["strategies"][name] = result
+        print(f"{name:<14} recall@1={result['recall@1']:.2f} recall@5={result['recall@5']:.2f} "
+              f"mrr={result['mrr']:.3f} context_tokens={result['mean_context_tokens']:.0f} "
+              f"p50={result['latency_p50']}s p95={result['latency_p95']}s")
+    
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate retrieval quality and latency per strategy")
+    parser.add_argument("--strategies", nargs="*", choices=sorted(STRATEGIES))
+    parser.add_argument("--fixture", default=FIXTURE_DIR)
+    parser.add_argument("--synthetic", type=int, help="Use a generated corpus with this many documents instead of the fixture")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write results as JSON")
+    asyncio.run(main(parser.parse_args()))
\ No newline at end of file
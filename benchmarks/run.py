@@ -0,0 +1,205 @@
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from benchmarks.corpus import generate_corpus
+from benchmarks.mock_openrouter import MockOpenRouterServer
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(int(round(pct / 100 * len(ordered) + 0.5)) - 1, 0)
+    return round(ordered[min(rank, len(ordered) - 1)], 4)
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict[str, Optional[float]]:
+    return {
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "elapsed_seconds": round(elapsed, 4),
+        "throughput_per_second": round(len(latencies) / elapsed, 3) if elapsed else None,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "mean": round(sum(latencies) / len(latencies), 4) if latencies else None
+    }
+
+
+def configure_environment(work_dir: str, llm_base_url: str):
+    # Settings are read at import time, so this must run before the app is imported
+    os.environ.update({
+        "DATABASE_TYPE": "sqlite",
+        "SQLITE_PATH": os.path.join(work_dir, "benchmark.db"),
+        "UPLOAD_DIR": os.path.join(work_dir, "uploads"),
+        "EXPORT_OUTBOX_PATH": os.path.join(work_dir, "outbox.db"),
+        "SEGMENT_INDEX_PATH": os.path.join(work_dir, "index"),
+        "OPENROUTER_BASE_URL": llm_base_url,
+        "OPENROUTER_API_KEYS": "benchmark-key",
+        "SESSION_SWEEP_ENABLED": "false",
+        "LOG_LEVEL": "WARNING",
+    })
+
+
+async def _run_concurrently(jobs, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+    
+    async def run(job):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                ok = await job()
+            except Exception:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors += 1
+    
+    start = time.perf_counter()
+    await asyncio.gather(*(run(job) for job in jobs))
+    return latencies, errors, time.perf_counter() - start
+
+
+async def benchmark_level(client, corpus, concurrency: int, queries: int) -> Dict[str, Dict]:
+    session_id = str(uuid.uuid4())
+    total_bytes = sum(os.path.getsize(doc.path) for doc in corpus)
+    
+    def upload_job(doc):
+        async def job():
+            with open(doc.path, "rb") as file:
+                data = file.read()
+            response = await client.post(
+                "/upload",
+                files={"file": (doc.filename, data)},
+                data={"session_id": session_id}
+            )
+            return response.status_code == 200
+        return job
+    
+    latencies, errors, elapsed = await _run_concurrently([upload_job(doc) for doc in corpus], concurrency)
+    upload = summarize(latencies, errors, elapsed)
+    upload["megabytes_per_second"] = round(total_bytes / (1024 * 1024) / elapsed, 3) if elapsed else None
+    
+    questions = [question for doc in corpus for question, _ in doc.facts]
+    
+    def query_job(question):
+        async def job():
+            response = await client.post("/query", json={
+                "question": question,
+                "api_key": "benchmark-key",
+                "model": "mock/model",
+                "session_id": session_id
+            })
+            return response.status_code == 200
+        return job
+    
+    jobs = [query_job(questions[i % len(questions)]) for i in range(queries)]
+    latencies, errors, elapsed = await _run_concurrently(jobs, concurrency)
+    
+    return {"concurrency": concurrency, "upload": upload, "query": summarize(latencies, errors, elapsed)}
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return None
+
+
+def compare(baseline: Dict, results: Dict):
+    previous = {level["concurrency"]: level for level in baseline.get("results", [])}
+    for level in results["results"]:
+        old = previous.get(level["concurrency"])
+        if not old:
+            continue
+        for stage, metric in (("upload", "throughput_per_second"), ("query", "p50"), ("query", "p95"), ("query", "p99")):
+            before, after = old[stage].get(metric), level[stage].get(metric)
+            if before and after:
+                change = (after - before) / before * 100
+                print(f"c={level['concurrency']:<3} {stage}.{metric:<22} {before:>10} -> {after:<10} ({change:+.1f}%)")
+
+
+async def main(args):
+    work_dir = tempfile.mkdtemp(prefix="researchpilot-bench-")
+    corpus = generate_corpus(os.path.join(work_dir, "corpus"), documents=args.documents, seed=args.seed)
+    
+    mock = MockOpenRouterServer(latency=args.llm_latency, jitter=args.llm_jitter,
+                                rate_limit_ratio=args.rate_limit_ratio, seed=args.seed,
+                                stall_ratio=args.llm_stall_ratio, stall_latency=args.llm_stall_latency)
+    configure_environment(work_dir, mock.start())
+    
+    import httpx
+    import main as app_main
+    
+    results = []
+    try:
+        transport = httpx.ASGITransport(app=app_main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=300) as client:
+            for concurrency in args.concurrency:
+                level = await benchmark_level(client, corpus, concurrency, args.queries)
+                results.append(level)
+                print(f"c={concurrency:<3} upload {level['upload']['throughput_per_second']} docs/s, "
+                      f"query p50={level['query']['p50']}s p95={level['query']['p95']}s p99={level['query']['p99']}s")
+    finally:
+        mock.stop()
+    
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "commit": git_commit(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform()
+        },
+        "config": {
+            "documents": args.documents,
+            "queries": args.queries,
+            "seed": args.seed,
+            "llm_latency": args.llm_latency,
+            "llm_jitter": args.llm_jitter,
+            "rate_limit_ratio": args.rate_limit_ratio,
+            "llm_stall_ratio": args.llm_stall_ratio,
+            "llm_stall_latency": args.llm_stall_latency,
+            "hedging": os.environ.get("OPENROUTER_HEDGE_ENABLED", "false")
+        },
+        "mock_llm": mock.stats,
+        "results": results
+    }
+    
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"Results written to {args.output}")
+    
+    if args.baseline:
+        with open(args.baseline) as file:
+            compare(json.load(file), report)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline end-to-end upload/query benchmark")
+    parser.add_argument("--documents", type=int, default=24)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--concurrency", type=lambda value: [int(v) for v in value.split(",")], default=[1, 4, 16])
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--llm-jitter", type=float, default=0.05)
+    parser.add_argument("--rate-limit-ratio", type=float, default=0.0)
+    parser.add_argument("--llm-stall-ratio", type=float, default=0.0, help="Share of LLM calls that stall")
+    parser.add_argument("--llm-stall-latency", type=float, default=5.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="benchmarks/results/latest.json")
+    parser.add_argument("--baseline", help="Previous results file to compare against")
+    asyncio.run(main(parser.parse_args()))
\ No newline at end of file
@@ -0,0 +1,87 @@
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict
+
+from benchmarks.corpus import WORDS
+
+
+def measure(function: Callable[[], object], repeat: int) -> Dict[str, float]:
+    function()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    elapsed = (time.perf_counter() - start) / repeat
+    
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"ms": round(elapsed * 1000, 3), "peak_kb": round(peak / 1024, 1)}
+
+
+def make_text(size: int, seed: int) -> str:
+    rng = random.Random(seed)
+    # Accented words and typographic quotes as real extracted text has
+    words = WORDS + ["café", "naïve", "Zürich", "“quoted”", "résumé", "—"]
+    parts, length = [], 0
+    while length < size:
+        word = rng.choice(words)
+        parts.append(word)
+        length += len(word) + 1
+    return " ".join(parts)
+
+
+def main(args):
+    os.environ.setdefault("DATABASE_TYPE", "sqlite")
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    from app.models.data_models import Conversation, ProcessedDocument, QueryResponse
+    from app.services import serialization
+    from app.services.database_service import document_to_row, row_to_document
+    
+    content = make_text(args.size, args.seed)
+    document = ProcessedDocument(filename="large.pdf", file_type="pdf", content=content, file_size=len(content),
+                                 metadata={"pages": 120, "profile": {"keywords": {word: 3 for word in WORDS}}})
+    row = document_to_row(document)
+    encoded_row = serialization.dumps(row)
+    profiles = serialization.dumps([{"id": str(i), "filename": f"doc-{i}.pdf", "profile": document.metadata["profile"]}
+                                    for i in range(500)])
+    answer = make_text(4000, args.seed + 1)
+    payload = {"answer": answer, "source_documents": ["large.pdf"], "processing_time": 1.2,
+               "confidence_score": None, "conversation_id": "c1", "timings": None}
+    conversation = Conversation(query="What is it?", response=QueryResponse(answer=answer, source_documents=["large.pdf"]))
+    
+    cases = {
+        "store row (json.dumps)": lambda: json.dumps(row).encode("utf-8"),
+        "store row (serialization.dumps)": lambda: serialization.dumps(row),
+        "read row (json.loads)": lambda: row_to_document(json.loads(encoded_row)),
+        "read row (serialization.loads)": lambda: row_to_document(serialization.loads(encoded_row)),
+        "read 500 profiles (json.loads)": lambda: json.loads(profiles),
+        "read 500 profiles (serialization.loads)": lambda: serialization.loads(profiles),
+        "query response (JSONResponse)": lambda: JSONResponse(jsonable_encoder(payload)).body,
+        "query response (FastJSONResponse)": lambda: serialization.FastJSONResponse(payload).body,
+        "conversation (to_dict + json)": lambda: json.dumps(conversation.to_dict()).encode("utf-8"),
+        "conversation (dataclass direct)": lambda: serialization.dumps(conversation),
+    }
+    
+    backend = "orjson" if serialization.orjson is not None else "json (orjson not installed)"
+    print(f"content: {len(content):,} chars, serializer: {backend}")
+    for name, function in cases.items():
+        result = measure(function, args.repeat)
+        print(f"{name:<40} {result['ms']:>9.3f} ms  peak {result['peak_kb']:>9.1f} KB")
+    
+    slotted = sys.getsizeof(document)
+    print(f"ProcessedDocument instance: {slotted} bytes (no per-instance __dict__: {not hasattr(document, '__dict__')})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare serialization paths on a large document")
+    parser.add_argument("--size", type=int, default=2_000_000, help="Document content size in characters")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    main(parser.parse_args())
\ No newline at end of file
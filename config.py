@@ -9,23 +9,121 @@ class Settings(BaseSettings):
     
     openrouter_api_key: Optional[str] = None
     openrouter_api_keys: Optional[str] = None
+    openrouter_base_url: str = "https://openrouter.ai/api/v1"
     openrouter_model: str = "nvidia/nemotron-nano-12b-v2-vl:free"
     openrouter_enable_reasoning: bool = False
     openrouter_site_url: str = "http://localhost:8000"
     openrouter_site_name: str = "Document Query System"
+    openrouter_key_cooldown_seconds: int = 60
+    openrouter_fallback_model: Optional[str] = None
+    openrouter_metric_models: Optional[str] = None
+    openrouter_hedge_enabled: bool = False
+    openrouter_hedge_default_delay_seconds: float = 10.0
+    openrouter_latency_window: int = 100
+    openrouter_breaker_failures: int = 3
+    openrouter_breaker_window_seconds: float = 60.0
+    openrouter_breaker_open_seconds: float = 30.0
+    usage_window_hours: int = 24
+    session_token_budget: int = 0
     
     database_type: str = "supabase"
     max_storage_size: int = 1073741824
+    max_session_storage_size: int = 209715200
+    storage_usage_cache_seconds: int = 60
+    max_upload_size: int = 52428800
+    resumable_upload_max_size: int = 524288000
+    upload_spool_dir: Optional[str] = None
+    upload_spool_ttl_seconds: int = 86400
+    
+    session_ttl_seconds: int = 604800
+    session_sweep_enabled: bool = True
+    session_sweep_interval_seconds: int = 3600
+    session_sweep_batch_size: int = 100
+    session_sweep_mode: str = "delete"
+    session_touch_interval_seconds: int = 300
+    
+    content_compression: Optional[str] = None
+    content_compression_level: int = 6
+    content_compression_dictionary_path: Optional[str] = None
+    content_compression_min_size: int = 4096
     
     supabase_url: Optional[str] = None
     supabase_key: Optional[str] = None
     
+    sqlite_path: str = "researchpilot.db"
+    
+    database_dsn: Optional[str] = None
+    database_pool_size: int = 10
+    database_timeout_seconds: float = 10.0
+    database_connect_timeout_seconds: float = 5.0
+    
+    shared_state_backend: str = "memory"
+    shared_state_path: str = "researchpilot-state.db"
+    shared_state_url: Optional[str] = None
+    shared_state_prefix: str = "researchpilot:"
+    
     mcp_enabled: bool = True
     
     obsidian_api_url: str = "http://localhost:27123"
     obsidian_api_key: Optional[str] = None
     obsidian_vault_path: Optional[str] = None
     
+    notion_api_key: Optional[str] = None
+    notion_parent_page_id: Optional[str] = None
+    notion_api_url: str = "https://api.notion.com/v1"
+    notion_version: str = "2022-06-28"
+    
+    export_outbox_path: str = "researchpilot-outbox.db"
+    export_batch_size: int = 20
+    export_poll_interval_seconds: float = 5.0
+    export_max_attempts: int = 8
+    export_retry_base_seconds: float = 2.0
+    export_retry_max_seconds: float = 300.0
+    export_lease_seconds: float = 300.0
+    export_pool_size: int = 4
+    
+    ocr_max_concurrency: int = 2
+    ocr_max_queue: int = 8
+    ocr_max_per_session: int = 1
+    extraction_max_concurrency: int = 4
+    extraction_max_queue: int = 16
+    extraction_max_per_session: int = 2
+    extraction_cost_unit_mb: int = 10
+    extraction_isolation_enabled: bool = True
+    extraction_timeout_seconds: float = 60.0
+    extraction_memory_limit_mb: int = 2048
+    extraction_worker_max_jobs: int = 100
+    llm_max_concurrency: int = 8
+    llm_max_queue: int = 32
+    llm_max_per_session: int = 4
+    admission_max_wait_seconds: float = 10.0
+    admission_session_max_queue: int = 8
+    upload_deadline_seconds: float = 120.0
+    query_deadline_seconds: float = 60.0
+    
+    retrieval_strategy: str = "hierarchical"
+    retrieval_route_documents: int = 3
+    retrieval_max_passages: int = 8
+    retrieval_passage_words: int = 120
+    retrieval_profile_keywords: int = 40
+    retrieval_summary_sentences: int = 3
+    near_duplicate_enabled: bool = True
+    near_duplicate_max_distance: int = 8
+    segment_index_enabled: bool = True
+    segment_index_path: str = "researchpilot-index"
+    segment_index_merge_segments: int = 8
+    extractive_answers_enabled: bool = False
+    extractive_confidence_threshold: float = 0.7
+    
+    conversation_history_token_budget: int = 1500
+    conversation_recent_turns: int = 4
+    conversation_compact_after_turns: int = 8
+    conversation_summary_max_tokens: int = 300
+    
+    metrics_enabled: bool = True
+    readiness_cache_seconds: float = 10.0
+    readiness_probe_timeout_seconds: float = 3.0
+    
     debug: bool = False
     log_level: str = "INFO"
     upload_dir: str = "uploads"
@@ -54,5 +152,5 @@ def validate_settings():
     if settings.database_type == "supabase":
         if not settings.supabase_url or not settings.supabase_key:
             raise ValueError("SUPABASE_URL and SUPABASE_KEY are required when using Supabase")
-    else:
-        raise ValueError("DATABASE_TYPE must be 'supabase'")
\ No newline at end of file
+    elif settings.database_type != "sqlite":
+        raise ValueError("DATABASE_TYPE must be 'supabase' or 'sqlite'")
\ No newline at end of file
@@ -1,26 +1,43 @@
 
 import os
+import asyncio
 import logging
 import shutil
-from typing import List, Optional
+from datetime import datetime
+from typing import Dict, List, Optional
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException, UploadFile, File, Request, Form
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, Response
 from pydantic import BaseModel
 
 from config import settings
-from app.services.database_factory import get_database_service
+from app.services.database_factory import get_database_service, close_async_database_service
+from app.services.conversation_store import ConversationAccessError
 from app.services.query_engine import QueryEngine, QueryEngineError
 from app.services.notion import NotionService
 from app.services.obsidian import ObsidianService
+from app.services.session_sweeper import SessionSweeper
+from app.services.storage_quota import StorageQuota, StorageQuotaError
+from app.services.metrics import registry, span, collect_timings
+from app.services.health import HealthMonitor
+from app.services.admission import AdmissionRejected, admission_session, get_pool, get_session_admission_status, request_deadline
+from app.services.export_outbox import ExportOutbox, ExportWorker
+from app.services.extraction_supervisor import ExtractionSupervisor
+from app.services.near_duplicates import NEAR_DUPLICATES
+from app.services.retrieval import ensure_profile, find_near_duplicates
+from app.services.segment_index import get_segment_index
+from app.services.usage import TokenBudgetExceeded, get_usage_tracker, usage_session
+from app.services.serialization import FastJSONResponse
+from app.services.upload_spool import WRITE_BLOCK_SIZE, UploadError, UploadSpool
 from app.processors.document_processor import DocumentProcessorFactory, ProcessingError
 from app.processors.pdf_processor import PDFProcessor
 from app.processors.image_processor import ImageProcessor
 from app.processors.markdown_processor import MarkdownProcessor
+from app.processors.text_processor import TextProcessor
 from app.processors.doc_processor import DocProcessor
-from app.models.data_models import Conversation
+from app.models.data_models import Conversation, DocumentFilter, ProcessedDocument
 
 logging.basicConfig(
     level=getattr(logging, settings.log_level),
@@ -32,8 +49,20 @@ logger = logging.getLogger(__name__)
 async def lifespan(app: FastAPI):
     logger.info("Starting Document Query System...")
     query_engine.validate_setup()
+    if extraction_supervisor:
+        extraction_supervisor.start()
+    if settings.session_sweep_enabled:
+        session_sweeper.start()
+    if settings.mcp_enabled:
+        export_worker.start()
     logger.info(" System ready ")
     yield
+    await query_engine.conversations.drain()
+    await export_worker.stop()
+    await session_sweeper.stop()
+    if extraction_supervisor:
+        await asyncio.to_thread(extraction_supervisor.stop)
+    await close_async_database_service()
 
 app = FastAPI(
     title="Document Query System",
@@ -53,43 +82,88 @@ os.makedirs(settings.upload_dir, exist_ok=True)
 app.mount("/static", StaticFiles(directory="static"), name="static")
 db_service = get_database_service()
 query_engine = QueryEngine()
+storage_quota = StorageQuota(db_service)
+segment_index = get_segment_index() if settings.segment_index_enabled else None
+session_sweeper = SessionSweeper(db_service, quota=storage_quota, index=segment_index)
+upload_spool = UploadSpool()
+extraction_supervisor = ExtractionSupervisor() if settings.extraction_isolation_enabled else None
+# Extractions started when an upload's last chunk arrives, picked up by /complete
+upload_extractions: Dict[str, asyncio.Future] = {}
+health_monitor = HealthMonitor(db_service, query_engine.openrouter_client)
+integrations = {"notion": NotionService(), "obsidian": ObsidianService()}
+export_outbox = ExportOutbox()
+export_worker = ExportWorker(export_outbox, integrations)
 processor_factory = DocumentProcessorFactory()
 processor_factory.register_processor(PDFProcessor())
 processor_factory.register_processor(ImageProcessor())
 processor_factory.register_processor(MarkdownProcessor())
+processor_factory.register_processor(TextProcessor())
 processor_factory.register_processor(DocProcessor())
+class QueryFilters(BaseModel):
+    document_ids: List[str] = []
+    filenames: List[str] = []
+    file_types: List[str] = []
+    uploaded_after: Optional[datetime] = None
+    uploaded_before: Optional[datetime] = None
+
+class UploadCreateRequest(BaseModel):
+    filename: str
+    length: int
+    session_id: Optional[str] = None
+    sha256: Optional[str] = None
+
 class QueryRequest(BaseModel):
     question: str
     api_key: Optional[str] = None
     model: Optional[str] = None
     session_id: Optional[str] = None
+    conversation_id: Optional[str] = None
+    extractive: Optional[bool] = None
+    include_timings: bool = False
+    filters: Optional[QueryFilters] = None
 
 class QueryResponse(BaseModel):
     answer: str
     source_documents: List[str]
     processing_time: float
+    confidence_score: Optional[float] = None
+    conversation_id: Optional[str] = None
+    timings: Optional[Dict[str, float]] = None
+    citations: List[str] = []
 
 class SaveConversationRequest(BaseModel):
     platform: str
     conversation: dict
 
 
-async def send_to_integration(platform: str, conversation_data: dict) -> bool:
+def build_conversation(conversation_data: dict) -> Conversation:
     result = conversation_data["result"]
-    query_response = QueryResponse(
-        answer=result["answer"],
-        source_documents=result.get("source_documents", []),
-        processing_time=result.get("processing_time", 0.0)
-    )
-    
-    conversation = Conversation(
-        query=conversation_data["query"],
-        response=query_response,
-        source_documents=result.get("source_documents", [])
+    return Conversation.from_dict({
+        "query": conversation_data["query"],
+        "response": {
+            "answer": result["answer"],
+            "source_documents": result.get("source_documents", []),
+            "processing_time": result.get("processing_time", 0.0),
+            "citations": result.get("citations", [])
+        },
+        "source_documents": result.get("source_documents", [])
+    })
+
+
+@app.exception_handler(AdmissionRejected)
+@app.exception_handler(TokenBudgetExceeded)
+async def admission_rejected_handler(request: Request, exc: AdmissionRejected):
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)}
     )
-    service_class = NotionService if platform == "notion" else ObsidianService
-    service = service_class()
-    return service.save_conversation(conversation)
+
+
+@app.exception_handler(UploadError)
+async def upload_error_handler(request: Request, exc: UploadError):
+    headers = {"Upload-Offset": str(exc.offset)} if exc.offset is not None else None
+    return JSONResponse(status_code=exc.status_code, content={"detail": str(exc)}, headers=headers)
 
 
 @app.exception_handler(Exception)
@@ -107,37 +181,31 @@ def root():
 
 
 @app.post("/upload")
-def upload_file(file: UploadFile = File(...), session_id: Optional[str] = Form(None)):
+def upload_file(file: UploadFile = File(...), session_id: Optional[str] = Form(None), include_timings: bool = Form(False)):
+    with health_monitor.track("upload"), request_deadline(settings.upload_deadline_seconds), \
+            admission_session(session_id), collect_timings(include_timings) as timings:
+        response = _process_upload(file, session_id)
+    if timings is not None:
+        response["timings"] = timings
+    return response
+
+
+def _process_upload(file: UploadFile, session_id: Optional[str]) -> dict:
     if not file.filename:
         raise HTTPException(status_code=400, detail="Filename is required")
     
-    if file.size and file.size > 50 * 1024 * 1024:
-        raise HTTPException(status_code=413, detail="File too large. Maximum size is 50MB")
-    
-    file_extension = os.path.splitext(file.filename)[1].lower()
-    processor = processor_factory.get_processor("", file_extension)
-    if not processor:
-        raise HTTPException(status_code=400, detail=f"Unsupported file type: {file_extension}")
+    if file.size and file.size > settings.max_upload_size:
+        raise HTTPException(
+            status_code=413,
+            detail=f"File too large. Maximum size is {settings.max_upload_size // (1024 * 1024)}MB; use /uploads for larger files"
+        )
     
+    processor = _get_processor(file.filename)
     file_path = os.path.join(settings.upload_dir, file.filename)
     try:
-        with open(file_path, "wb") as buffer:
+        with span("upload.save"), open(file_path, "wb") as buffer:
             shutil.copyfileobj(file.file, buffer)
-        
-        processed_doc = processor.process_document(file_path, file.filename)
-        # Set session_id on the document
-        processed_doc.session_id = session_id
-        logger.info(f"Uploading document with session_id: {session_id}")
-        document_id = db_service.store_document(processed_doc)
-        
-        return {
-            "message": "File uploaded and processed successfully",
-            "document_id": document_id,
-            "filename": file.filename,
-            "content_length": len(processed_doc.content)
-        }
-    except ProcessingError as e:
-        raise HTTPException(status_code=422, detail=str(e))
+        return _ingest(file_path, file.filename, session_id, processor)
     finally:
         if os.path.exists(file_path):
             try:
@@ -153,8 +221,189 @@ def upload_file(file: UploadFile = File(...), session_id: Optional[str] = Form(N
                 logger.warning(f"Error deleting temporary file {file_path}: {e}")
 
 
-@app.post("/query", response_model=QueryResponse)
-def query_documents(request: QueryRequest):
+def _get_processor(filename: str):
+    file_extension = os.path.splitext(filename)[1].lower()
+    processor = processor_factory.get_processor("", file_extension)
+    if not processor:
+        raise HTTPException(status_code=400, detail=f"Unsupported file type: {file_extension}")
+    return processor
+
+
+def _extract(processor, file_path: str, filename: str) -> ProcessedDocument:
+    # Big files take more of their session's turns, so a 200MB scan doesn't cost the same as a memo
+    cost = max(1.0, os.path.getsize(file_path) / (settings.extraction_cost_unit_mb * 1024 * 1024))
+    with get_pool("extraction").slot(cost), span("upload.extract", processor=type(processor).__name__):
+        if extraction_supervisor:
+            return extraction_supervisor.extract(processor, file_path, filename)
+        return processor.process_document(file_path, filename)
+
+
+def _ingest(file_path: str, filename: str, session_id: Optional[str], processor,
+            processed_doc: Optional[ProcessedDocument] = None) -> dict:
+    try:
+        file_size = os.path.getsize(file_path)
+        storage_quota.check(session_id, file_size)
+        session_sweeper.touch(session_id)
+        
+        if processed_doc is None:
+            processed_doc = _extract(processor, file_path, filename)
+        with span("upload.profile"):
+            profile = ensure_profile(processed_doc)
+        duplicates = _near_duplicate_documents(profile, session_id)
+        # Set session_id on the document
+        processed_doc.session_id = session_id
+        logger.info(f"Uploading document with session_id: {session_id}")
+        with span("upload.store"):
+            document_id = db_service.store_document(processed_doc)
+        storage_quota.record(file_size)
+        if segment_index:
+            try:
+                with span("upload.index"):
+                    segment_index.add_documents([processed_doc])
+            except Exception as e:
+                # Not fatal: the document is indexed the first time a query needs it
+                logger.warning(f"Could not index document {document_id}: {e}")
+        
+        response = {
+            "message": "File uploaded and processed successfully",
+            "document_id": document_id,
+            "filename": filename,
+            "content_length": len(processed_doc.content)
+        }
+        if processed_doc.metadata.get("partial"):
+            stopped = {"crashed": "crashed", "memory": "ran out of memory"}.get(
+                processed_doc.metadata.get("partial_reason"), "stopped at the time limit"
+            )
+            response["message"] = (f"File uploaded, but processing {stopped}; "
+                                   f"the first {processed_doc.metadata.get('pages', 0)} pages with text were saved")
+            response["partial"] = True
+        if duplicates:
+            names = ", ".join(row["filename"] for row in duplicates)
+            response["message"] += f". It is nearly identical to {names} in this session"
+            response["duplicates"] = [{"document_id": row["id"], "filename": row["filename"]} for row in duplicates]
+        return response
+    except StorageQuotaError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ProcessingError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+def _near_duplicate_documents(profile: dict, session_id: Optional[str]) -> list:
+    # Without a session every stored document would be compared, so only sessions are checked
+    if not session_id or not settings.near_duplicate_enabled:
+        return []
+    try:
+        duplicates = find_near_duplicates(profile, db_service.get_document_profiles(session_id=session_id))
+    except Exception as e:
+        # The upload goes ahead; it just isn't flagged
+        logger.warning(f"Could not check for near-duplicate documents: {e}")
+        return []
+    if duplicates:
+        NEAR_DUPLICATES.inc(stage="upload")
+    return duplicates
+
+
+@app.post("/uploads", status_code=201)
+def create_upload(request: UploadCreateRequest):
+    _get_processor(request.filename)
+    upload_spool.check_length(request.length)
+    try:
+        storage_quota.check(request.session_id, request.length)
+    except StorageQuotaError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    
+    upload = upload_spool.create(os.path.basename(request.filename), request.length,
+                                 session_id=request.session_id, sha256=request.sha256)
+    for upload_id in [upload_id for upload_id in upload_extractions if not upload_spool.exists(upload_id)]:
+        upload_extractions.pop(upload_id).cancel()
+    return upload
+
+
+@app.get("/uploads/{upload_id}")
+def get_upload(upload_id: str):
+    upload = upload_spool.get(upload_id)
+    return JSONResponse(upload, headers={"Upload-Offset": str(upload["offset"]), "Upload-Length": str(upload["length"])})
+
+
+@app.patch("/uploads/{upload_id}", status_code=204)
+async def append_upload(upload_id: str, request: Request):
+    try:
+        offset = int(request.headers["Upload-Offset"])
+    except (KeyError, ValueError):
+        raise HTTPException(status_code=400, detail="Upload-Offset header is required")
+    
+    # The body is streamed to the spool in blocks rather than read into memory whole
+    buffer = bytearray()
+    async for piece in request.stream():
+        buffer += piece
+        if len(buffer) >= WRITE_BLOCK_SIZE:
+            offset = await asyncio.to_thread(upload_spool.append, upload_id, offset, bytes(buffer))
+            buffer.clear()
+    if buffer:
+        offset = await asyncio.to_thread(upload_spool.append, upload_id, offset, bytes(buffer))
+    
+    upload = await asyncio.to_thread(upload_spool.get, upload_id)
+    if upload["complete"] and upload_id not in upload_extractions:
+        # Extraction starts now instead of waiting for /complete; the checksum is still checked before storing
+        processor = _get_processor(upload["filename"])
+        with admission_session(upload["session_id"]):
+            upload_extractions[upload_id] = asyncio.ensure_future(
+                asyncio.to_thread(_extract_early, processor, upload_spool.part_path(upload_id), upload["filename"])
+            )
+    return Response(status_code=204, headers={"Upload-Offset": str(offset), "Upload-Length": str(upload["length"])})
+
+
+def _extract_early(processor, file_path: str, filename: str) -> Optional[ProcessedDocument]:
+    try:
+        return _extract(processor, file_path, filename)
+    except Exception as e:
+        # /complete extracts again and reports the error
+        logger.info(f"Early extraction of {filename} failed: {e}")
+        return None
+
+
+@app.post("/uploads/{upload_id}/complete")
+async def complete_upload(upload_id: str, include_timings: bool = False):
+    with health_monitor.track("upload"), request_deadline(settings.upload_deadline_seconds), \
+            collect_timings(include_timings) as timings:
+        # Taken out first, so an upload that fails its checks doesn't leave the extraction behind
+        extraction = upload_extractions.pop(upload_id, None)
+        try:
+            file_path, upload = await asyncio.to_thread(upload_spool.finish, upload_id)
+        except BaseException:
+            if extraction:
+                extraction.cancel()
+            raise
+        processor = _get_processor(upload["filename"])
+        processed_doc = await extraction if extraction else None
+        try:
+            with admission_session(upload["session_id"]):
+                response = await asyncio.to_thread(_ingest, file_path, upload["filename"], upload["session_id"],
+                                                   processor, processed_doc)
+        except HTTPException as e:
+            if e.status_code == 422:
+                # The file can't be processed, so there is nothing to retry
+                upload_spool.discard(upload_id, outcome="failed")
+            raise
+    upload_spool.discard(upload_id, outcome="completed")
+    response["sha256"] = upload["sha256"]
+    if timings is not None:
+        response["timings"] = timings
+    return response
+
+
+@app.delete("/uploads/{upload_id}", status_code=204)
+def delete_upload(upload_id: str):
+    upload_spool.get(upload_id)
+    extraction = upload_extractions.pop(upload_id, None)
+    if extraction:
+        extraction.cancel()
+    upload_spool.discard(upload_id)
+    return Response(status_code=204)
+
+
+@app.post("/query", response_model=QueryResponse, response_class=FastJSONResponse)
+async def query_documents(request: QueryRequest):
     if not request.question.strip():
         raise HTTPException(status_code=400, detail="Question cannot be empty")
     
@@ -164,17 +413,30 @@ def query_documents(request: QueryRequest):
     
     try:
         logger.info(f"Processing query with session_id: {request.session_id}")
-        result = query_engine.process_query(
-            request.question, 
-            api_key=request.api_key, 
-            model=request.model,
-            session_id=request.session_id
-        )
-        return QueryResponse(
-            answer=result.answer,
-            source_documents=result.source_documents,
-            processing_time=result.processing_time
-        )
+        await asyncio.to_thread(session_sweeper.touch, request.session_id)
+        conversation_id = request.conversation_id or request.session_id
+        with health_monitor.track("query"), request_deadline(settings.query_deadline_seconds), \
+                usage_session(request.session_id), admission_session(request.session_id), \
+                collect_timings(request.include_timings) as timings:
+            result = await query_engine.process_query(
+                request.question, 
+                api_key=request.api_key, 
+                model=request.model,
+                session_id=request.session_id,
+                conversation_id=conversation_id,
+                extractive=request.extractive,
+                filters=DocumentFilter(**request.filters.model_dump()) if request.filters else None
+            )
+        # Returned as a response so the answer isn't re-validated and re-encoded on the way out
+        return FastJSONResponse({
+            "answer": result.answer,
+            "source_documents": result.source_documents,
+            "processing_time": result.processing_time,
+            "confidence_score": result.confidence_score,
+            "conversation_id": conversation_id,
+            "timings": timings,
+            "citations": result.citations
+        })
     except QueryEngineError as e:
         # Return specific error message from query engine
         error_message = str(e)
@@ -186,19 +448,44 @@ def query_documents(request: QueryRequest):
             raise HTTPException(status_code=429, detail="API key exhausted or rate limited. Please wait or use a different key.")
         elif "No documents available" in error_message:
             raise HTTPException(status_code=404, detail="No documents found. Please upload documents first.")
+        elif "No documents match the query filters" in error_message:
+            raise HTTPException(status_code=404, detail="No documents match the query filters.")
+        elif "temporarily unavailable" in error_message:
+            raise HTTPException(
+                status_code=503,
+                detail="The AI model is failing right now. Please try again shortly or choose another model.",
+                headers={"Retry-After": str(int(settings.openrouter_breaker_open_seconds))}
+            )
+        elif "deadline exceeded" in error_message:
+            raise HTTPException(status_code=504, detail="The AI service took too long to respond. Please try again.")
         else:
             # Return the original error message for other cases
             raise HTTPException(status_code=500, detail=error_message)
+    except ConversationAccessError:
+        raise HTTPException(status_code=403, detail="This conversation belongs to another session")
+    except (AdmissionRejected, TokenBudgetExceeded):
+        raise
     except Exception as e:
         logger.error(f"Unexpected error in query endpoint: {e}")
         raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {str(e)}")
 
+@app.get("/status")
+def get_status():
+    return health_monitor.liveness()
+
+
+@app.get("/ready")
+async def get_readiness():
+    readiness = await health_monitor.readiness()
+    return JSONResponse(status_code=200 if readiness["ready"] else 503, content=readiness)
+
 @app.get("/api-status")
 def get_api_status():
     try:
         api_key_status = query_engine.openrouter_client.get_api_key_status()
         return {
             "openrouter_status": api_key_status,
+            "models": query_engine.openrouter_client.health.get_status(),
             "message": f"{api_key_status['available_keys']} of {api_key_status['total_keys']} API keys available"
         }
     except Exception as e:
@@ -212,20 +499,135 @@ def reset_api_keys():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to reset API keys: {str(e)}")
 
+@app.get("/metrics")
+def get_metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
+def _collect_key_pool_metrics():
+    status = query_engine.openrouter_client.get_api_key_status()
+    registry.gauge("researchpilot_api_keys_total", "Configured OpenRouter API keys").set(status["total_keys"])
+    registry.gauge("researchpilot_api_keys_available", "OpenRouter API keys not marked exhausted").set(status["available_keys"])
+
+
+registry.register_collector(_collect_key_pool_metrics)
+
+
+def _collect_export_metrics():
+    counts = export_outbox.counts()
+    gauge = registry.gauge("researchpilot_export_jobs", "Conversation export jobs by status")
+    for status in ("pending", "in_progress", "done", "failed"):
+        gauge.set(counts.get(status, 0), status=status)
+
+
+registry.register_collector(_collect_export_metrics)
+
+@app.get("/storage-status")
+def get_storage_status():
+    try:
+        storage_quota.get_global_usage()
+        return {
+            "quota": storage_quota.get_status(),
+            "sweeper": session_sweeper.get_status(),
+            "index": segment_index.get_status() if segment_index else None
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get storage status: {str(e)}")
+
+@app.get("/queue-status")
+def get_queue_status(session_id: Optional[str] = None):
+    """This session's slots and queue positions in each workload pool."""
+    return {"session_id": session_id, "pools": get_session_admission_status(session_id)}
+
+
+@app.get("/usage", response_class=FastJSONResponse)
+def get_usage(session_id: Optional[str] = None):
+    try:
+        return FastJSONResponse(get_usage_tracker().summary(session_id))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get usage: {str(e)}")
+
 @app.post("/save-conversation")
 async def save_conversation(request: SaveConversationRequest):
     if not settings.mcp_enabled:
         raise HTTPException(status_code=400, detail="Saving conversations is not enabled")
     
     platform = request.platform.lower()
-    if platform not in ["notion", "obsidian"]:
+    if platform not in integrations:
         raise HTTPException(status_code=400, detail="Platform must be 'notion' or 'obsidian'")
+    if not integrations[platform].is_configured():
+        raise HTTPException(status_code=422, detail=f"{platform.title()} integration is not configured")
+    
+    try:
+        conversation = build_conversation(request.conversation)
+    except (KeyError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid conversation: {str(e)}")
+    
+    # Exports are delivered by the background worker, with retries
+    job_id = await asyncio.to_thread(export_outbox.enqueue, platform, conversation)
+    export_worker.notify()
+    return JSONResponse(status_code=202, content={
+        "message": f"Conversation queued for saving to {platform.title()}",
+        "job_id": job_id,
+        "status": "pending"
+    })
+
+
+@app.get("/exports/{job_id}")
+async def get_export_status(job_id: str):
+    job = await asyncio.to_thread(export_outbox.get_job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Export job not found")
+    
+    return {
+        "job_id": job["id"],
+        "platform": job["platform"],
+        "status": job["status"],
+        "attempts": job["attempts"],
+        "result": job["result"],
+        "last_error": job["last_error"]
+    }
+
+@app.get("/conversations", response_class=FastJSONResponse)
+async def list_conversations(session_id: str):
+    try:
+        conversations = await asyncio.to_thread(db_service.list_conversations, session_id)
+    except Exception as e:
+        logger.error(f"Error listing conversations: {e}")
+        raise HTTPException(status_code=500, detail="Could not list conversations")
+    return FastJSONResponse({"conversations": conversations})
+
+@app.get("/conversations/{conversation_id}", response_class=FastJSONResponse)
+async def get_conversation(conversation_id: str, session_id: str):
+    try:
+        summary, turns = await asyncio.gather(
+            asyncio.to_thread(db_service.get_conversation_summary, conversation_id, session_id),
+            asyncio.to_thread(db_service.get_conversation_turns, conversation_id, session_id)
+        )
+    except Exception as e:
+        logger.error(f"Error loading conversation {conversation_id}: {e}")
+        raise HTTPException(status_code=500, detail="Could not load conversation")
+    
+    # Conversations are only visible to the session that created them
+    if not turns:
+        raise HTTPException(status_code=404, detail="Conversation not found")
     
-    success = await send_to_integration(platform, request.conversation)
-    if success:
-        return {"message": f"Conversation saved to {platform.title()} successfully"}
-    else:
-        raise HTTPException(status_code=422, detail=f"Failed to save to {platform.title()}")
+    return FastJSONResponse({
+        "conversation_id": conversation_id,
+        "summary": summary["summary"] if summary else None,
+        "summarized_turns": summary["turn_count"] if summary else 0,
+        "turns": [
+            {
+                "id": turn.id,
+                "query": turn.query,
+                "answer": turn.response.answer,
+                "source_documents": turn.source_documents,
+                "citations": turn.response.citations,
+                "timestamp": turn.timestamp
+            }
+            for turn in turns
+        ]
+    })
 
 
 if __name__ == "__main__":
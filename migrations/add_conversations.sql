@@ -0,0 +1,34 @@
+-- Migration: Persist multi-turn conversations
+-- Date: 2026-10-19
+-- Purpose: Keep query/answer turns per conversation so follow-up questions have context
+
+-- One row per question and answer
+CREATE TABLE IF NOT EXISTS conversation_turns (
+    id TEXT PRIMARY KEY,
+    conversation_id TEXT NOT NULL,
+    session_id TEXT,
+    query TEXT,
+    answer TEXT,
+    source_documents JSONB,
+    citations JSONB,
+    processing_time DOUBLE PRECISION,
+    created_at TIMESTAMP DEFAULT NOW()
+);
+
+-- For databases that ran this migration before turns kept their citations
+ALTER TABLE conversation_turns ADD COLUMN IF NOT EXISTS citations JSONB;
+
+CREATE INDEX IF NOT EXISTS idx_conversation_turns_conversation
+ON conversation_turns(conversation_id, created_at);
+
+CREATE INDEX IF NOT EXISTS idx_conversation_turns_session
+ON conversation_turns(session_id);
+
+-- Rolling summary of the oldest turns; turn_count is how many turns it covers
+CREATE TABLE IF NOT EXISTS conversation_summaries (
+    conversation_id TEXT PRIMARY KEY,
+    session_id TEXT,
+    summary TEXT,
+    turn_count INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT NOW()
+);
@@ -0,0 +1,50 @@
+-- Migration: Track session activity and archive expired documents
+-- Date: 2026-10-19
+-- Purpose: Let the session sweeper find idle sessions and reclaim their storage
+
+-- Last time each browser session uploaded or queried
+CREATE TABLE IF NOT EXISTS session_activity (
+    session_id TEXT PRIMARY KEY,
+    last_seen TIMESTAMP NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_session_activity_last_seen
+ON session_activity(last_seen);
+
+-- The sweeper scans documents oldest-first
+CREATE INDEX IF NOT EXISTS idx_documents_upload_date
+ON documents(upload_date);
+
+-- Destination for expired documents when SESSION_SWEEP_MODE=archive
+CREATE TABLE IF NOT EXISTS documents_archive (
+    id TEXT PRIMARY KEY,
+    filename TEXT,
+    file_type TEXT,
+    content TEXT,
+    upload_date TIMESTAMP,
+    file_size INTEGER,
+    metadata JSONB,
+    session_id TEXT,
+    archived_at TIMESTAMP DEFAULT NOW()
+);
+
+-- Latest upload or query per session, so the sweeper finds idle sessions in one query.
+-- Sessions that only queried (conversations, no documents) are included through session_activity
+CREATE OR REPLACE VIEW session_last_active AS
+SELECT session_id, MAX(last_active) AS last_active
+FROM (
+    SELECT session_id, upload_date AS last_active FROM documents WHERE session_id IS NOT NULL
+    UNION ALL
+    SELECT session_id, last_seen AS last_active FROM session_activity
+) activity
+GROUP BY session_id;
+
+-- Bytes stored overall and per session, summed in the database for the upload quota
+CREATE OR REPLACE VIEW storage_usage AS
+SELECT COALESCE(SUM(file_size), 0) AS total_bytes FROM documents;
+
+CREATE OR REPLACE VIEW session_storage_usage AS
+SELECT session_id, COALESCE(SUM(file_size), 0) AS total_bytes
+FROM documents
+WHERE session_id IS NOT NULL
+GROUP BY session_id;
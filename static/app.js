@@ -1,5 +1,9 @@
 // Document Query System JavaScript
 
+const RESUMABLE_UPLOAD_THRESHOLD = 50 * 1024 * 1024;
+const RESUMABLE_CHUNK_SIZE = 5 * 1024 * 1024;
+const RESUMABLE_MAX_RETRIES = 5;
+
 class DocumentQueryApp {
     constructor() {
         this.currentConversation = null;
@@ -217,8 +221,8 @@ class DocumentQueryApp {
 
         // Validate file types and sizes
         const validFiles = [];
-        const allowedTypes = ['.pdf', '.docx', '.doc', '.txt', '.md', '.png', '.jpg', '.jpeg', '.tiff', '.bmp', '.gif'];
-        const maxFileSize = 50 * 1024 * 1024; // 50MB
+        const allowedTypes = ['.pdf', '.docx', '.doc', '.txt', '.log', '.csv', '.tsv', '.md', '.png', '.jpg', '.jpeg', '.tiff', '.bmp', '.gif'];
+        const maxFileSize = 500 * 1024 * 1024; // 500MB, files over 50MB use resumable uploads
 
         for (const file of files) {
             const fileExt = '.' + file.name.split('.').pop().toLowerCase();
@@ -229,7 +233,7 @@ class DocumentQueryApp {
             }
 
             if (file.size > maxFileSize) {
-                this.showStatus(uploadStatus, `File ${file.name} is too large. Maximum size: 50MB`, 'error');
+                this.showStatus(uploadStatus, `File ${file.name} is too large. Maximum size: 500MB`, 'error');
                 return;
             }
 
@@ -247,7 +251,8 @@ class DocumentQueryApp {
             for (let i = 0; i < validFiles.length; i += BATCH_SIZE) {
                 const batch = validFiles.slice(i, i + BATCH_SIZE);
                 const batchPromises = batch.map(file => this.uploadFile(file));
-                const batchResults = await Promise.all(batchPromises);
+                const stopPolling = this.pollQueuePosition(uploadStatus, `Uploading... ${i}/${validFiles.length}`);
+                const batchResults = await Promise.all(batchPromises).finally(stopPolling);
                 results.push(...batchResults);
 
                 // Show progress
@@ -257,7 +262,14 @@ class DocumentQueryApp {
             const successCount = results.filter(r => r.success).length;
             const totalCount = results.length;
 
-            if (successCount === totalCount) {
+            // Near-duplicates are still stored, but answers only use one copy of the text
+            const duplicates = results.filter(r => r.success && r.result.duplicates && r.result.duplicates.length);
+
+            if (successCount === totalCount && duplicates.length) {
+                const notes = duplicates.map(r => `${r.result.filename} is nearly identical to ${r.result.duplicates.map(d => d.filename).join(', ')}`);
+                this.showStatus(uploadStatus, `Uploaded ${successCount} file(s). ${notes.join('; ')}.`, 'warning');
+                this.updateQueryButtonState();
+            } else if (successCount === totalCount) {
                 this.showStatus(uploadStatus, `Successfully uploaded ${successCount} file(s)`, 'success');
                 this.updateQueryButtonState();
             } else {
@@ -268,7 +280,32 @@ class DocumentQueryApp {
         }
     }
 
+    pollQueuePosition(element, message) {
+        // While the server is busy, show where this session's uploads are in the queue
+        let stopped = false;
+        const timer = setInterval(async () => {
+            try {
+                const response = await fetch(`/queue-status?session_id=${encodeURIComponent(this.sessionId)}`);
+                if (!response.ok) return;
+                const { pools } = await response.json();
+                const positions = pools.extraction.queue_positions;
+                const suffix = positions.length ? ` (waiting for the server, queue position ${positions[0]})` : '';
+                if (!stopped) this.showStatus(element, message + suffix, 'loading');
+            } catch (error) {
+                // Only feedback; the upload itself reports any real failure
+            }
+        }, 2000);
+        return () => {
+            stopped = true;
+            clearInterval(timer);
+        };
+    }
+
     async uploadFile(file) {
+        if (file.size > RESUMABLE_UPLOAD_THRESHOLD) {
+            return this.uploadFileResumable(file);
+        }
+
         const formData = new FormData();
         formData.append('file', file);
         formData.append('session_id', this.sessionId);
@@ -292,6 +329,56 @@ class DocumentQueryApp {
         }
     }
 
+    async uploadFileResumable(file) {
+        try {
+            const created = await this.uploadRequest('/uploads', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ filename: file.name, length: file.size, session_id: this.sessionId })
+            });
+            const uploadUrl = `/uploads/${created.upload_id}`;
+
+            let offset = 0;
+            let failures = 0;
+            while (offset < file.size) {
+                try {
+                    const response = await fetch(uploadUrl, {
+                        method: 'PATCH',
+                        headers: { 'Upload-Offset': String(offset) },
+                        body: file.slice(offset, offset + RESUMABLE_CHUNK_SIZE)
+                    });
+                    const serverOffset = response.headers.get('Upload-Offset');
+                    if (!response.ok && (response.status !== 409 || serverOffset === null)) {
+                        const errorData = await response.json();
+                        throw new Error(errorData.detail || 'Upload failed');
+                    }
+                    offset = Number(serverOffset);
+                    failures = 0;
+                } catch (error) {
+                    // Dropped connection: ask the server how much arrived and carry on from there
+                    if (++failures > RESUMABLE_MAX_RETRIES) throw error;
+                    await new Promise(resolve => setTimeout(resolve, 1000 * failures));
+                    offset = (await this.uploadRequest(uploadUrl, { method: 'GET' })).offset;
+                }
+            }
+
+            const result = await this.uploadRequest(`${uploadUrl}/complete`, { method: 'POST' });
+            return { success: true, result };
+        } catch (error) {
+            console.error(`Failed to upload ${file.name}:`, error);
+            return { success: false, error: error.message };
+        }
+    }
+
+    async uploadRequest(url, options) {
+        const response = await fetch(url, options);
+        const data = await response.json();
+        if (!response.ok) {
+            throw new Error(data.detail || 'Upload failed');
+        }
+        return data;
+    }
+
     // Query Functionality
     setupQuery() {
         const queryButton = document.getElementById('queryButton');
@@ -0,0 +1,21 @@
+
+from app.processors import text_processor
+from app.processors.text_processor import MAX_BLOCK_CHARS, read_blocks
+
+
+def test_long_final_line_is_not_carried_between_chunks(tmp_path, monkeypatch):
+    # The only newline sits at the start of every chunk after the first
+    monkeypatch.setattr(text_processor, "READ_BLOCK_SIZE", 10_000)
+    path = tmp_path / "long.log"
+    path.write_text("header\n" + "x" * 200_000)
+    
+    cleaned = []
+    clean = text_processor._clean
+    monkeypatch.setattr(text_processor, "_clean", lambda text: cleaned.append(len(text)) or clean(text))
+    blocks = list(read_blocks(str(path)))
+    
+    assert blocks[0] == "header"
+    assert "".join(blocks[1:]) == "x" * 200_000
+    assert all(len(block) <= MAX_BLOCK_CHARS for block in blocks)
+    # At most one chunk is held back, so every character is cleaned a bounded number of times
+    assert max(cleaned) < 2 * 10_000
\ No newline at end of file